@@ -668,6 +668,266 @@ class GitRunner(Runner):
             cmd, env=self.get_git_environ_adjusted(env), *args, **kwargs)
 
 
+class _RunnerSubprocessProtocol(object):
+    """asyncio subprocess protocol to feed outputs through a Runner
+
+    Output is split into lines which are processed (logged, passed to
+    callables) as soon as they arrive, the same way `Runner` does while
+    running with `log_online=True`.  The `done` future gets the exit code
+    once the process has exited and both of its output pipes were closed.
+    """
+
+    def __init__(self, runner, done, log_stdout, log_stderr,
+                 expect_stderr=False, expect_fail=False):
+        self.runner = runner
+        self.done = done
+        self.transport = None
+        self.output = {1: binary_type(), 2: binary_type()}
+        self._remainder = {1: binary_type(), 2: binary_type()}
+        log_stdout_ = _decide_to_log(log_stdout)
+        log_stderr_ = _decide_to_log(log_stderr)
+        # arguments to be passed into Runner._process_one_line
+        self._line_args = {
+            1: ('stdout', None, log_stdout_, callable(log_stdout_)),
+            2: ('stderr', None, log_stderr_, callable(log_stderr_),
+                expect_stderr or expect_fail),
+        }
+        self._pipes_open = set()
+        self._exited = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self._pipes_open = {
+            fd for fd in (1, 2) if transport.get_pipe_transport(fd)}
+
+    def pipe_data_received(self, fd, data):
+        lines = (self._remainder[fd] + data).split(b'\n')
+        self._remainder[fd] = lines.pop()
+        for line in lines:
+            self._process_line(fd, line)
+
+    def _process_line(self, fd, line):
+        self.output[fd] += self.runner._process_one_line(
+            *self._line_args[fd], line=line, suf=b'\n')
+
+    def pipe_connection_lost(self, fd, exc):
+        if self._remainder.get(fd):
+            self._process_line(fd, self._remainder[fd])
+            self._remainder[fd] = binary_type()
+        self._pipes_open.discard(fd)
+        self._check_done()
+
+    def process_exited(self):
+        self._exited = True
+        self._check_done()
+
+    def _check_done(self):
+        if self._exited and not self._pipes_open and not self.done.done():
+            self.done.set_result(self.transport.get_returncode())
+            self.transport.close()
+
+    def connection_lost(self, exc):
+        pass
+
+    def pause_writing(self):
+        pass
+
+    def resume_writing(self):
+        pass
+
+
+class AsyncRunner(Runner):
+    """Runner which can execute multiple commands concurrently
+
+    Commands are run as subprocesses of a single asyncio event loop, so
+    their outputs are read as they come without polling, and any number of
+    them (see `jobs`) could be in flight at once.  Logging, protocolling and
+    dry runs follow the semantics of `Runner.run`.
+    """
+
+    __slots__ = []
+
+    def run_many(self, cmds, jobs=None, log_stdout=True, log_stderr=True,
+                 expect_stderr=False, expect_fail=False,
+                 cwd=None, env=None, shell=None, return_exceptions=False,
+                 cwds=None):
+        """Run all `cmds`, up to `jobs` of them at a time
+
+        Parameters
+        ----------
+        cmds : list of (str or list)
+          Commands to run.  See `Runner.run` for the meaning of the
+          remaining arguments, which apply to every command.
+        cwds : list of str, optional
+          Working directory for each of `cmds`, e.g. to run the same
+          command in many repositories.  Overrides `cwd`.
+        jobs : int, optional
+          Maximal number of commands to run concurrently.  All of them
+          are started at once if not specified.
+        log_stdout, log_stderr : bool or callable, optional
+          Unlike `Runner.run`, output is always captured and (if requested)
+          logged or passed to the callables while it is coming.
+        return_exceptions : bool, optional
+          If True, a `CommandError` for a failed command is returned in
+          place of its output.  Otherwise the first (in the order of `cmds`)
+          of those is raised after all commands have finished.
+
+        Returns
+        -------
+        list of (stdout, stderr)
+          In the order of `cmds`.
+        """
+        cmds = list(cmds)
+        cwds = list(cwds) if cwds else [cwd or self.cwd] * len(cmds)
+        if not self.protocol.do_execute_ext_commands:
+            for cmd in cmds:
+                self.log("Running: %s", cmd)
+                if self.protocol.records_ext_commands:
+                    self.protocol.add_section(self._split_cmd(cmd), None)
+            return [("DRY", "DRY")] * len(cmds)
+
+        import asyncio
+        loop = asyncio.ProactorEventLoop() if on_windows \
+            else asyncio.new_event_loop()
+        if not on_windows and sys.version_info < (3, 8):
+            # older pythons need an explicitly attached child watcher to
+            # learn about exited subprocesses of a non-default loop
+            asyncio.get_child_watcher().attach_loop(loop)
+        try:
+            results = loop.run_until_complete(self._run_many(
+                loop, list(zip(cmds, cwds)), jobs,
+                dict(log_stdout=log_stdout, log_stderr=log_stderr,
+                     expect_stderr=expect_stderr, expect_fail=expect_fail,
+                     env=env or self.env, shell=shell)
+            ))
+        finally:
+            loop.close()
+
+        if not return_exceptions:
+            for res in results:
+                if isinstance(res, Exception):
+                    raise res
+        return results
+
+    @staticmethod
+    def _split_cmd(cmd):
+        return shlex.split(cmd, posix=not on_windows) \
+            if isinstance(cmd, string_types) else cmd
+
+    def _run_many(self, loop, cmds, jobs, kwargs):
+        """Schedule all `cmds` ((cmd, cwd) pairs) on the `loop`
+
+        Returns a future for the list of outputs (or exceptions)
+        """
+        import asyncio
+        results = [None] * len(cmds)
+        alldone = asyncio.Future(loop=loop)
+        if not cmds:
+            alldone.set_result(results)
+            return alldone
+        pending = list(enumerate(cmds))[::-1]
+        running = set()
+
+        def _start_next():
+            while pending and (not jobs or len(running) < jobs):
+                i, (cmd, cwd) = pending.pop()
+                running.add(i)
+                self._start_one(loop, cmd, cwd, kwargs).add_done_callback(
+                    functools.partial(_finished, i))
+            if not running and not alldone.done():
+                alldone.set_result(results)
+
+        def _finished(i, fut):
+            running.discard(i)
+            results[i] = fut.exception() or fut.result()
+            _start_next()
+
+        _start_next()
+        return alldone
+
+    def _start_one(self, loop, cmd, cwd, kwargs):
+        """Start `cmd` and return a future for its (stdout, stderr)"""
+        import asyncio
+        env, shell = kwargs['env'], kwargs['shell']
+        expect_fail = kwargs['expect_fail']
+
+        log_msgs = ["Running: %s"]
+        log_args = [cmd]
+        if self.log_cwd:
+            log_msgs += ['cwd=%r']
+            log_args += [cwd]
+        log_env = self.log_env
+        if log_env and env:
+            log_msgs += ["env=%r"]
+            log_args.append(
+                env if log_env is True
+                else {k: env[k] for k in log_env if k in env}
+            )
+        self.log('\n'.join(log_msgs), *log_args)
+
+        if shell is None:
+            shell = isinstance(cmd, string_types)
+        if self.protocol.records_ext_commands:
+            prot_id = self.protocol.start_section(self._split_cmd(cmd))
+
+        exited = asyncio.Future(loop=loop)
+        protocol = _RunnerSubprocessProtocol(
+            self, exited, kwargs['log_stdout'], kwargs['log_stderr'],
+            expect_stderr=kwargs['expect_stderr'], expect_fail=expect_fail)
+        popen_kwargs = dict(stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            cwd=cwd, env=env)
+        if shell:
+            started = loop.subprocess_shell(
+                lambda: protocol, cmd, **popen_kwargs)
+        else:
+            started = loop.subprocess_exec(
+                lambda: protocol, *cmd, **popen_kwargs)
+        started = asyncio.ensure_future(started, loop=loop)
+        result = asyncio.Future(loop=loop)
+
+        def _started(fut):
+            exc = fut.exception()
+            if self.protocol.records_ext_commands:
+                self.protocol.end_section(prot_id, exc)
+            if exc is not None:
+                lgr.log(11, "Failed to start %r%r: %s" %
+                        (cmd, " under %r" % cwd if cwd else '', exc_str(exc)))
+                result.set_exception(exc)
+
+        def _exited(fut):
+            status = fut.result()
+            out = tuple(
+                binary_type.decode(protocol.output[fd]) if PY3
+                else protocol.output[fd]
+                for fd in (1, 2))
+            if status not in [0, None]:
+                msg = "Failed to run %r%s. Exit code=%d. out=%s err=%s" \
+                    % (cmd, " under %r" % cwd if cwd else '', status,
+                       out[0], out[1])
+                lgr.log(9 if expect_fail else 11, msg)
+                result.set_exception(
+                    CommandError(str(cmd), msg, status, out[0], out[1]))
+            else:
+                self.log("Finished running %r with status %s" % (cmd, status),
+                         level=8)
+                result.set_result(out)
+
+        started.add_done_callback(_started)
+        exited.add_done_callback(_exited)
+        return result
+
+
+class AsyncGitRunner(AsyncRunner, GitRunner):
+    """AsyncRunner to be used to run git and git annex commands
+
+    See `GitRunner` for the adjustments to the environment.
+    """
+
+    def run_many(self, cmds, env=None, *args, **kwargs):
+        return super(AsyncGitRunner, self).run_many(
+            cmds, env=self.get_git_environ_adjusted(env), *args, **kwargs)
+
+
 # ####
 # Preserve from previous version
 # TODO: document intention
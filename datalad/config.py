@@ -12,15 +12,26 @@
 import datalad
 from datalad.cmd import GitRunner
 from datalad.dochelpers import exc_str
+from datalad.support.gitconfig import GitConfigUnsupported
+from datalad.support.gitconfig import find_gitdir
+from datalad.support.gitconfig import get_global_gitconfigs
+from datalad.support.gitconfig import get_system_gitconfig
+from datalad.support.gitconfig import read_gitconfig
+from datalad.support.gitconfig import read_gitconfig_file
 from distutils.version import LooseVersion
 
 import re
 import os
+import json
+import hashlib
+import tempfile
 from os.path import join as opj, exists
 from os.path import getmtime
 from os.path import abspath
 from time import time
 
+from appdirs import AppDirs
+
 cfg_kv_regex = re.compile(r'(^.*)\n(.*)$', flags=re.MULTILINE)
 cfg_section_regex = re.compile(r'(.*)\.[^.]+')
 cfg_sectionoption_regex = re.compile(r'(.*)\.([^.]+)')
@@ -46,13 +57,65 @@ def get_git_version(runner):
     return runner.run('git version'.split())[0].split()[2]
 
 
+def _get_cfgcache_dir():
+    """Return directory for persistent config caches, or None if disabled
+
+    Like `GitRunner`, we cannot consult our configuration to configure its
+    own loading, so DATALAD_CONFIG_CACHE (and DATALAD_LOCATIONS_CACHE) are
+    taken directly from the environment.
+    """
+    if os.environ.get('DATALAD_CONFIG_CACHE', '1').lower() \
+            in ('0', 'off', 'no', 'false'):
+        return None
+    return opj(
+        os.environ.get('DATALAD_LOCATIONS_CACHE',
+                       AppDirs("datalad", "datalad.org").user_cache_dir),
+        'config')
+
+
+def _use_python_reader():
+    """Whether to read configuration files without running `git config`
+
+    Set DATALAD_CONFIG_READER=git to always ask git.
+    """
+    return os.environ.get('DATALAD_CONFIG_READER', 'python').lower() != 'git'
+
+
+def _get_file_stats(fnames):
+    """Return {fname: [mtime, size]} for the existing files"""
+    stats = {}
+    for fname in fnames:
+        try:
+            st = os.stat(fname)
+        except OSError:
+            continue
+        stats[fname] = [st.st_mtime, st.st_size]
+    return stats
+
+
+def _fresh_stats(stats):
+    """Either any file was modified too recently to trust its mtime
+
+    Protects against low-res mtimes (FAT32 has 2s, EXT3 has 1s!)
+    """
+    current_time = time()
+    return any((current_time - mtime) <= 2.0 for mtime, _ in stats.values())
+
+
 def _where_reload(obj):
     """Helper decorator to simplify providing repetitive docstring"""
     obj.__doc__ = obj.__doc__ % _where_reload_doc
     return obj
 
 
-def _parse_gitconfig_dump(dump, store, fileset, replace):
+def _update_gitconfig_store(items, store, fileset, replace):
+    """Add (origin, name, value) items to the store
+
+    Origin is the name of the file an item came from (to be added to the
+    `fileset`), or None.  Targets of includes are added to the `fileset`
+    too, even if they do not exist or their condition does not hold, since
+    creating them, or changing the condition, could change the outcome.
+    """
     if replace:
         # if we want to replace existing values in the store
         # collect into a new dict and `update` the store at the
@@ -64,21 +127,20 @@ def _parse_gitconfig_dump(dump, store, fileset, replace):
         # if we don't want to replace value, perform the multi-value
         # preserving addition on the existing store right away
         dct = store
-    for line in dump.split('\0'):
-        if not line:
-            continue
-        if line.startswith('file:'):
-            # origin line
-            fileset.add(abspath(line[5:]))
-            continue
-        if line.startswith('command line:'):
-            # nothing we could handle
-            continue
-        k, v = cfg_kv_regex.match(line).groups()
-        present_v = dct.get(k, None)
-        if present_v is None:
+    for origin, k, v in items:
+        if origin:
+            fileset.add(abspath(origin))
+        if v and (k == 'include.path' or
+                  (k.startswith('includeif.') and k.endswith('.path'))):
+            path = os.path.expanduser(v)
+            if os.path.isabs(path):
+                fileset.add(path)
+            elif origin:
+                fileset.add(abspath(opj(os.path.dirname(origin), path)))
+        if k not in dct:
             dct[k] = v
         else:
+            present_v = dct[k]
             if isinstance(present_v, tuple):
                 dct[k] = present_v + (v,)
             else:
@@ -88,6 +150,32 @@ def _parse_gitconfig_dump(dump, store, fileset, replace):
     return store, fileset
 
 
+def _iter_gitconfig_dump(dump, cwd=None):
+    origin = None
+    for line in dump.split('\0'):
+        if not line:
+            continue
+        if line.startswith('file:'):
+            # origin line, relative to where git ran
+            origin = opj(cwd, line[5:]) if cwd else line[5:]
+            continue
+        if line.startswith('command line:'):
+            # nothing we could handle
+            origin = None
+            continue
+        if '\n' not in line:
+            # variable without a value
+            yield origin, line, None
+            continue
+        k, v = cfg_kv_regex.match(line).groups()
+        yield origin, k, v
+
+
+def _parse_gitconfig_dump(dump, store, fileset, replace, cwd=None):
+    return _update_gitconfig_store(
+        _iter_gitconfig_dump(dump, cwd=cwd), store, fileset, replace)
+
+
 def _parse_env(store):
     dct = {}
     for k in os.environ:
@@ -146,6 +234,13 @@ class ConfigManager(object):
     `reload()` call. Their values take precedence over any specification in
     configuration files, and even overrides.
 
+    Configuration read for a dataset is cached on disk (under
+    ``<cache location>/config``), along with modification times and sizes of
+    all the files it was read from, and reused (even by other processes)
+    without calling `git config` as long as none of those files (or other
+    configuration files git would read) has changed.  Set the
+    DATALAD_CONFIG_CACHE environment variable to 0 to disable this cache.
+
     Parameters
     ----------
     dataset : Dataset, optional
@@ -159,6 +254,9 @@ class ConfigManager(object):
     overrides : dict, optional
       Variable overrides, see general class documentation for details.
     """
+
+    _gitconfig_has_showorgin = None
+
     def __init__(self, dataset=None, dataset_only=False, overrides=None):
         # store in a simple dict
         # no subclassing, because we want to be largely read-only, and implement
@@ -181,8 +279,8 @@ class ConfigManager(object):
         else:
             self._dataset_path = dataset.path
             self._dataset_cfgfname = opj(self._dataset_path, '.datalad', 'config')
-            if not dataset_only:
-                self._repo_cfgfname = opj(self._dataset_path, '.git', 'config')
+            self._repo_cfgfname = None if dataset_only \
+                else opj(self._dataset_path, '.git', 'config')
         self._dataset_only = dataset_only
         # Since configs could contain sensitive information, to prevent
         # any "facilitated" leakage -- just disable logging of outputs for
@@ -193,14 +291,6 @@ class ConfigManager(object):
             # to pick up the right config files
             run_kwargs['cwd'] = dataset.path
         self._runner = GitRunner(**run_kwargs)
-        try:
-            self._gitconfig_has_showorgin = \
-                LooseVersion(get_git_version(self._runner)) >= '2.8.0'
-        except:
-            # no git something else broken, assume git is present anyway
-            # to not delay this, but assume it is old
-            self._gitconfig_has_showorgin = False
-
         self.reload(force=True)
 
     def reload(self, force=False):
@@ -228,15 +318,86 @@ class ConfigManager(object):
                 self._store = _parse_env(self._store)
                 return
 
-        self._store = {}
+        cache_fname = self._get_cache_fname()
+        if cache_fname and self._load_cache(cache_fname):
+            self._finalize_reload()
+            return
+
         # 2-step strategy:
         #   - load datalad dataset config from dataset
         #   - load git config from all supported by git sources
         # in doing so we always stay compatible with where Git gets its
         # config from, but also allow to override persistent information
         # from dataset locally or globally
+        if _use_python_reader() and self._read_python():
+            with_origins = True
+        else:
+            with_origins = self._read_git()
+
+        self._monitor_head()
+        if cache_fname and with_origins:
+            self._save_cache(cache_fname)
+        self._finalize_reload()
+
+    def _monitor_head(self):
+        """Also monitor HEAD, if configuration depends on the active branch
+
+        Conditional includes on the branch (`includeIf.onbranch:...`) are
+        evaluated by git, so a checkout of another branch can change the
+        configuration without any configuration file being modified.
+        """
+        if not self._dataset_path or self._dataset_only or \
+                not any(k.startswith('includeif.onbranch:')
+                        for k in self._store):
+            return
+        try:
+            gitdir = find_gitdir(self._dataset_path)
+        except (GitConfigUnsupported, ValueError, IOError, OSError):
+            gitdir = None
+        self._cfgfiles.add(
+            opj(gitdir or opj(self._dataset_path, '.git'), 'HEAD'))
+
+    def _read_python(self):
+        """Read configuration without running git
+
+        Returns
+        -------
+        bool
+          False if configuration could not be read, and git must be asked
+          instead.
+        """
+        store = {}
+        cfgfiles = set()
+        try:
+            if self._dataset_cfgfname and exists(self._dataset_cfgfname):
+                # overwrite existing value, do not amend to get multi-line
+                # values
+                store, cfgfiles = _update_gitconfig_store(
+                    read_gitconfig_file(self._dataset_cfgfname),
+                    store, cfgfiles, replace=False)
+            if not self._dataset_only:
+                store, cfgfiles = _update_gitconfig_store(
+                    read_gitconfig(self._dataset_path),
+                    store, cfgfiles, replace=True)
+        except (GitConfigUnsupported, ValueError, IOError, OSError):
+            # we cannot log here, logging is not configured yet.  git will
+            # either do the right thing or report the problem
+            return False
+        self._store, self._cfgfiles = store, cfgfiles
+        return True
+
+    def _read_git(self):
+        """Read configuration via `git config`
+
+        Returns
+        -------
+        bool
+          Whether git reported which files configuration was read from.
+        """
+        self._store = {}
         run_args = ['-z', '-l']
-        if self._gitconfig_has_showorgin:
+        with_origins = self._has_showorigin()
+        if with_origins:
             run_args.append('--show-origin')
 
         if self._dataset_cfgfname:
@@ -248,17 +409,36 @@ class ConfigManager(object):
                 # overwrite existing value, do not amend to get multi-line
                 # values
                 self._store, self._cfgfiles = _parse_gitconfig_dump(
-                    stdout, self._store, self._cfgfiles, replace=False)
-
+                    stdout, self._store, self._cfgfiles, replace=False,
+                    cwd=self._dataset_path)
+
+        if not self._dataset_only:
+            stdout, stderr = self._run(run_args, log_stderr=True)
+            self._store, self._cfgfiles = _parse_gitconfig_dump(
+                stdout, self._store, self._cfgfiles, replace=True,
+                cwd=self._dataset_path)
+        return with_origins
+
+    def _has_showorigin(self):
+        if ConfigManager._gitconfig_has_showorgin is None:
+            # git is not going to change under our feet, so figure it out
+            # only once per process, and only if we need to run it anyway
+            try:
+                ConfigManager._gitconfig_has_showorgin = \
+                    LooseVersion(get_git_version(self._runner)) >= '2.8.0'
+            except:
+                # no git something else broken, assume git is present anyway
+                # to not delay this, but assume it is old
+                ConfigManager._gitconfig_has_showorgin = False
+        return ConfigManager._gitconfig_has_showorgin
+
+    def _finalize_reload(self):
+        """Superimpose overrides and environment on freshly loaded items"""
         if self._dataset_only:
             # superimpose overrides
             self._store.update(self.overrides)
             return
 
-        stdout, stderr = self._run(run_args, log_stderr=True)
-        self._store, self._cfgfiles = _parse_gitconfig_dump(
-            stdout, self._store, self._cfgfiles, replace=True)
-
         # always monitor the dataset cfg location, we know where it is in all cases
         if self._dataset_cfgfname:
             self._cfgfiles.add(self._dataset_cfgfname)
@@ -271,6 +451,97 @@ class ConfigManager(object):
         # override with environment variables
         self._store = _parse_env(self._store)
 
+    #
+    # Persistent cache of the configuration read from files, shared across
+    # processes, so we do not need to run `git config` at all for configuration
+    # files which have not changed since it was done last time
+    #
+    def _get_cache_fname(self):
+        """Return file name of the persistent cache, or None if not to use one
+
+        Only configuration of datasets is cached.  The cache file name
+        is determined by all the variables which could affect what
+        `git config` reports
+        """
+        if not self._dataset_path or \
+                not (_use_python_reader() or self._has_showorigin()):
+            # without origins we would not know which files to monitor
+            return None
+        cache_dir = _get_cfgcache_dir()
+        if not cache_dir:
+            return None
+        key = [self._dataset_path, self._dataset_only] + sorted(
+            (k, v) for k, v in os.environ.items()
+            if k.startswith('GIT_') or k in ('HOME', 'XDG_CONFIG_HOME'))
+        return opj(
+            cache_dir,
+            hashlib.md5(repr(key).encode('utf-8')).hexdigest() + '.json')
+
+    def _get_cfgfile_candidates(self):
+        """Configuration files which might not exist (yet)"""
+        if self._dataset_only:
+            return [self._dataset_cfgfname]
+        # git would not tell about configuration files it did not find, but
+        # they might appear later on
+        try:
+            candidates = [get_system_gitconfig()]
+        except GitConfigUnsupported:
+            candidates = ['/etc/gitconfig']
+        candidates.extend(get_global_gitconfigs())
+        candidates = [f for f in candidates if f]
+        candidates.append(self._dataset_cfgfname)
+        if self._repo_cfgfname:
+            candidates.append(self._repo_cfgfname)
+        return candidates
+
+    def _load_cache(self, fname):
+        """Load store from the cache file, if it is still valid
+
+        Returns
+        -------
+        bool
+          True if the store was loaded
+        """
+        try:
+            with open(fname) as f:
+                cache = json.load(f)
+        except (IOError, OSError, ValueError):
+            return False
+        # all files monitored, including those which did not exist
+        stats = _get_file_stats(
+            set(cache['cfgfiles']).union(self._get_cfgfile_candidates()))
+        if stats != cache['stats'] or _fresh_stats(stats):
+            # something has changed, appeared or disappeared
+            return False
+        self._store = {
+            k: tuple(v) if isinstance(v, list) else v
+            for k, v in cache['store'].items()}
+        self._cfgfiles = set(cache['cfgfiles'])
+        return True
+
+    def _save_cache(self, fname):
+        stats = _get_file_stats(
+            self._cfgfiles.union(self._get_cfgfile_candidates()))
+        if _fresh_stats(stats):
+            # would not be able to tell if modified again
+            return
+        cache = dict(store=self._store,
+                     cfgfiles=sorted(self._cfgfiles),
+                     stats=stats)
+        try:
+            cache_dir = os.path.dirname(fname)
+            if not exists(cache_dir):
+                os.makedirs(cache_dir)
+            # write to a temporary file and rename, so any concurrent
+            # process would see either the old or the new content
+            fd, tmpfname = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cache, f)
+            os.rename(tmpfname, fname)
+        except (IOError, OSError):
+            # just a cache
+            pass
+
     @_where_reload
     def obtain(self, var, default=None, dialog_type=None, valtype=None,
                store=False, where=None, reload=True, **kwargs):
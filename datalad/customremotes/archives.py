@@ -20,7 +20,6 @@ lgr = logging.getLogger('datalad.customremotes.archive')
 lgr.log(5, "Importing datalad.customremotes.archive")
 
 from ..dochelpers import exc_str
-from ..cmd import link_file_load
 from ..support.archives import ArchivesCache
 from ..support.network import URL
 from ..support.locking import lock_if_check_fails
@@ -54,7 +53,10 @@ class ArchiveAnnexCustomRemote(AnnexCustomRemote):
         # heuristic let's use the most recently asked one
 
         self._last_url = None  # for heuristic to choose among multiple URLs
-        self._cache = ArchivesCache(self.path, persistent=persistent_cache)
+        cache_size = self.repo.config.obtain('datalad.archives.cache-size')
+        self._cache = ArchivesCache(
+            self.path, persistent=persistent_cache,
+            size_limit=cache_size * 1024 ** 2 if cache_size else None)
 
     def stop(self, *args):
         """Stop communication with annex"""
@@ -228,6 +230,10 @@ class ArchiveAnnexCustomRemote(AnnexCustomRemote):
 
                 if exists(efile):
                     size = os.stat(efile).st_size
+                else:
+                    info = self.cache[akey_path].get_member_info(afile)
+                    if info:
+                        size = info['size']
 
             if size is None:
                 size = 'UNKNOWN'
@@ -267,8 +273,13 @@ class ArchiveAnnexCustomRemote(AnnexCustomRemote):
         lgr.debug("VERIFYING key %s" % key)
         # The same content could be available from multiple locations within the same
         # archive, so let's not ask it twice since here we don't care about "afile"
-        for akey, _ in self._gen_akey_afiles(key, unique_akeys=True):
-            if self.get_contentlocation(akey) or self.repo.is_available(akey, batch=True, key=True):
+        for akey, afile in self._gen_akey_afiles(key, unique_akeys=True):
+            akey_path = self.get_contentlocation(akey, absolute=True)
+            if akey_path and self.cache[akey_path].has_member(afile) is False:
+                # an earlier look into this archive showed it lacks the file
+                lgr.debug("%s is not contained in the archive %s", afile, akey)
+                continue
+            if akey_path or self.repo.is_available(akey, batch=True, key=True):
                 self.send("CHECKPRESENT-SUCCESS", key)
                 return
         self.send("CHECKPRESENT-UNKNOWN", key)
@@ -352,14 +363,13 @@ class ArchiveAnnexCustomRemote(AnnexCustomRemote):
                 assert exists(akey_path), "Key file %s is not present" % akey_path
 
                 # Extract that bloody file from the bloody archive
-                # TODO: implement/use caching, for now a simple one
-                #  actually patool doesn't support extraction of a single file
+                # patool doesn't support extraction of a single file
                 #  https://github.com/wummel/patool/issues/20
-                # so
+                # so only tar and zip archives get it extracted directly,
+                # anything else gets extracted entirely into the cache
                 pwd = getpwd()
                 lgr.debug("Getting file {afile} from {akey_path} while PWD={pwd}".format(**locals()))
-                apath = self.cache[akey_path].get_extracted_file(afile)
-                link_file_load(apath, path)
+                self.cache[akey_path].extract_file(afile, path)
                 self.send('TRANSFER-SUCCESS', cmd, key)
                 return
             except Exception as exc:
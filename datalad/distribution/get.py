@@ -11,7 +11,9 @@
 """
 
 import logging
+import threading
 
+from functools import partial
 from os.path import join as opj
 from os.path import relpath
 
@@ -48,6 +50,8 @@ from datalad.support.exceptions import InstallFailedError
 from datalad.support.exceptions import IncompleteResultsError
 from datalad.support.network import URL
 from datalad.support.network import RI
+from datalad.support.parallel import get_jobs
+from datalad.support.parallel import process_tree
 from datalad.dochelpers import exc_str
 from datalad.dochelpers import single_or_plural
 from datalad.utils import get_dataset_root
@@ -55,6 +59,7 @@ from datalad.utils import with_pathsep as _with_sep
 from datalad.utils import unique
 from datalad.utils import path_startswith
 from datalad.utils import path_is_subpath
+from datalad.utils import nothing_cm
 
 from .dataset import Dataset
 from .dataset import EnsureDataset
@@ -131,15 +136,21 @@ def _get_flexible_source_candidates_for_submodule(ds, sm_path, sm_url=None):
 
 
 def _install_subds_from_flexible_source(
-        ds, sm_path, sm_url, reckless, description=None):
-    """Tries to obtain a given subdataset from several meaningful locations"""
-    # TODO remove this assertion eventually, for now it assures intented
-    # usage of this helper function
-    assert(sm_path in ds.subdatasets(recursive=False, result_xfm='relpaths'))
+        ds, sm_path, sm_url, reckless, description=None, parent_lock=None):
+    """Tries to obtain a given subdataset from several meaningful locations
 
-    # compose a list of candidate clone URLs
-    clone_urls = _get_flexible_source_candidates_for_submodule(
-        ds, sm_path, sm_url)
+    `parent_lock` (if provided) is held while the parent `ds` is queried
+    for candidate locations and while the subdataset gets registered in it,
+    so only the cloning itself could be done concurrently.
+    """
+    with parent_lock or nothing_cm():
+        # TODO remove this assertion eventually, for now it assures intented
+        # usage of this helper function
+        assert(sm_path in ds.subdatasets(recursive=False, result_xfm='relpaths'))
+
+        # compose a list of candidate clone URLs
+        clone_urls = _get_flexible_source_candidates_for_submodule(
+            ds, sm_path, sm_url)
 
     # prevent inevitable exception from `clone`
     dest_path = opj(ds.path, sm_path)
@@ -183,6 +194,13 @@ def _install_subds_from_flexible_source(
                 clone_urls))
 
     assert(subds.is_installed())
+    with parent_lock or nothing_cm():
+        _update_cloned_submodule(ds, sm_path, subds)
+    return subds
+
+
+def _update_cloned_submodule(ds, sm_path, subds):
+    """Register freshly cloned `subds` in its parent `ds`"""
     _fixup_submodule_dotgit_setup(ds, sm_path)
 
     # do fancy update
@@ -224,7 +242,6 @@ def _install_subds_from_flexible_source(
                 "%s has a detached HEAD since cloned branch %s has another common ancestor with %s",
                 subrepo.path, branch, detached_hexsha[:8]
             )
-    return subds
 
 
 def _install_necessary_subdatasets(
@@ -288,57 +305,87 @@ def _install_necessary_subdatasets(
         cur_subds = subds_trail[-1]
 
 
-def _recursive_install_subds_underneath(ds, recursion_limit, reckless, start=None,
-                                        refds_path=None, description=None):
+def _get_subds_install_tasks(ds, recursion_limit, start=None):
+    """Return (parent, subdataset record, recursion limit) to install"""
     if isinstance(recursion_limit, int) and recursion_limit <= 0:
-        return
-    # install using helper that give some flexibility regarding where to
-    # get the module from
+        return []
+    tasks = []
     for sub in ds.subdatasets(
             return_type='generator', result_renderer='disabled'):
-        subds = Dataset(sub['path'])
         if sub.get('gitmodule_datalad-recursiveinstall', '') == 'skip':
             lgr.debug(
                 "subdataset %s is configured to be skipped on recursive installation",
                 sub['path'])
             continue
-        if start is not None and not path_is_subpath(subds.path, start):
+        if start is not None and not path_is_subpath(sub['path'], start):
             # this one we can ignore, not underneath the start path
             continue
-        if sub.get('state', None) != 'absent':
-            # dataset was already found to exist
-            yield get_status_dict(
-                'install', ds=subds, status='notneeded', logger=lgr,
-                refds=refds_path)
-            # do not continue, even if an intermediate dataset exists it
-            # does not imply that everything below it does too
-        else:
-            # try to get this dataset
-            try:
-                subds = _install_subds_from_flexible_source(
-                    ds,
-                    relpath(sub['path'], start=ds.path),
-                    sub['gitmodule_url'],
-                    reckless,
-                    description=description)
-                yield get_status_dict(
-                    'install', ds=subds, status='ok', logger=lgr, refds=refds_path,
-                    message=("Installed subdataset %s", subds), parentds=ds.path)
-            except Exception as e:
-                # skip all of downstairs, if we didn't manage to install subdataset
-                yield get_status_dict(
-                    'install', ds=subds, status='error', logger=lgr, refds=refds_path,
-                    message=("Installation of subdatasets %s failed with exception: %s",
-                             subds, exc_str(e)))
-                continue
-        # otherwise recurse
-        # we can skip the start expression, we know we are within
-        for res in _recursive_install_subds_underneath(
-                subds,
-                recursion_limit=recursion_limit - 1 if isinstance(recursion_limit, int) else recursion_limit,
-                reckless=reckless,
-                refds_path=refds_path):
-            yield res
+        tasks.append((ds, sub, recursion_limit))
+    return tasks
+
+
+def _install_subds_task(task, reckless, refds_path=None, description=None,
+                        parent_lock=None):
+    """Install a single subdataset for `_recursive_install_subds_underneath`
+
+    Returns
+    -------
+    list, list
+      Results to report, and the tasks for the subdatasets underneath
+    """
+    ds, sub, recursion_limit = task
+    subds = Dataset(sub['path'])
+    if sub.get('state', None) != 'absent':
+        # dataset was already found to exist
+        res = get_status_dict(
+            'install', ds=subds, status='notneeded', logger=lgr,
+            refds=refds_path)
+        # do not stop, even if an intermediate dataset exists it
+        # does not imply that everything below it does too
+    else:
+        # try to get this dataset
+        try:
+            subds = _install_subds_from_flexible_source(
+                ds,
+                relpath(sub['path'], start=ds.path),
+                sub['gitmodule_url'],
+                reckless,
+                description=description,
+                parent_lock=parent_lock)
+            res = get_status_dict(
+                'install', ds=subds, status='ok', logger=lgr, refds=refds_path,
+                message=("Installed subdataset %s", subds), parentds=ds.path)
+        except Exception as e:
+            # skip all of downstairs, if we didn't manage to install subdataset
+            return [get_status_dict(
+                'install', ds=subds, status='error', logger=lgr, refds=refds_path,
+                message=("Installation of subdatasets %s failed with exception: %s",
+                         subds, exc_str(e)))], []
+    # otherwise recurse
+    # we can skip the start expression, we know we are within
+    return [res], _get_subds_install_tasks(
+        subds,
+        recursion_limit - 1 if isinstance(recursion_limit, int) else recursion_limit)
+
+
+def _recursive_install_subds_underneath(ds, recursion_limit, reckless, start=None,
+                                        refds_path=None, description=None,
+                                        jobs=None):
+    """Install all subdatasets underneath `ds` (and `start` path)
+
+    With `jobs` (see `get_jobs`), sibling subdatasets get cloned
+    concurrently.  A subdataset is still only installed after its parent.
+    """
+    jobs = get_jobs(jobs)
+    for res in process_tree(
+            _get_subds_install_tasks(ds, recursion_limit, start=start),
+            partial(_install_subds_task,
+                    reckless=reckless,
+                    refds_path=refds_path,
+                    description=description,
+                    parent_lock=threading.Lock() if jobs else None),
+            jobs=jobs):
+        yield res
 
 
 @build_doc
@@ -352,7 +399,8 @@ class Get(Interface):
     across potential subdatasets, i.e. if a directory is provided, all files in
     the directory are obtained. Recursion into subdatasets is supported too. If
     enabled, relevant subdatasets are detected and installed in order to
-    fulfill a request.
+    fulfill a request. If a number of parallel `jobs` is given explicitly,
+    sibling subdatasets are installed concurrently.
 
     Known data locations for each requested file are evaluated and data are
     obtained from some available location (according to git-annex configuration
@@ -561,7 +609,8 @@ class Get(Interface):
                         reckless,
                         start=ap['path'],
                         refds_path=refds_path,
-                        description=description):
+                        description=description,
+                        jobs=jobs):
                     # yield immediately so errors could be acted upon
                     # outside, before we continue
                     if not (res['type'] == 'dataset' and res['path'] in yielded_ds):
@@ -12,7 +12,10 @@
 
 import logging
 import re
+import threading
 from collections import OrderedDict
+from itertools import chain
+from os.path import dirname
 from os.path import join as opj
 
 from git.remote import PushInfo as PI
@@ -35,6 +38,8 @@ from datalad.support.annexrepo import AnnexRepo
 from datalad.support.sshconnector import sh_quote
 from datalad.support.exceptions import InsufficientArgumentsError
 from datalad.support.network import URL, RI, SSHRI, is_ssh
+from datalad.support.parallel import get_jobs
+from datalad.support.parallel import process_tree
 
 # haunted imports/bindings
 from datalad.interface.diff import Diff
@@ -339,31 +344,37 @@ def _publish_dataset(ds, remote, refspec, paths, annex_copy_options, force=False
     if transfer_data != 'none' and isinstance(ds.repo, AnnexRepo):
         # publishing of `remote` might depend on publishing other
         # remote(s) first, so they need to receive the data first:
-        for d in publish_depends:
+        def _publish_dep_data(d):
             lgr.info("Transferring data to configured publication dependency: '%s'" % d)
             # properly initialized remote annex -> publish data
-            for r in _publish_data(
-                    ds,
-                    d,
-                    paths,
-                    annex_copy_options,
-                    force,
-                    transfer_data,
-                    **kwargs):
-                # note if we published any data, notify to sync annex branch below
-                if r['status'] == 'ok' and r['action'] == 'publish' and \
-                        r.get('type', None) == 'file':
-                    copied_data = True
-                yield r
+            return _publish_data(
+                ds,
+                d,
+                paths,
+                annex_copy_options,
+                force,
+                transfer_data,
+                **kwargs)
+
+        dep_jobs = get_jobs(jobs) if len(publish_depends) > 1 else None
+        if dep_jobs:
+            # the dependencies do not depend on each other
+            dep_results = process_tree(
+                publish_depends,
+                lambda d: (list(_publish_dep_data(d)), []),
+                jobs=dep_jobs)
+        else:
+            dep_results = chain.from_iterable(
+                _publish_dep_data(d) for d in publish_depends)
         # and for the main target
-        for r in _publish_data(
+        for r in chain(dep_results, _publish_data(
                 ds,
                 remote,
                 paths,
                 annex_copy_options,
                 force,
                 transfer_data,
-                **kwargs):
+                **kwargs)):
             # note if we published any data, notify to sync annex branch below
             if r['status'] == 'ok' and r['action'] == 'publish' and \
                     r.get('type', None) == 'file':
@@ -460,6 +471,72 @@ def _publish_dataset(ds, remote, refspec, paths, annex_copy_options, force=False
         yield get_status_dict(ds=ds, status=status, message=msg, **kwargs)
 
 
+def _process_subdatasets_first(ds_paths, worker, jobs=None):
+    """Process datasets concurrently, but each only after its subdatasets
+
+    A superdataset is published last, so that it never refers to a state of
+    a subdataset that is not yet available from the sibling.
+
+    Parameters
+    ----------
+    ds_paths : list
+      Paths of the datasets to process.
+    worker : callable
+      Called with a dataset path, must return a list of results.
+    jobs : int, optional
+      Number of datasets to process concurrently, see `process_tree()`.
+    """
+    # closest superdataset among the ones to process, and the number of its
+    # subdatasets still to be processed
+    parents = {}
+    nsubs = dict.fromkeys(ds_paths, 0)
+    for ds_path in ds_paths:
+        # walk up until the first directory that is to be processed too
+        path, parent = ds_path, dirname(ds_path)
+        while parent != path and parent not in nsubs:
+            path, parent = parent, dirname(parent)
+        if parent != path:
+            parents[ds_path] = parent
+            nsubs[parent] += 1
+    lock = threading.Lock()
+
+    def _process(ds_path):
+        results = worker(ds_path)
+        ready = []
+        parent = parents.get(ds_path)
+        if parent:
+            with lock:
+                nsubs[parent] -= 1
+                if not nsubs[parent]:
+                    ready.append(parent)
+        return results, ready
+
+    return process_tree(
+        [p for p in ds_paths if not nsubs[p]], _process, jobs=jobs)
+
+
+def _open_ssh_connections(ds_paths, ds_remote_info):
+    """Open SSH connections to the siblings (and their dependencies) upfront"""
+    for ds_path in ds_paths:
+        remote = ds_remote_info.get(ds_path, {}).get('remote', None)
+        if not remote:
+            continue
+        ds = Dataset(ds_path)
+        depvar = 'remote.{}.datalad-publish-depends'.format(remote)
+        for r in assure_list(ds.config.get(depvar, [])) + [remote]:
+            for var in ('url', 'pushurl'):
+                url = ds.config.get('remote.{}.{}'.format(r, var), None)
+                if not url:
+                    continue
+                try:
+                    if is_ssh(url):
+                        ssh_manager.get_connection(url).open()
+                except Exception as e:
+                    # the git/annex processes will try on their own
+                    lgr.debug("Failed to open SSH connection to %s: %s",
+                              url, exc_str(e))
+
+
 def _get_remote_info(ds_path, ds_remote_info, to, missing):
     """Returns None if desired info was obtained, or a tuple (status, message)
     if not"""
@@ -783,7 +860,8 @@ class Publish(Interface):
         )
 
         lgr.debug("Attempt to publish %i datasets", len(content_by_ds))
-        for ds_path in content_by_ds:
+
+        def _publish(ds_path):
             remote_info = ds_remote_info.get(ds_path, None)
             if remote_info is None:
                 # maybe this dataset wasn't annotated above, try to get info
@@ -799,7 +877,7 @@ class Publish(Interface):
                         status=remote_info_result[0],
                         message=remote_info_result[1],
                         **res_kwargs)
-                    continue
+                    return
                 # continue with freshly obtained info
                 remote_info = ds_remote_info[ds_path]
                 # condition above must catch all other cases
@@ -823,3 +901,19 @@ class Publish(Interface):
                     transfer_data=transfer_data,
                     **res_kwargs):
                 yield r
+
+        ds_jobs = get_jobs(jobs) if len(content_by_ds) > 1 else None
+        if not ds_jobs:
+            for ds_path in content_by_ds:
+                for r in _publish(ds_path):
+                    yield r
+            return
+
+        # all concurrent git/annex processes should reuse the same
+        # connections to a host
+        _open_ssh_connections(content_by_ds, ds_remote_info)
+        for r in _process_subdatasets_first(
+                list(content_by_ds),
+                lambda ds_path: list(_publish(ds_path)),
+                jobs=ds_jobs):
+            yield r
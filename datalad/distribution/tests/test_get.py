@@ -488,6 +488,31 @@ def test_recurse_existing(src, path):
     ok_(sub3.repo.file_has_content('file_in_annex.txt') is True)
 
 
+@slow
+@with_tempfile(mkdir=True)
+@with_tempfile(mkdir=True)
+def test_get_recurse_subdatasets_jobs(src, path):
+    origin = Dataset(src).create()
+    for i in range(4):
+        sub = origin.create('sub%d' % i)
+        sub.create('subsub')
+    origin.add('.', recursive=True)
+
+    ds = install(
+        path, source=src,
+        result_xfm='datasets', return_type='item-or-list')
+    res = ds.get(curdir, recursive=True, get_data=False, jobs=3)
+    # siblings and their subdatasets, each installed once
+    assert_result_count(res, 8, action='install', status='ok',
+                        type='dataset')
+    eq_(len(ds.subdatasets(fulfilled=True, recursive=True)), 8)
+    ok_clean_git(ds.path)
+    # nothing to do on a repeated call
+    assert_result_count(
+        ds.get(curdir, recursive=True, get_data=False, jobs=3),
+        0, action='install', status='ok')
+
+
 @slow  # 33sec
 @with_tempfile(mkdir=True)
 @with_tempfile(mkdir=True)
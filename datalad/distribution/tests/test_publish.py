@@ -673,3 +673,37 @@ def test_gh1763(src, target1, target2):
         assert_in(
             'probe1',
             Dataset(target).repo.get_annexed_files(with_content_only=True))
+
+
+def test_process_subdatasets_first():
+    from ..publish import _process_subdatasets_first
+    ds_paths = ['/a', '/a/b', '/a/b/c', '/a/d', '/e', '/a/bc', '/a/x/y/z']
+    for jobs in (None, 3):
+        processed = list(_process_subdatasets_first(
+            ds_paths, lambda p: [p], jobs=jobs))
+        eq_(sorted(processed), sorted(ds_paths))
+        for sub, sup in (('/a/b/c', '/a/b'), ('/a/b', '/a'), ('/a/d', '/a'),
+                         ('/a/bc', '/a'), ('/a/x/y/z', '/a')):
+            ok_(processed.index(sub) < processed.index(sup))
+
+
+@with_tempfile(mkdir=True)
+@with_tempfile(mkdir=True)
+def test_publish_concurrently(src_path, dst_path):
+    src = Dataset(src_path).create()
+    subs = [src.create(name) for name in ('sub1', 'sub2')]
+    targets = []
+    for ds in [src] + subs:
+        target = GitRepo(opj(dst_path, os.path.basename(ds.path)), create=True)
+        target.checkout("TMP", ["-b"])
+        ds.repo.add_remote("target", target.path)
+        targets.append(target)
+
+    res = src.publish(to="target", recursive=True, jobs=3)
+    assert_status('ok', res)
+    assert_result_count(res, 3, type='dataset')
+    # the superdataset goes last
+    eq_(res[-1]['path'], src.path)
+    for ds, target in zip([src] + subs, targets):
+        eq_(list(target.get_branch_commits("master")),
+            list(ds.repo.get_branch_commits("master")))
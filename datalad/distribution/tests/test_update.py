@@ -15,9 +15,14 @@ from datalad.tests.utils import known_failure_direct_mode
 
 import os
 from os.path import join as opj, exists
+
+from mock import patch
+from six import PY3
+
 from ..dataset import Dataset
 from datalad.api import install
 from datalad.api import update
+from datalad.distribution.update import _fetch_concurrently
 from datalad.utils import knows_annex
 from datalad.utils import rmtree
 from datalad.utils import chpwd
@@ -34,6 +39,7 @@ from datalad.tests.utils import assert_status
 from datalad.tests.utils import assert_result_count
 from datalad.tests.utils import assert_in_results
 from datalad.tests.utils import slow
+from datalad.tests.utils import SkipTest
 
 
 @slow
@@ -104,9 +110,14 @@ def test_update_simple(origin, src_path, dst_path):
     source.add(opj('2', 'load.dat'),
                message="saving changes within subm2",
                recursive=True)
-    assert_result_count(
-        dest.update(merge=True, recursive=True), 2,
-        status='ok', type='dataset')
+    # fetches of all datasets are carried out at once
+    with patch('datalad.distribution.update._fetch_concurrently',
+               wraps=_fetch_concurrently) as fetch_concurrently:
+        assert_result_count(
+            dest.update(merge=True, recursive=True, jobs=2), 2,
+            status='ok', type='dataset')
+        if PY3:
+            eq_(len(fetch_concurrently.call_args[0][0]), 2)
     # and now we can get new file
     dest.get('2/load.dat')
     ok_file_has_content(opj(dest.path, '2', 'load.dat'), 'heavy')
@@ -336,3 +347,26 @@ def test_reobtain_data(originpath, destpath):
     assert_result_count(res, 1, status='ok', type='file', action='get')
     ok_file_has_content(opj(ds.path, 'load.dat'), 'light')
     assert_false(ds.repo.file_has_content('novel'))
+
+
+@with_tempfile(mkdir=True)
+@with_tempfile(mkdir=True)
+@with_tempfile(mkdir=True)
+def test_fetch_concurrently(src_path, dst1_path, dst2_path):
+    if not PY3:
+        raise SkipTest("Requires asyncio")
+    src = GitRepo(src_path, create=True)
+    create_tree(src_path, {'file.dat': '123'})
+    src.add('file.dat')
+    src.commit("added")
+    dests = [GitRepo.clone(src_path, p) for p in (dst1_path, dst2_path)]
+    dests[1].add_remote('bogus', opj(src_path, 'nothere'))
+    src.commit("empty", options=['--allow-empty'])
+    errors = _fetch_concurrently(
+        [(dests[0], 'origin'), (dests[1], 'bogus')], False, 2)
+    eq_(list(errors), [dests[1].path])
+    eq_(dests[0].get_hexsha('origin/master'), src.get_hexsha())
+    # with all remotes, the failing one does not prevent the others
+    errors = _fetch_concurrently([(dests[1], None)], True, 2)
+    eq_(list(errors), [dests[1].path])
+    eq_(dests[1].get_hexsha('origin/master'), src.get_hexsha())
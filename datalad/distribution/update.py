@@ -16,6 +16,11 @@ __docformat__ = 'restructuredtext'
 import logging
 from os.path import lexists, join as opj
 
+from six import PY3
+
+from datalad import ssh_manager
+from datalad.cmd import AsyncGitRunner
+from datalad.dochelpers import exc_str
 from datalad.interface.base import Interface
 from datalad.interface.utils import eval_results
 from datalad.interface.base import build_doc
@@ -27,7 +32,10 @@ from datalad.support.param import Parameter
 from datalad.interface.annotate_paths import AnnotatePaths
 from datalad.interface.common_opts import recursion_flag
 from datalad.interface.common_opts import recursion_limit
+from datalad.interface.common_opts import jobs_opt
 from datalad.distribution.dataset import require_dataset
+from datalad.support.network import is_ssh
+from datalad.support.parallel import get_jobs
 
 from .dataset import Dataset
 from .dataset import EnsureDataset
@@ -75,7 +83,8 @@ class Update(Interface):
         reobtain_data=Parameter(
             args=("--reobtain-data",),
             action="store_true",
-            doc="TODO"), )
+            doc="TODO"),
+        jobs=jobs_opt, )
 
     @staticmethod
     @datasetmethod(name='update')
@@ -88,7 +97,8 @@ class Update(Interface):
             recursive=False,
             recursion_limit=None,
             fetch_all=False,
-            reobtain_data=False):
+            reobtain_data=False,
+            jobs='auto'):
         """
         """
 
@@ -101,6 +111,8 @@ class Update(Interface):
             # act on the whole dataset if nothing else was specified
             path = refds_path
 
+        # datasets to fetch and possibly merge: (ds, res, sibling)
+        to_update = []
         for ap in AnnotatePaths.__call__(
                 dataset=refds_path,
                 path=path,
@@ -161,12 +173,31 @@ class Update(Interface):
                     "Multiple siblings, please specify from which to update.")
                 yield res
                 continue
+            to_update.append((ds, res, sibling_))
+
+        jobs = get_jobs(jobs)
+        # fetch for all datasets at once, unless a sibling to fetch from
+        # is to be determined by GitRepo.fetch()
+        fetch_errors = _fetch_concurrently(
+            [(ds.repo, sibling_) for ds, _, sibling_ in to_update],
+            fetch_all, jobs) \
+            if jobs and PY3 and len(to_update) > 1 and \
+            (fetch_all or all(s for _, _, s in to_update)) else None
+        for ds, res, sibling_ in to_update:
+            repo = ds.repo
             lgr.info("Updating dataset '%s' ..." % repo.path)
-            # fetch remote
-            repo.fetch(
-                remote=None if fetch_all else sibling_,
-                all_=fetch_all,
-                prune=True)  # prune to not accumulate a mess over time
+            if fetch_errors is None:
+                # fetch remote
+                repo.fetch(
+                    remote=None if fetch_all else sibling_,
+                    all_=fetch_all,
+                    prune=True)  # prune to not accumulate a mess over time
+            elif repo.path in fetch_errors:
+                res['status'] = 'error'
+                res['message'] = ("Failed to fetch: %s",
+                                  exc_str(fetch_errors[repo.path]))
+                yield res
+                continue
             # NOTE if any further acces to `repo` is needed, reevaluate
             # ds.repo again, as it might have be converted from an GitRepo
             # to an AnnexRepo
@@ -177,6 +208,47 @@ class Update(Interface):
             yield res
 
 
+def _fetch_concurrently(repos, fetch_all, jobs):
+    """Fetch into many repositories at once, from a single event loop
+
+    Parameters
+    ----------
+    repos : list
+      (repo, remote) tuples.  With `fetch_all`, the remote is ignored and
+      all remotes with a URL get fetched.
+    fetch_all : bool
+    jobs : int
+      Maximal number of `git fetch` processes to run at a time.
+
+    Returns
+    -------
+    dict
+      Exceptions of failed fetches, keyed on the repository path.
+    """
+    cmds = []
+    cwds = []
+    for repo, remote in repos:
+        for remote_ in repo.get_remotes(with_urls_only=True) \
+                if fetch_all else [remote]:
+            fetch_url = repo.config.get(
+                'remote.%s.fetchurl' % remote_,
+                repo.config.get('remote.%s.url' % remote_, None))
+            if fetch_url is None:
+                lgr.debug("Remote %s has no URL", remote_)
+                continue
+            if is_ssh(fetch_url):
+                ssh_manager.get_connection(fetch_url).open()
+            # prune to not accumulate a mess over time
+            cmds.append(['git', 'fetch', '--prune', remote_])
+            cwds.append(repo.path)
+    lgr.info("Fetching %d remotes of %d datasets", len(cmds), len(repos))
+    results = AsyncGitRunner().run_many(
+        cmds, jobs=jobs, cwds=cwds, expect_stderr=True,
+        return_exceptions=True)
+    return {cwd: res for cwd, res in zip(cwds, results)
+            if isinstance(res, Exception)}
+
+
 def _update_repo(ds, remote, reobtain_data):
     repo = ds.repo
 
@@ -12,6 +12,7 @@
 
 __docformat__ = 'restructuredtext'
 
+import json
 import msgpack
 import os
 import sys
@@ -45,15 +46,22 @@ class DownloaderSession(object):
     .download method
     """
 
-    def __init__(self, size=None, filename=None, url=None, headers=None):
+    def __init__(self, size=None, filename=None, url=None, headers=None,
+                 offset=0):
         self.size = size
         self.filename = filename
         self.headers = headers
         self.url = url
+        # position within the content at which .download starts
+        self.offset = offset
 
     def download(self, f=None, pbar=None, size=None):
         raise NotImplementedError("must be implemented in subclases")
 
+    def close(self):
+        """Release any connection held for the download"""
+        pass
+
         # TODO: get_status ?
 
 
@@ -64,6 +72,9 @@ class BaseDownloader(object):
 
     _DEFAULT_AUTHENTICATOR = None
     _DOWNLOAD_SIZE_TO_VERIFY_AUTH = 10000
+    # whether interrupted downloads could be resumed, see
+    # get_resumed_downloader_session
+    _RESUMABLE = False
 
     def __init__(self, credential=None, authenticator=None):
         """
@@ -211,6 +222,50 @@ class BaseDownloader(object):
         # TODO: might better reside somewhere under .datalad/tmp or .git/datalad/tmp
         return filepath + ".datalad-download-temp"
 
+    @staticmethod
+    def _get_temp_download_status_filename(temp_filepath):
+        """Given a temp file of a download, return the one to record its status in
+
+        The status describes the version of the content being downloaded, so
+        an interrupted download could be resumed if it did not change.
+        """
+        return temp_filepath + ".status"
+
+    @staticmethod
+    def _get_download_resume_status(headers, status):
+        """Return a record to verify that a download could be resumed
+
+        Returns
+        -------
+        dict or None
+          None if the content could not be identified reliably enough (no
+          known size, or neither an ETag nor a modification time).
+        """
+        etag = headers.get('ETag') if headers else None
+        if not status.size or not (etag or status.mtime):
+            return None
+        return dict(size=status.size, mtime=status.mtime, etag=etag)
+
+    def get_resumed_downloader_session(self, url, offset, resume_status):
+        """Return a session to download content of the url starting at `offset`
+
+        Parameters
+        ----------
+        url : str
+        offset : int
+          Number of bytes already downloaded.
+        resume_status : dict
+          Record of the content those bytes were downloaded from, as
+          returned by `_get_download_resume_status`.
+
+        Returns
+        -------
+        DownloaderSession or None
+          None if downloads cannot be resumed.  The `offset` of the session
+          is 0 if the entire content is provided (e.g. since it changed).
+        """
+        return None
+
     @abstractmethod
     def get_downloader_session(self, url):
         """
@@ -300,16 +355,43 @@ class BaseDownloader(object):
 
         # FETCH CONTENT
         # TODO: pbar = ui.get_progressbar(size=response.headers['size'])
+        temp_filepath = self._get_temp_download_filename(filepath)
+        status_filepath = self._get_temp_download_status_filename(temp_filepath)
+        # whether to keep the temp file on failure, to resume the download
+        keep_temp = False
         try:
-            temp_filepath = self._get_temp_download_filename(filepath)
+            # only entire content could be resumed
+            resume_status = self._get_download_resume_status(
+                downloader_session.headers, status) \
+                if self._RESUMABLE and size is None else None
+            keep_temp = bool(resume_status)
+            offset = 0
             if exists(temp_filepath):
-                # eventually we might want to continue the download
-                lgr.warning(
-                    "Temporary file %s from the previous download was found. "
-                    "It will be overriden" % temp_filepath)
-                # TODO.  also logic below would clean it up atm
-
-            with open(temp_filepath, 'wb') as fp:
+                offset = self._get_download_resume_offset(
+                    temp_filepath, status_filepath, resume_status)
+                if offset:
+                    # the content will come with another request
+                    downloader_session.close()
+                    resumed_session = self.get_resumed_downloader_session(
+                        url, offset, resume_status)
+                    if resumed_session is None:
+                        offset = 0
+                        downloader_session = self.get_downloader_session(url)
+                    else:
+                        downloader_session = resumed_session
+                        offset = resumed_session.offset
+                if offset:
+                    lgr.info("Resuming download of %s at %d bytes",
+                             url, offset)
+                else:
+                    lgr.warning(
+                        "Temporary file %s from the previous download was found. "
+                        "It will be overriden" % temp_filepath)
+            if resume_status and not offset:
+                with open(status_filepath, 'w') as f:
+                    json.dump(resume_status, f)
+
+            with open(temp_filepath, 'ab' if offset else 'wb') as fp:
                 # TODO: url might be a bit too long for the beast.
                 # Consider to improve to make it animated as well, or shorten here
                 pbar = ui.get_progressbar(label=url, fill_text=filepath, total=target_size)
@@ -334,9 +416,13 @@ class BaseDownloader(object):
             if stats:
                 stats.downloaded += 1
                 stats.overwritten += int(existed)
-                stats.downloaded_size += downloaded_size
+                # only what was fetched now, not the resumed part
+                stats.downloaded_size += downloaded_size - offset
                 stats.downloaded_time += downloaded_time
         except (AccessDeniedError, IncompleteDownloadError) as e:
+            # only an interrupted download could be continued
+            keep_temp = keep_temp and \
+                type(e) is IncompleteDownloadError
             raise
         except Exception as e:
             e_str = exc_str(e, limit=5)
@@ -345,13 +431,43 @@ class BaseDownloader(object):
             ))
             raise DownloadError(exc_str(e))  # for now
         finally:
-            if exists(temp_filepath):
-                # clean up
-                lgr.debug("Removing a temporary download %s", temp_filepath)
-                os.unlink(temp_filepath)
+            if keep_temp and exists(temp_filepath) \
+                    and os.stat(temp_filepath).st_size:
+                lgr.info("Keeping a temporary download %s to resume it later",
+                         temp_filepath)
+            else:
+                for fpath in (temp_filepath, status_filepath):
+                    if exists(fpath):
+                        # clean up
+                        lgr.debug("Removing a temporary download %s", fpath)
+                        os.unlink(fpath)
 
         return filepath
 
+    @staticmethod
+    def _get_download_resume_offset(temp_filepath, status_filepath,
+                                    resume_status):
+        """Return the number of bytes of a previous download to resume from
+
+        It is 0 if the content of the previous download is unknown or differs
+        from `resume_status`, or if it was already complete.
+        """
+        if not resume_status or not exists(status_filepath):
+            return 0
+        try:
+            with open(status_filepath) as f:
+                previous_status = json.load(f)
+        except (IOError, OSError, ValueError) as exc:
+            lgr.debug("Failed to load status of the previous download from "
+                      "%s: %s", status_filepath, exc_str(exc))
+            return 0
+        if previous_status != resume_status:
+            lgr.debug("Content changed since the previous download: %s != %s",
+                      previous_status, resume_status)
+            return 0
+        offset = os.stat(temp_filepath).st_size
+        return offset if offset < resume_status['size'] else 0
+
     def download(self, url, path=None, **kwargs):
         """Fetch content as pointed by the URL optionally into a file
 
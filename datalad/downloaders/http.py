@@ -17,6 +17,7 @@ import requests.auth
 # from urllib3.exceptions import MaxRetryError, NewConnectionError
 
 import io
+from email.utils import formatdate
 from six import BytesIO
 from time import sleep
 
@@ -82,7 +83,8 @@ def check_response_status(response, err_prefix="", session=None):
         raise DownloadError(err_prefix + "not found")
     elif 400 <= response.status_code < 500:
         raise AccessDeniedError(err_msg)
-    elif response.status_code in {200}:
+    elif response.status_code in {200, 206}:
+        # 206 - partial content, as requested with a Range
         pass
     elif response.status_code in {301, 302, 307}:
         # TODO: apparently tests do not excercise this one yet
@@ -296,13 +298,18 @@ class HTTPDigestAuthAuthenticator(HTTPRequestsAuthenticator):
 @auto_repr
 class HTTPDownloaderSession(DownloaderSession):
     def __init__(self, size=None, filename=None,  url=None, headers=None,
-                 response=None, chunk_size=1024 ** 2):
+                 response=None, chunk_size=1024 ** 2, offset=0):
         super(HTTPDownloaderSession, self).__init__(
             size=size, filename=filename, url=url, headers=headers,
+            offset=offset,
         )
         self.chunk_size = chunk_size
         self.response = response
 
+    def close(self):
+        if self.response is not None:
+            self.response.close()
+
     def download(self, f=None, pbar=None, size=None):
         response = self.response
         # content_gzipped = 'gzip' in response.headers.get('content-encoding', '').split(',')
@@ -355,7 +362,7 @@ class HTTPDownloaderSession(DownloaderSession):
                 try:
                     # TODO: pbar is not robust ATM against > 100% performance ;)
                     if pbar:
-                        pbar.update(total)
+                        pbar.update(self.offset + total)
                 except Exception as e:
                     lgr.warning("Failed to update progressbar: %s" % exc_str(e))
                 # TEMP
@@ -374,6 +381,8 @@ class HTTPDownloader(BaseDownloader):
     """A stateful downloader to maintain a session to the website
     """
 
+    _RESUMABLE = True
+
     @borrowkwargs(BaseDownloader)
     def __init__(self, **kwargs):
         super(HTTPDownloader, self).__init__(**kwargs)
@@ -465,6 +474,34 @@ class HTTPDownloader(BaseDownloader):
             response=response
         )
 
+    def get_resumed_downloader_session(self, url, offset, resume_status):
+        # Range request which is served only if the content is still the same,
+        # the entire content is provided otherwise
+        validator = resume_status.get('etag')
+        if not validator or validator.startswith('W/'):
+            # weak ETags cannot be used for ranges
+            validator = formatdate(resume_status['mtime'], usegmt=True) \
+                if resume_status.get('mtime') else None
+        if not validator:
+            return None
+        downloader_session = self.get_downloader_session(
+            url,
+            headers={'Range': 'bytes=%d-' % offset, 'If-Range': validator})
+        if downloader_session.response.status_code != 206:
+            lgr.debug("Server provided the entire content of %s instead of "
+                      "the requested range", url)
+            return downloader_session
+        content_range = re.match(
+            r'bytes (\d+)-\d+/(\d+|\*)$',
+            downloader_session.headers.get('Content-Range', ''))
+        if not content_range or int(content_range.group(1)) != offset:
+            lgr.debug("Unexpected range of %s provided: %s", url,
+                      downloader_session.headers.get('Content-Range'))
+            downloader_session.close()
+            return None
+        downloader_session.offset = offset
+        return downloader_session
+
     @classmethod
     def get_status_from_headers(cls, headers):
         """Given HTTP headers, return 'status' record to assess later if link content was changed
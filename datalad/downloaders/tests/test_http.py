@@ -12,6 +12,7 @@ import time
 from calendar import timegm
 from six import PY3
 
+import json
 import os
 import six.moves.builtins as __builtin__
 from os.path import join as opj
@@ -23,7 +24,9 @@ from ..base import BaseDownloader
 from ..credentials import UserPassword
 from ..http import HTMLFormAuthenticator
 from ..http import HTTPDownloader
+from ..http import HTTPDownloaderSession
 from ...support.network import get_url_straight_filename
+from ...support.stats import ActivityStats
 from ...tests.utils import with_fake_cookies_db
 from ...tests.utils import skip_if_no_network
 from ...tests.utils import with_testsui
@@ -41,12 +44,14 @@ except ImportError:
     httpretty = NoHTTPPretty()
 
 from mock import patch
+from mock import Mock
 from ...tests.utils import SkipTest
 from ...tests.utils import assert_in
 from ...tests.utils import assert_not_in
 from ...tests.utils import assert_equal
 from ...tests.utils import assert_greater
 from ...tests.utils import assert_false
+from ...tests.utils import assert_true
 from ...tests.utils import assert_raises
 from ...tests.utils import ok_file_has_content
 from ...tests.utils import serve_path_via_http, with_tree
@@ -229,6 +234,82 @@ def test_download_ftp():
           "This is ftp.gnu.org"
 
 
+@with_tree(tree=[('file.dat', 'abcdef')])
+@serve_path_via_http
+def test_HTTPDownloader_resume(toppath, topurl):
+    furl = "%sfile.dat" % topurl
+    tfpath = opj(toppath, "file-downloaded.dat")
+    temp_fpath = BaseDownloader._get_temp_download_filename(tfpath)
+    status_fpath = BaseDownloader._get_temp_download_status_filename(temp_fpath)
+    downloader = HTTPDownloader()
+
+    def _interrupted_download(self, f=None, pbar=None, size=None):
+        f.write(b'abc')
+        raise IOError("connection reset")
+
+    with swallow_logs(), \
+            patch.object(HTTPDownloaderSession, 'download', _interrupted_download):
+        assert_raises(DownloadError, downloader.download, furl, tfpath)
+    # partial download is kept along with the status of its content
+    ok_file_has_content(temp_fpath, 'abc')
+    assert_false(os.path.exists(tfpath))
+    with open(status_fpath) as f:
+        resume_status = json.load(f)
+    assert_equal(resume_status['size'], 6)
+    assert_equal(
+        BaseDownloader._get_download_resume_offset(
+            temp_fpath, status_fpath, resume_status),
+        3)
+    # but not if content changed
+    assert_equal(
+        BaseDownloader._get_download_resume_offset(
+            temp_fpath, status_fpath, dict(resume_status, size=7)),
+        0)
+
+    # a server honoring the range
+    session = HTTPDownloaderSession(
+        size=3, headers={'Content-Range': 'bytes 3-5/6'},
+        response=Mock(status_code=206))
+    with patch.object(HTTPDownloader, 'get_downloader_session',
+                      return_value=session) as get_session:
+        assert_true(
+            downloader.get_resumed_downloader_session(
+                furl, 3, resume_status) is session)
+        assert_equal(session.offset, 3)
+        assert_equal(get_session.call_args[1]['headers']['Range'], 'bytes=3-')
+        assert_in('If-Range', get_session.call_args[1]['headers'])
+
+    # a resumed download fetches only the rest, after the response to the
+    # initial request was closed
+    def _rest_download(self, f=None, pbar=None, size=None):
+        f.write(b'def')
+
+    resumed_session = HTTPDownloaderSession(size=3, offset=3)
+    stats = ActivityStats()
+    with patch.object(HTTPDownloaderSession, 'close') as close, \
+            patch.object(HTTPDownloaderSession, 'download', _rest_download), \
+            patch.object(HTTPDownloader, 'get_resumed_downloader_session',
+                         return_value=resumed_session):
+        downloader.download(furl, tfpath, stats=stats)
+        assert_true(close.called)
+    ok_file_has_content(tfpath, 'abcdef')
+    assert_equal(stats.downloaded_size, 3)
+    assert_false(os.path.exists(temp_fpath))
+    assert_false(os.path.exists(status_fpath))
+    os.unlink(tfpath)
+
+    # this test server provides the entire content instead of the range
+    with swallow_logs(), \
+            patch.object(HTTPDownloaderSession, 'download', _interrupted_download):
+        assert_raises(DownloadError, downloader.download, furl, tfpath)
+    stats = ActivityStats()
+    downloader.download(furl, tfpath, stats=stats)
+    ok_file_has_content(tfpath, 'abcdef')
+    assert_equal(stats.downloaded_size, 6)
+    assert_false(os.path.exists(temp_fpath))
+    assert_false(os.path.exists(status_fpath))
+
+
 # TODO: redo smart way with mocking, to avoid unnecessary CPU waste
 @with_tree(tree={'file.dat': '1'})
 @serve_path_via_http
@@ -35,6 +35,7 @@ from ..support.param import Parameter
 from ..support.constraints import EnsureStr, EnsureNone
 
 from ..support.annexrepo import AnnexRepo
+from ..support.archives import _get_tar_compression
 from ..support.strings import apply_replacement_rules
 from ..support.stats import ActivityStats
 from ..cmdline.helpers import get_repo_instance
@@ -295,6 +296,11 @@ class AddArchiveContent(Interface):
         # We will move extracted content so it must not exist prior running
         annexarchive.cache.allow_existing = True
         earchive = annexarchive.cache[key_rpath]
+        # index the archive's members, unless that would need another
+        # decompression pass, so the special remote can later provide
+        # single files without extracting the entire archive again
+        if _get_tar_compression(opj(annex_path, key_rpath)) is None:
+            earchive.get_index()
 
         # TODO: check if may be it was already added
         if ARCHIVES_SPECIAL_REMOTE not in annex.get_remotes():
@@ -531,7 +537,8 @@ class AddArchiveContent(Interface):
                     rmtree(delete_after_path)
 
             annex.always_commit = old_always_commit
-            # remove what is left and/or everything upon failure
-            earchive.clean(force=True)
+            # remove what is left and/or everything upon failure, but keep
+            # the index of the archive
+            earchive.clean(force=True, keep_index=True)
 
         return annex
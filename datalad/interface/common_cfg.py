@@ -58,6 +58,13 @@ definitions = {
         'destination': 'global',
         'default': opj(dirs.user_config_dir, 'plugins'),
     },
+    'datalad.archives.cache-size': {
+        'ui': ('question', {
+               'title': 'Maximum size of the extracted archives cache (in MB)',
+               'text': 'Archives extracted by the datalad-archives special remote are kept across sessions. Least recently used ones are removed whenever the cache exceeds this size. Set to 0 for no limit'}),
+        'default': 0,
+        'type': EnsureInt(),
+    },
     'datalad.exc.str.tblimit': {
         'ui': ('question', {
                'title': 'This flag is used by the datalad extract_tb function which extracts and formats stack-traces. It caps the number of lines to DATALAD_EXC_STR_TBLIMIT of pre-processed entries from traceback.'}),
@@ -238,6 +245,27 @@ definitions = {
         'type': EnsureChoice('all', 'datasets', 'files'),
         'default': 'datasets',
     },
+    'datalad.metadata.aggregate-content-format': {
+        'ui': ('question', {
+               'title': 'Aggregated content metadata object format',
+               'text': "Format of newly aggregated content metadata objects. 'xzstream' is a single XZ-compressed JSON stream that needs to be decompressed as a whole. 'indexed' uses independently compressed blocks with an index, to read the metadata of individual files of large datasets quickly, but it cannot be read by older DataLad versions"}),
+        'type': EnsureChoice('xzstream', 'indexed'),
+        'default': 'xzstream',
+    },
+    'datalad.metadata.objcache-size': {
+        'ui': ('question', {
+               'title': 'Maximum number of cached metadata objects (per process)',
+               'text': 'Loaded aggregated metadata objects are kept in memory to speed up repeated queries. Set to 0 to disable caching'}),
+        'default': 32,
+        'type': EnsureInt(),
+    },
+    'datalad.metadata.extractor-cache': {
+        'ui': ('question', {
+               'title': 'Cache per-file metadata extractor results',
+               'text': 'If enabled, content metadata reported by extractors that support it are cached under the DataLad cache location, keyed on the annex key or git blob SHA of a file, and reused on subsequent extraction from identical content'}),
+        'type': EnsureBool(),
+        'default': True,
+    },
     'datalad.metadata.create-aggregate-annex-limit': {
         'ui': ('question', {
                'title': 'Limit configuration annexing aggregated metadata in new dataset',
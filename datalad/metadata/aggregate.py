@@ -13,6 +13,7 @@ __docformat__ = 'restructuredtext'
 
 import logging
 import os
+import threading
 from os import makedirs
 from os import listdir
 from os.path import join as opj
@@ -21,11 +22,16 @@ from os.path import relpath
 from os.path import isabs
 from os.path import exists
 from os.path import lexists
+from os.path import basename
+from os.path import getsize
+from os.path import islink
+from os.path import samefile
 from os.path import curdir
 from os.path import normpath
 
 from hashlib import md5
 import shutil
+import tempfile
 
 import datalad
 from datalad.interface.annotate_paths import AnnotatePaths
@@ -37,6 +43,7 @@ from datalad.interface.unlock import Unlock
 from datalad.interface.base import build_doc
 from datalad.interface.common_opts import recursion_limit, recursion_flag
 from datalad.interface.common_opts import nosave_opt
+from datalad.interface.common_opts import jobs_opt
 from datalad.interface.results import get_status_dict
 from datalad.distribution.dataset import Dataset
 from datalad.distribution.get import Get
@@ -44,6 +51,7 @@ from datalad.distribution.remove import Remove
 from datalad.distribution.subdatasets import Subdatasets
 from datalad.metadata.metadata import agginfo_relpath
 from datalad.metadata.metadata import exclude_from_metadata
+from datalad.metadata.metadata import indexed_obj_suffix
 from datalad.metadata.metadata import get_metadata_type
 from datalad.metadata.metadata import _load_json_object
 from datalad.metadata.metadata import _get_metadata
@@ -58,14 +66,24 @@ from datalad.support.constraints import EnsureChoice
 from datalad.support.gitrepo import GitRepo
 from datalad.support.annexrepo import AnnexRepo
 from datalad.support import json_py
+from datalad.support.parallel import get_jobs
+from datalad.support.parallel import process_tree
 
+from datalad.distribution.utils import get_git_dir
 from datalad.utils import path_startswith
 from datalad.utils import path_is_subpath
 from datalad.utils import assure_list
+from datalad.utils import nothing_cm
+from datalad.dochelpers import exc_str
+
+from git.exc import GitCommandError
 
 
 lgr = logging.getLogger('datalad.metadata.aggregate')
 
+# state of the git-annex metadata logs of a dataset, within its git dir
+ANNEXMET_CACHE_DOTGITDIR = opj('datalad', 'metadata', 'annexmet.json')
+
 # TODO filepath_info is obsolete
 location_keys = ('dataset_info', 'content_info', 'filepath_info')
 
@@ -133,7 +151,167 @@ def _get_dsinfo_from_aggmetadata(ds_path, path, recursive, db):
     return hits
 
 
-def _extract_metadata(agginto_ds, aggfrom_ds, db, to_save):
+def _get_content_tree_digest(ds, subds_relpaths):
+    """Return a digest of the committed metadata-relevant content
+
+    The digest covers the git objects (from HEAD) of all paths considered
+    by `_get_latest_refcommit()`, hence changes whenever any content
+    relevant for metadata extraction changes.  Only the trees leading to
+    excluded paths (e.g. subdatasets) are listed, nothing else is
+    traversed.
+
+    Returns
+    -------
+    str or None
+      None if there is no such content (or no commit at all).
+    """
+    exclude = [p.replace(os.sep, '/')
+               for p in list(exclude_from_metadata) + subds_relpaths]
+    git = ds.repo.repo.git
+    entries = []
+    todo = ['']
+    while todo:
+        base = todo.pop()
+        try:
+            out = git.ls_tree('HEAD:{}'.format(base), z=True)
+        except GitCommandError:
+            # no commit yet
+            return None
+        for line in out.strip('\0').split('\0') if out else []:
+            props, name = line.split('\t', 1)
+            rp = '{}/{}'.format(base, name) if base else name
+            if rp in exclude:
+                continue
+            elif any(ep.startswith(rp + '/') for ep in exclude):
+                todo.append(rp)
+            else:
+                entries.append('{} {}'.format(props.split()[2], rp))
+    if not entries:
+        return None
+    return md5('\n'.join(sorted(entries)).encode()).hexdigest()
+
+
+def _get_annex_metadata_digest(ds):
+    """Return a digest of all git-annex metadata logs of a dataset
+
+    The git-annex branch changes with any change of content availability,
+    so only the blobs of its metadata logs (``*.log.met``) are considered.
+    The blobs of these logs, as of the last state of the git-annex branch
+    seen, are kept in the git dir of the dataset, and updated from the
+    difference to the current state, so the entire branch only needs to be
+    listed once.
+
+    Returns
+    -------
+    str
+      Empty if there is no git-annex metadata at all.
+    """
+    git = ds.repo.repo.git
+    try:
+        annex_sha = git.rev_parse('--verify', '-q', 'git-annex')
+    except GitCommandError:
+        return ''
+    cache_fname = opj(ds.path, get_git_dir(ds.path), ANNEXMET_CACHE_DOTGITDIR)
+    try:
+        cached = json_py.load(cache_fname, fixup=False)
+        cached_sha, metlogs = cached['annex_sha'], cached['metlogs']
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        cached_sha, metlogs = None, None
+    if cached_sha != annex_sha:
+        metlogs = _update_annex_metadata_logs(git, cached_sha, annex_sha, metlogs)
+        try:
+            if not exists(dirname(cache_fname)):
+                makedirs(dirname(cache_fname))
+            # write to a temporary file and rename, so any concurrent
+            # process would see either the previous or the complete state
+            fd, tmpfname = tempfile.mkstemp(
+                dir=dirname(cache_fname), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                json_py.dump2fileobj(
+                    dict(annex_sha=annex_sha, metlogs=metlogs), f)
+            os.rename(tmpfname, cache_fname)
+        except (IOError, OSError) as e:
+            # just a cache
+            lgr.debug('Failed to cache git-annex metadata logs: %s', exc_str(e))
+    if not metlogs:
+        return ''
+    return md5('\n'.join(
+        '{} {}'.format(metlogs[p], p) for p in sorted(metlogs)).encode()
+    ).hexdigest()
+
+
+def _update_annex_metadata_logs(git, from_sha, to_sha, metlogs):
+    """Return {path: blob sha} of the metadata logs in the git-annex branch
+
+    The mapping `metlogs`, as of `from_sha`, is updated with the difference
+    to `to_sha`.  Without it, or if that difference cannot be determined
+    (e.g. the branch was rewritten and `from_sha` is gone), the whole tree
+    of `to_sha` is listed.
+    """
+    if from_sha and metlogs is not None:
+        try:
+            out = git.diff_tree(
+                '-r', '-z', '--no-renames', from_sha, to_sha,
+                '--', '*.log.met')
+        except GitCommandError as e:
+            lgr.debug('Cannot update git-annex metadata logs from %s: %s',
+                      from_sha, exc_str(e))
+        else:
+            fields = out.split('\0') if out else []
+            # pairs of ':<modes> <shas> <status>' and path
+            for props, path in zip(fields[0::2], fields[1::2]):
+                if not path.endswith('.log.met'):
+                    continue
+                props = props.split()
+                if props[4] == 'D':
+                    metlogs.pop(path, None)
+                else:
+                    metlogs[path] = props[3]
+            return metlogs
+    metlogs = {}
+    out = git.ls_tree(to_sha, z=True, r=True)
+    for line in out.split('\0') if out else []:
+        if not line.endswith('.log.met'):
+            continue
+        props, path = line.split('\t', 1)
+        metlogs[path] = props.split()[2]
+    return metlogs
+
+
+def _get_config_digest(agginto_ds, aggfrom_ds, nativetypes):
+    """Return a digest of the effective configuration affecting aggregation
+
+    Covers all settings of `aggfrom_ds` that influence what metadata gets
+    extracted, and the settings of both datasets that determine what and
+    how it gets stored.
+    """
+    cfgs = []
+    for ds in (aggfrom_ds, agginto_ds):
+        cfgs.extend([
+            ds.config.obtain(
+                'datalad.metadata.store-aggregate-content',
+                default=True,
+                valtype=EnsureBool()),
+            ds.config.obtain('datalad.metadata.aggregate-content-format'),
+        ])
+    cfgs.extend([
+        sorted(assure_list(aggfrom_ds.config.obtain(
+            'datalad.metadata.aggregate-ignore-fields',
+            default=[]))),
+        aggfrom_ds.config.obtain('datalad.metadata.maxfieldsize'),
+    ])
+    for mtype in nativetypes:
+        for scope in ('dataset', 'content'):
+            cfgs.append(aggfrom_ds.config.obtain(
+                'datalad.metadata.aggregate-{}-{}'.format(
+                    scope, mtype.replace('_', '-')),
+                default=True,
+                valtype=EnsureBool()))
+    return md5(repr(cfgs).encode()).hexdigest()
+
+
+def _extract_metadata(agginto_ds, aggfrom_ds, db, to_save, jobs=None,
+                      agginto_lock=None, prev_agginfos=None):
     """Dump metadata from a dataset into object in the metadata store of another
 
     Info on the metadata objects is placed into a DB dict under the
@@ -144,31 +322,64 @@ def _extract_metadata(agginto_ds, aggfrom_ds, db, to_save):
     agginto_ds : Dataset
     aggfrom_ds : Dataset
     db : dict
+    jobs : int or 'auto' or None, optional
+      Number of processes to extract content metadata with.
+    agginto_lock : Lock, optional
+      If provided, it is held while metadata objects are written into
+      `agginto_ds`, so metadata of multiple datasets could be extracted
+      concurrently.
+    prev_agginfos : dict, optional
+      Aggregate info currently stored in `agginto_ds`.  If the record for
+      `aggfrom_ds` has the same fingerprint as the current state of that
+      dataset, and its objects are available, it is reused without
+      extracting anything.
     """
     subds_relpaths = aggfrom_ds.subdatasets(result_xfm='relpaths', return_type='list')
+    nativetypes = ['datalad_core', 'annex'] + assure_list(get_metadata_type(aggfrom_ds))
+    # our own dataset-global metadata
+    dsmetafile = opj(aggfrom_ds.path, '.datalad', 'metadata', 'dataset.json')
+    dsmeta_digest = md5(open(dsmetafile, 'r').read().encode()).hexdigest() \
+        if exists(dsmetafile) else ''
+    # potential annex-based metadata
+    # if there is no annex metadata, this will come out empty,
+    # hence hash would be same as for a plain GitRepo
+    annexmeta_digest = _get_annex_metadata_digest(aggfrom_ds) \
+        if isinstance(aggfrom_ds.repo, AnnexRepo) and \
+        aggfrom_ds.config.obtain(
+            'datalad.metadata.aggregate-content-datalad-core',
+            default=True,
+            valtype=EnsureBool()) else ''
+    # cheap fingerprint of everything metadata extraction depends on, to
+    # be able to tell quickly whether anything changed since the last
+    # aggregation
+    fingerprint = md5(u'\n'.join(
+        [datalad.__version__,
+         ' '.join(nativetypes),
+         _get_content_tree_digest(aggfrom_ds, subds_relpaths) or '',
+         dsmeta_digest,
+         annexmeta_digest,
+         _get_config_digest(agginto_ds, aggfrom_ds, nativetypes)]).encode()).hexdigest()
+    prev_agginfo = (prev_agginfos or {}).get(
+        relpath(aggfrom_ds.path, start=agginto_ds.path), {})
+    if prev_agginfo.get('fingerprint') == fingerprint:
+        agginfo_basepath = opj(agginto_ds.path, dirname(agginfo_relpath))
+        agginfo = {k: opj(agginfo_basepath, v) if k in location_keys else v
+                   for k, v in prev_agginfo.items()}
+        if all(lexists(agginfo[k]) for k in location_keys if k in agginfo):
+            lgr.debug(
+                'Metadata of %s did not change since last aggregation into '
+                '%s, skip extraction', aggfrom_ds, agginto_ds)
+            db[aggfrom_ds.path] = agginfo
+            return False
+
     # figure out a "state" of the dataset wrt its metadata that we are describing
     # 1. the latest commit that changed any file for which we could have native metadata
     refcommit = _get_latest_refcommit(aggfrom_ds, subds_relpaths)
     objid = refcommit if refcommit else ''
     # 2, our own dataset-global metadata
-    dsmetafile = opj(aggfrom_ds.path, '.datalad', 'metadata', 'dataset.json')
-    if exists(dsmetafile):
-        objid += md5(open(dsmetafile, 'r').read().encode()).hexdigest()
+    objid += dsmeta_digest
     # 3. potential annex-based metadata
-    if isinstance(aggfrom_ds, AnnexRepo) and \
-            aggfrom_ds.config.obtain(
-                'datalad.metadata.aggregate-content-datalad-core',
-                default=True,
-                valtype=EnsureBool()):
-        # if there is no annex metadata, this will come out empty,
-        # hence hash would be same as for a plain GitRepo
-        # and no, we cannot use the shasum of the annex branch,
-        # because this will change even when no metadata has changed
-        timestamps, _ = aggfrom_ds.repo._run_annex_command(
-            'metadata',
-            '.',
-            '-g', 'lastchanged')
-        objid += timestamps.strip()
+    objid += annexmeta_digest
 
     if not objid:
         lgr.debug('%s has no metadata-relevant content', aggfrom_ds)
@@ -182,6 +393,7 @@ def _extract_metadata(agginto_ds, aggfrom_ds, db, to_save):
     if aggfrom_ds.id:
         agginfo['id'] = aggfrom_ds.id
     agginfo['refcommit'] = refcommit
+    agginfo['fingerprint'] = fingerprint
     # put in DB
     db[aggfrom_ds.path] = agginfo
 
@@ -193,7 +405,6 @@ def _extract_metadata(agginto_ds, aggfrom_ds, db, to_save):
     # if there is any chance for metadata
     # obtain metadata for dataset and content
     relevant_paths = sorted(_get_metadatarelevant_paths(aggfrom_ds, subds_relpaths))
-    nativetypes = ['datalad_core', 'annex'] + assure_list(get_metadata_type(aggfrom_ds))
     agginfo['extractors'] = nativetypes
     agginfo['datalad_version'] = datalad.__version__
     dsmeta, contentmeta, errored = _get_metadata(
@@ -203,7 +414,8 @@ def _extract_metadata(agginto_ds, aggfrom_ds, db, to_save):
         # on by default
         global_meta=None,
         content_meta=None,
-        paths=relevant_paths)
+        paths=relevant_paths,
+        jobs=jobs)
 
     # inject the info which commmit we are describing into the core metadata
     # this is done here in order to avoid feeding it all the way down
@@ -220,6 +432,10 @@ def _extract_metadata(agginto_ds, aggfrom_ds, db, to_save):
 
     # do not store content metadata if either the source or the target dataset
     # do not want it
+    content_store = json_py.dump2indexedxzstream \
+        if agginto_ds.config.obtain(
+            'datalad.metadata.aggregate-content-format') == 'indexed' \
+        else json_py.dump2xzstream
     if aggfrom_ds.config.obtain(
             'datalad.metadata.store-aggregate-content',
             default=True,
@@ -234,7 +450,7 @@ def _extract_metadata(agginto_ds, aggfrom_ds, db, to_save):
             # sort by path key to get deterministic dump content
             (dict(contentmeta[k], path=k) for k in sorted(contentmeta)),
             agginto_ds,
-            json_py.dump2xzstream))
+            content_store))
 
     # for both types of metadata
     for label, mtype, meta, dest, store in metasources:
@@ -244,19 +460,21 @@ def _extract_metadata(agginto_ds, aggfrom_ds, db, to_save):
         objrelpath = _get_obj_location(objid, label)
         if store is json_py.dump2xzstream:
             objrelpath += '.xz'
+        elif store is json_py.dump2indexedxzstream:
+            objrelpath += indexed_obj_suffix
         # place metadata object into the source dataset
         objpath = opj(dest.path, dirname(agginfo_relpath), objrelpath)
 
         # write obj files
-        if exists(objpath):
-            dest.unlock(objpath)
-        elif lexists(objpath):
-            # if it gets here, we have a symlink that is pointing nowhere
-            # kill it, to be replaced with the newly aggregated content
-            dest.repo.remove(objpath)
-        # TODO actually dump a compressed file when annexing is possible
-        # to speed up on-demand access
-        store(meta, objpath)
+        with agginto_lock or nothing_cm():
+            if lexists(objpath):
+                # replace, rather than unlock and overwrite, the file could
+                # be a hardlink to an object in another dataset (see
+                # `_link_or_copy()`)
+                os.remove(objpath)
+            # TODO actually dump a compressed file when annexing is possible
+            # to speed up on-demand access
+            store(meta, objpath)
         # stage for dataset.save()
         to_save.append(dict(path=objpath, type='file'))
 
@@ -342,6 +560,54 @@ def _get_obj_location(hash_str, ref_type):
             hash_str[2:]))
 
 
+def _is_same_object(src, dst):
+    """Whether a metadata object file at `dst` is identical to `src`
+
+    Annexed objects are compared by their key, without the need to have
+    their content.  Otherwise identical files (hardlinks) are detected, and
+    only files of the same size get their content compared.
+    """
+    if not lexists(dst):
+        return False
+    if islink(src) and islink(dst):
+        # key is the last component of an annex symlink target
+        return basename(os.readlink(src)) == basename(os.readlink(dst))
+    if not (exists(src) and exists(dst)):
+        return False
+    if samefile(src, dst):
+        return True
+    if getsize(src) != getsize(dst):
+        return False
+    return _get_file_md5(src) == _get_file_md5(dst)
+
+
+def _get_file_md5(fpath):
+    digest = md5()
+    with open(fpath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _link_or_copy(src, dst):
+    """Hardlink `src` to `dst`, or copy it, if that is not possible
+
+    Metadata objects are never modified in place (see
+    `_extract_metadata()`), so all datasets in a hierarchy on the same
+    filesystem can share a single copy.  Annexed content is always copied,
+    as the annex of the source dataset owns its object files.
+    """
+    if islink(src):
+        shutil.copy(src, dst)
+        return
+    try:
+        os.link(src, dst)
+    except (OSError, AttributeError) as e:
+        # different filesystems, no hardlink support, or no os.link at all
+        lgr.log(5, 'Cannot hardlink %s, copying it: %s', src, exc_str(e))
+        shutil.copy(src, dst)
+
+
 def _update_ds_agginfo(refds_path, ds_path, subds_paths, incremental, agginfo_db, to_save):
     """Perform metadata aggregation for ds and a given list of subdataset paths
 
@@ -376,6 +642,8 @@ def _update_ds_agginfo(refds_path, ds_path, subds_paths, incremental, agginfo_db
     # load existing aggregate info dict
     # TODO take from cache, once used in _get_dsinfo_from_aggmetadata()
     ds_agginfos = _load_json_object(agginfo_fpath)
+    # records are replaced below, never modified
+    ds_agginfos_was = dict(ds_agginfos)
     # object locations referenced initially
     objlocs_was = set(ai[k]
                       for ai in ds_agginfos.values()
@@ -461,14 +729,16 @@ def _update_ds_agginfo(refds_path, ds_path, subds_paths, incremental, agginfo_db
             # is already committed
             to_save.append(dict(path=ds_path, type='dataset', staged=True))
 
-    # must copy object files to local target destination
+    # must copy object files to local target destination, unless an
+    # identical object is already there
+    objs2copy = [(f, t) for f, t in objs2copy
+                 if t != f and not _is_same_object(f, t)]
     # make sure those objects are present
     # use the reference dataset to resolve paths, as they might point to
     # any location in the dataset tree
-    Dataset(refds_path).get([f for f, t in objs2copy], result_renderer='disabled')
+    if objs2copy:
+        Dataset(refds_path).get([f for f, t in objs2copy], result_renderer='disabled')
     for copy_from, copy_to in objs2copy:
-        if copy_to == copy_from:
-            continue
         target_dir = dirname(copy_to)
         if not exists(target_dir):
             makedirs(target_dir)
@@ -477,9 +747,10 @@ def _update_ds_agginfo(refds_path, ds_path, subds_paths, incremental, agginfo_db
         if lexists(copy_to):
             # no need to unlock, just wipe out and replace
             os.remove(copy_to)
-        shutil.copy(copy_from, copy_to)
-    to_save.append(
-        dict(path=agginfo_fpath, type='file', staged=True))
+        _link_or_copy(copy_from, copy_to)
+    # only objects that were (re)placed, or are not yet known, need adding
+    objs2add = objlocs_is.difference(objlocs_was).union(
+        relpath(t, start=agg_base_path) for f, t in objs2copy)
 
     if objs2add:
         # they are added standard way, depending on the repo type
@@ -491,7 +762,7 @@ def _update_ds_agginfo(refds_path, ds_path, subds_paths, incremental, agginfo_db
             [dict(path=opj(agg_base_path, p), type='file', staged=True)
              for p in objs2add])
     # write aggregate info file
-    if not ds_agginfos:
+    if not ds_agginfos or ds_agginfos == ds_agginfos_was:
         return
 
     json_py.dump(ds_agginfos, agginfo_fpath)
@@ -628,6 +899,7 @@ class AggregateMetaData(Interface):
             This is sueful when (re-)aggregation only a subset of a dataset hierarchy,
             for example, because not all subdatasets are locally available."""),
         save=nosave_opt,
+        jobs=jobs_opt,
     )
 
     @staticmethod
@@ -640,7 +912,8 @@ class AggregateMetaData(Interface):
             recursion_limit=None,
             update_mode='target',
             incremental=False,
-            save=True):
+            save=True,
+            jobs='auto'):
         refds_path = Interface.get_refds_path(dataset)
 
         # it really doesn't work without a dataset
@@ -653,6 +926,8 @@ class AggregateMetaData(Interface):
         agginfo_db = {}
         to_save = []
         to_aggregate = set()
+        # datasets to extract metadata from, in order of discovery
+        to_extract = []
         for ap in AnnotatePaths.__call__(
                 dataset=refds_path,
                 path=path,
@@ -715,23 +990,45 @@ class AggregateMetaData(Interface):
                     continue
                 # cue for aggregation
                 to_aggregate.update(res)
-            else:
-                # actually aggregate metadata for this dataset, immediately place
-                # generated objects into the aggregated or reference dataset,
-                # and put info into DB to get the distributed to all datasets
-                # that need to be updated
-                errored = _extract_metadata(
-                    ds,
-                    Dataset(aggsrc),
-                    agginfo_db,
-                    to_save)
-                if errored:
-                    yield get_status_dict(
-                        status='error',
-                        message='Metadata extraction failed (see previous error message, set datalad.runtime.raiseonerror=yes to fail immediately)',
-                        action='aggregate_metadata',
-                        path=aggsrc,
-                        logger=lgr)
+            elif aggsrc not in to_extract:
+                to_extract.append(aggsrc)
+
+        # actually aggregate metadata for these datasets, immediately place
+        # generated objects into the aggregated or reference dataset,
+        # and put info into DB to get the distributed to all datasets
+        # that need to be updated.
+        # Extraction from one dataset does not depend on any other, so with
+        # multiple jobs they are processed concurrently, and each one
+        # extracts content metadata sequentially
+        ds_jobs = get_jobs(jobs) if len(to_extract) > 1 else None
+        agginto_lock = threading.Lock() if ds_jobs else None
+        # to be able to skip extraction from datasets that did not change
+        prev_agginfos = _load_json_object(opj(ds.path, agginfo_relpath))
+
+        def _extract(aggsrc):
+            db = {}
+            ds_to_save = []
+            errored = _extract_metadata(
+                ds,
+                Dataset(aggsrc),
+                db,
+                ds_to_save,
+                jobs=None if ds_jobs else jobs,
+                agginto_lock=agginto_lock,
+                prev_agginfos=prev_agginfos)
+            return [(aggsrc, errored, db, ds_to_save)], []
+
+        for aggsrc, errored, db, ds_to_save in process_tree(
+                to_extract, _extract, jobs=ds_jobs):
+            agginfo_db.update(db)
+            to_save.extend(ds_to_save)
+            if errored:
+                yield get_status_dict(
+                    status='error',
+                    message='Metadata extraction failed (see previous error message, set datalad.runtime.raiseonerror=yes to fail immediately)',
+                    action='aggregate_metadata',
+                    path=aggsrc,
+                    logger=lgr)
 
         # at this point we have dumped all aggregated metadata into object files
         # somewhere, we know what needs saving, but having saved anything, and
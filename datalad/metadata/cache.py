@@ -0,0 +1,176 @@
+# emacs: -*- mode: python; py-indent-offset: 4; tab-width: 4; indent-tabs-mode: nil -*-
+# ex: set sts=4 ts=4 sw=4 noet:
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+#
+#   See COPYING file distributed along with the datalad package for the
+#   copyright and license terms.
+#
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+"""Persistent cache of per-file metadata extractor results"""
+
+__docformat__ = 'restructuredtext'
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from os.path import dirname
+from os.path import exists
+from os.path import join as opj
+
+from datalad.support.annexrepo import AnnexRepo
+from datalad.support.exceptions import CommandError
+from datalad.utils import CMD_MAX_ARG
+from datalad.utils import generate_chunks
+
+lgr = logging.getLogger('datalad.metadata.cache')
+
+# git-annex backends whose keys do not identify the content of a file
+_nonchecksum_backends = ('WORM', 'URL')
+
+
+def _get_git_blob_sha(fpath):
+    """Return the SHA1 git would assign to the file's content as a blob"""
+    sha = hashlib.sha1()
+    sha.update('blob {}\0'.format(os.path.getsize(fpath)).encode('ascii'))
+    with open(fpath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _get_index_blob_shas(repo, paths):
+    """Return the SHA1 of the blobs in git's index for unmodified files
+
+    Only regular files are considered, whose work tree content git does
+    not report as modified.  Any other (modified, untracked, symlinked)
+    file is not included.
+    """
+    if not paths or (isinstance(repo, AnnexRepo) and repo.is_direct_mode()):
+        # in direct mode the index does not match the work tree
+        return {}
+    shas = {}
+    modified = set()
+    chunk_size = CMD_MAX_ARG // max(map(len, paths))
+    try:
+        for path_chunk in generate_chunks(paths, chunk_size):
+            out, err = repo._git_custom_command(
+                path_chunk, ['git', 'ls-files', '--stage', '-z'])
+            for line in out.split('\0'):
+                if not line:
+                    continue
+                props, f = line.split('\t', 1)
+                mode, sha = props.split(' ', 2)[:2]
+                if mode in ('100644', '100755'):
+                    shas[f] = sha
+            out, err = repo._git_custom_command(
+                path_chunk, ['git', 'diff-files', '--name-only', '-z'])
+            modified.update(f for f in out.split('\0') if f)
+    except CommandError as e:
+        lgr.debug("Cannot query git's index: %s", e)
+        return {}
+    return {f: sha for f, sha in shas.items() if f not in modified}
+
+
+def get_content_keys(ds, paths):
+    """Determine identifiers of the content of files
+
+    Parameters
+    ----------
+    ds : Dataset
+    paths : list
+      Paths of files with content present, relative to the dataset.
+
+    Returns
+    -------
+    dict
+      {path: key}.  The key is the git-annex key for annexed files, and
+      'git:<blob sha>' for files in git.  Files whose content cannot be
+      identified (no checksum-based annex key, unreadable) are not included.
+    """
+    keys = {}
+    annexed = set()
+    if paths and isinstance(ds.repo, AnnexRepo):
+        annexinfo = ds.repo.get_content_annexinfo(paths)
+        for p in paths:
+            k = annexinfo.get(p, {}).get('key')
+            if not k:
+                continue
+            annexed.add(p)
+            if k.split('-', 1)[0] not in _nonchecksum_backends:
+                keys[p] = k
+    ingit = [p for p in paths if p not in annexed]
+    # only files that differ from what git already knows need to be hashed
+    index_shas = _get_index_blob_shas(ds.repo, ingit)
+    for p in ingit:
+        if p in index_shas:
+            keys[p] = 'git:{}'.format(index_shas[p])
+            continue
+        try:
+            keys[p] = 'git:{}'.format(_get_git_blob_sha(opj(ds.path, p)))
+        except (IOError, OSError) as e:
+            lgr.debug("Cannot determine content key of %s: %s", p, e)
+    return keys
+
+
+class ExtractorResultCache(object):
+    """Persistent cache of the metadata an extractor reported for a file
+
+    Entries are stored as individual JSON files in a directory, keyed on
+    the extractor name, the version of its results, and the key of the
+    file content (see `get_content_keys()`), so they are valid for any
+    file with the same content, in any dataset.  A file that yielded no
+    metadata is cached as such (None).
+
+    Parameters
+    ----------
+    path : str
+      Directory of the cache.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def _get_fname(self, extractor, version, key):
+        khash = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return opj(self.path, extractor, str(version), khash[:2], khash)
+
+    def get(self, extractor, version, key):
+        """Return cached metadata
+
+        Returns
+        -------
+        tuple
+          (bool, metadata).  The first item is False if nothing was cached.
+        """
+        try:
+            with open(self._get_fname(extractor, version, key)) as f:
+                entry = json.load(f)
+        except (IOError, OSError, ValueError):
+            return False, None
+        if entry.get('key') != key:
+            # hash collision, or a corrupted entry
+            return False, None
+        return True, entry.get('metadata')
+
+    def set(self, extractor, version, key, meta):
+        fname = self._get_fname(extractor, version, key)
+        try:
+            entry = json.dumps(dict(key=key, metadata=meta))
+        except (TypeError, ValueError) as e:
+            lgr.debug("Not caching %s metadata for %s: %s", extractor, key, e)
+            return
+        try:
+            cache_dir = dirname(fname)
+            if not exists(cache_dir):
+                os.makedirs(cache_dir)
+            # write to a temporary file and rename, so any concurrent
+            # process would see either no or the complete entry
+            fd, tmpfname = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(entry)
+            os.rename(tmpfname, fname)
+        except (IOError, OSError) as e:
+            # just a cache
+            lgr.debug("Failed to cache %s metadata for %s: %s",
+                      extractor, key, e)
@@ -27,7 +27,7 @@ class MetadataExtractor(BaseMetadataExtractor):
     def _get_content_metadata(self):
         log_progress(
             lgr.info,
-            'extractorannex',
+            'extractorannex-%s' % self.ds.path,
             'Start annex metadata extraction from %s', self.ds,
             total=len(self.paths),
             label='Annex metadata extraction',
@@ -36,22 +36,22 @@ class MetadataExtractor(BaseMetadataExtractor):
         if not isinstance(self.ds.repo, AnnexRepo):
             log_progress(
                 lgr.info,
-                'extractorannex',
+                'extractorannex-%s' % self.ds.path,
                 'Finished annex metadata extraction from %s', self.ds
             )
             return
 
-        valid_paths = None
-        if self.paths and sum(len(i) for i in self.paths) > 500000:
-            valid_paths = set(self.paths)
-        for file, meta in self.ds.repo.get_metadata(
-                self.paths if self.paths and valid_paths is None else '.'):
-            if file.startswith('.datalad') or valid_paths and file not in valid_paths:
+        # stream the records of the given paths through a batched annex
+        # process, without any limit on their number
+        records = self.ds.repo.get_metadata(self.paths, batch=True) \
+            if self.paths else self.ds.repo.get_metadata('.')
+        for file, meta in records:
+            if file.startswith('.datalad'):
                 # do not report on our own internal annexed files (e.g. metadata blobs)
                 continue
             log_progress(
                 lgr.info,
-                'extractorannex',
+                'extractorannex-%s' % self.ds.path,
                 'Extracted annex metadata from %s', file,
                 update=1,
                 increment=True)
@@ -60,6 +60,6 @@ class MetadataExtractor(BaseMetadataExtractor):
             yield (file, meta)
         log_progress(
             lgr.info,
-            'extractorannex',
+            'extractorannex-%s' % self.ds.path,
             'Finished annex metadata extraction from %s', self.ds
         )
@@ -33,50 +33,56 @@ vocab_map = {
 }
 
 
+def _get_audio_metadata(absfp):
+    info = audiofile(absfp, easy=True)
+    if info is None:
+        return None
+    meta = {vocab_map.get(k, k): info[k][0]
+            if isinstance(info[k], list) and len(info[k]) == 1 else info[k]
+            for k in info}
+    if hasattr(info, 'mime') and len(info.mime):
+        meta['format'] = 'mime:{}'.format(info.mime[0])
+    for k in ('length', 'channels', 'bitrate', 'sample_rate'):
+        if hasattr(info.info, k):
+            val = getattr(info.info, k)
+            if k == 'length':
+                # duration comes in seconds, cap at millisecond level
+                val = round(val, 3)
+            meta[vocab_map.get(k, k)] = val
+    return meta
+
+
 class MetadataExtractor(BaseMetadataExtractor):
 
     _unique_exclude = {'bitrate'}
+    _cache_version = 1
 
     def get_metadata(self, dataset, content):
         if not content:
             return {}, []
         log_progress(
             lgr.info,
-            'extractoraudio',
+            'extractoraudio-%s' % self.ds.path,
             'Start audio metadata extraction from %s', self.ds,
             total=len(self.paths),
             label='audio metadata extraction',
             unit=' Files',
         )
         contentmeta = []
-        for f in self.paths:
-            absfp = opj(self.ds.path, f)
+        for f, meta in self._iter_file_metadata(_get_audio_metadata):
             log_progress(
                 lgr.info,
-                'extractoraudio',
-                'Extract audio metadata from %s', absfp,
+                'extractoraudio-%s' % self.ds.path,
+                'Extracted audio metadata from %s', opj(self.ds.path, f),
                 update=1,
                 increment=True)
-            info = audiofile(absfp, easy=True)
-            if info is None:
+            if meta is None:
                 continue
-            meta = {vocab_map.get(k, k): info[k][0]
-                    if isinstance(info[k], list) and len(info[k]) == 1 else info[k]
-                    for k in info}
-            if hasattr(info, 'mime') and len(info.mime):
-                meta['format'] = 'mime:{}'.format(info.mime[0])
-            for k in ('length', 'channels', 'bitrate', 'sample_rate'):
-                if hasattr(info.info, k):
-                    val = getattr(info.info, k)
-                    if k == 'length':
-                        # duration comes in seconds, cap at millisecond level
-                        val = round(val, 3)
-                    meta[vocab_map.get(k, k)] = val
             contentmeta.append((f, meta))
 
         log_progress(
             lgr.info,
-            'extractoraudio',
+            'extractoraudio-%s' % self.ds.path,
             'Finished audio metadata extraction from %s', self.ds
         )
         return {
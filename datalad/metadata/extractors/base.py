@@ -8,8 +8,37 @@
 # ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
 """Metadata extractor base class"""
 
+import logging
+from multiprocessing import Pool
+from os.path import join as opj
+
+from datalad.support.parallel import get_jobs
+
+lgr = logging.getLogger('datalad.metadata.extractors.base')
+
+
+def _extract_chunk(args):
+    """Worker process helper to extract metadata from a chunk of files"""
+    extract, abspaths = args
+    return [extract(p) for p in abspaths]
+
 
 class BaseMetadataExtractor(object):
+    # upper limit of files processed by a worker process in one go
+    _max_chunksize = 100
+
+    # version of the content metadata reported for a file.  Extractors whose
+    # per-file metadata depend on nothing but the content of that file set
+    # it to have those cached across runs (see `datalad.metadata.cache`),
+    # and must increment it whenever they change what they report
+    _cache_version = None
+
+    # number of worker processes to extract content metadata with, if the
+    # extractor supports it (see `_iter_file_metadata()`).  Set on an
+    # instance after its creation, so extractors defining their own
+    # constructor keep working
+    jobs = None
+
     def __init__(self, ds, paths):
         """
         Parameters
@@ -55,3 +84,44 @@ class BaseMetadataExtractor(object):
         generator((location, metadata_dict))
         """
         raise NotImplementedError
+
+    def _iter_file_metadata(self, extract):
+        """Extract metadata from each file in `paths`, possibly in parallel
+
+        Parameters
+        ----------
+        extract : callable
+          Called with the absolute path of a file, returns whatever
+          represents its metadata. It must be a module-level function, so
+          that it can be passed to worker processes.
+
+        Yields
+        ------
+        tuple
+          (path, extract(abspath)) for each path, in the order of `paths`.
+          With more than one job, chunks of paths are processed in a pool of
+          worker processes.
+        """
+        paths = list(self.paths or [])
+        abspaths = [opj(self.ds.path, f) for f in paths]
+        jobs = get_jobs(self.jobs)
+        if not jobs or len(paths) < 2:
+            for f, absfp in zip(paths, abspaths):
+                yield f, extract(absfp)
+            return
+        chunksize = max(
+            1, min(self._max_chunksize, len(paths) // (jobs * 4)))
+        chunks = [(extract, abspaths[i:i + chunksize])
+                  for i in range(0, len(abspaths), chunksize)]
+        lgr.debug("Extracting metadata from %i files in %i chunks with %i "
+                  "processes", len(paths), len(chunks), jobs)
+        pool = Pool(jobs)
+        try:
+            results = (r for chunk in pool.imap(_extract_chunk, chunks)
+                       for r in chunk)
+            for f, res in zip(paths, results):
+                yield f, res
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
@@ -76,7 +76,7 @@ class MetadataExtractor(BaseMetadataExtractor):
         """
         log_progress(
             lgr.info,
-            'extractordataladcore',
+            'extractordataladcore-%s' % self.ds.path,
             'Start core metadata extraction from %s', self.ds,
             total=len(self.paths),
             label='Core metadata extraction',
@@ -91,23 +91,21 @@ class MetadataExtractor(BaseMetadataExtractor):
                 yield (p, dict())
             log_progress(
                 lgr.info,
-                'extractordataladcore',
+                'extractordataladcore-%s' % self.ds.path,
                 'Finished core metadata extraction from %s', self.ds
             )
             return
-        valid_paths = None
-        if self.paths and sum(len(i) for i in self.paths) > 500000:
-            valid_paths = set(self.paths)
-        # Availability information
-        for file, whereis in self.ds.repo.whereis(
-                self.paths if self.paths and valid_paths is None else '.',
-                output='full').items():
-            if file.startswith('.datalad') or valid_paths and file not in valid_paths:
+        # Availability information, streamed through a batched annex
+        # process for the given paths, without any limit on their number
+        records = self.ds.repo.iter_whereis(self.paths) if self.paths \
+            else self.ds.repo.whereis('.', output='full').items()
+        for file, whereis in records:
+            if file.startswith('.datalad'):
                 # do not report on our own internal annexed files (e.g. metadata blobs)
                 continue
             log_progress(
                 lgr.info,
-                'extractordataladcore',
+                'extractordataladcore-%s' % self.ds.path,
                 'Extracted core metadata from %s', file,
                 update=1,
                 increment=True)
@@ -121,6 +119,6 @@ class MetadataExtractor(BaseMetadataExtractor):
             yield (file, meta)
         log_progress(
             lgr.info,
-            'extractordataladcore',
+            'extractordataladcore-%s' % self.ds.path,
             'Finished core metadata extraction from %s', self.ds
         )
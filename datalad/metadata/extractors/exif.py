@@ -31,40 +31,48 @@ def _return_as_appropriate_dtype(val):
             return val
 
 
+def _get_exif_metadata(absfp):
+    # TODO we might want to do some more elaborate extraction in the future
+    # but for now plain EXIF, no maker extensions, no thumbnails
+    with open(absfp, 'rb') as f:
+        info = process_file(f, details=False)
+    if not info:
+        # got nothing, likely nothing there
+        return None
+    return {k.split()[-1]: _return_as_appropriate_dtype(info[k].printable)
+            for k in info}
+
+
 class MetadataExtractor(BaseMetadataExtractor):
+
+    _cache_version = 1
+
     def get_metadata(self, dataset, content):
         if not content:
             return {}, []
         log_progress(
             lgr.info,
-            'extractorexif',
+            'extractorexif-%s' % self.ds.path,
             'Start EXIF metadata extraction from %s', self.ds,
             total=len(self.paths),
             label='EXIF metadata extraction',
             unit=' Files',
         )
         contentmeta = []
-        for f in self.paths:
-            absfp = opj(self.ds.path, f)
+        for f, meta in self._iter_file_metadata(_get_exif_metadata):
             log_progress(
                 lgr.info,
-                'extractorexif',
-                'Extract EXIF metadata from %s', absfp,
+                'extractorexif-%s' % self.ds.path,
+                'Extracted EXIF metadata from %s', opj(self.ds.path, f),
                 update=1,
                 increment=True)
-            # TODO we might want to do some more elaborate extraction in the future
-            # but for now plain EXIF, no maker extensions, no thumbnails
-            info = process_file(open(opj(self.ds.path, f), 'rb'), details=False)
-            if not info:
-                # got nothing, likely nothing there
+            if meta is None:
                 continue
-            meta = {k.split()[-1]: _return_as_appropriate_dtype(info[k].printable)
-                    for k in info}
             contentmeta.append((f, meta))
 
         log_progress(
             lgr.info,
-            'extractorexif',
+            'extractorexif-%s' % self.ds.path,
             'Finished EXIF metadata extraction from %s', self.ds
         )
         return {
@@ -45,55 +45,62 @@ mode_map = {
 }
 
 
-class MetadataExtractor(BaseMetadataExtractor):
+_extractors = {
+    'format': lambda x: x.format_description,
+    'dcterms:SizeOrDuration': lambda x: x.size,
+    'spatial_resolution(dpi)': lambda x: x.info.get('dpi', ''),
+    'color_mode': lambda x: mode_map.get(x.mode, ''),
+}
 
-    _extractors = {
-        'format': lambda x: x.format_description,
-        'dcterms:SizeOrDuration': lambda x: x.size,
-        'spatial_resolution(dpi)': lambda x: x.info.get('dpi', ''),
-        'color_mode': lambda x: mode_map.get(x.mode, ''),
+
+def _get_image_metadata(absfp):
+    try:
+        img = Image.open(absfp)
+    except Exception as e:
+        lgr.debug("Image metadata extractor failed to load %s: %s",
+                  absfp, exc_str(e))
+        return None
+    meta = {
+        'type': 'dctype:Image',
     }
 
+    # run all extractors
+    meta.update({k: v(img) for k, v in _extractors.items()})
+    # filter useless fields (empty strings and NaNs)
+    return {k: v for k, v in meta.items()
+            if not (hasattr(v, '__len__') and not len(v))}
+
+
+class MetadataExtractor(BaseMetadataExtractor):
+
+    _cache_version = 1
+
     def get_metadata(self, dataset, content):
         if not content:
             return {}, []
         contentmeta = []
         log_progress(
             lgr.info,
-            'extractorimage',
+            'extractorimage-%s' % self.ds.path,
             'Start image metadata extraction from %s', self.ds,
             total=len(self.paths),
             label='image metadata extraction',
             unit=' Files',
         )
-        for f in self.paths:
-            absfp = opj(self.ds.path, f)
+        for f, meta in self._iter_file_metadata(_get_image_metadata):
             log_progress(
                 lgr.info,
-                'extractorimage',
-                'Extract image metadata from %s', absfp,
+                'extractorimage-%s' % self.ds.path,
+                'Extracted image metadata from %s', opj(self.ds.path, f),
                 update=1,
                 increment=True)
-            try:
-                img = Image.open(absfp)
-            except Exception as e:
-                lgr.debug("Image metadata extractor failed to load %s: %s",
-                          absfp, exc_str(e))
+            if meta is None:
                 continue
-            meta = {
-                'type': 'dctype:Image',
-            }
-
-            # run all extractors
-            meta.update({k: v(img) for k, v in self._extractors.items()})
-            # filter useless fields (empty strings and NaNs)
-            meta = {k: v for k, v in meta.items()
-                    if not (hasattr(v, '__len__') and not len(v))}
             contentmeta.append((f, meta))
 
         log_progress(
             lgr.info,
-            'extractorimage',
+            'extractorimage-%s' % self.ds.path,
             'Finished image metadata extraction from %s', self.ds
         )
         return {
@@ -8,10 +8,17 @@
 # ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
 """Test all extractors at a basic level"""
 
+import os
+
 from inspect import isgenerator
+from os.path import getsize
 from datalad.api import Dataset
 from datalad.metadata import extractors
+from datalad.metadata.extractors.base import BaseMetadataExtractor
 from nose.tools import assert_equal
+from datalad.tests.utils import assert_not_in
+from datalad.tests.utils import assert_raises
+from datalad.tests.utils import eq_
 from datalad.tests.utils import with_tree
 from datalad.tests.utils import ok_clean_git
 from datalad.tests.utils import known_failure_direct_mode
@@ -59,3 +66,33 @@ def test_api_git():
 @known_failure_direct_mode
 def test_api_annex():
     yield check_api, False
+
+
+def _get_size_metadata(absfp):
+    # module-level to be usable in worker processes
+    return {'size': getsize(absfp), 'pid': os.getpid()}
+
+
+@with_tree(tree={'file{}.dat'.format(i): 'x' * i for i in range(10)})
+def test_iter_file_metadata(path):
+    ds = Dataset(path)
+    paths = sorted('file{}.dat'.format(i) for i in range(10))
+    serial = list(BaseMetadataExtractor(ds, paths)._iter_file_metadata(
+        _get_size_metadata))
+    eq_([f for f, _ in serial], paths)
+    eq_(set(m['pid'] for _, m in serial), {os.getpid()})
+    extractor = BaseMetadataExtractor(ds, paths)
+    extractor.jobs = 2
+    extractor._max_chunksize = 3
+    parallel = list(extractor._iter_file_metadata(_get_size_metadata))
+    # same results, in the same order
+    eq_([(f, m['size']) for f, m in parallel],
+        [(f, m['size']) for f, m in serial])
+    assert_not_in(os.getpid(), [m['pid'] for _, m in parallel])
+    # errors come through
+    extractor = BaseMetadataExtractor(ds, paths + ['nothere'])
+    extractor.jobs = 2
+    assert_raises(
+        OSError,
+        list,
+        extractor._iter_file_metadata(_get_size_metadata))
@@ -26,6 +26,52 @@ from datalad.utils import assure_unicode
 xmp_field_re = re.compile('^([^\[\]]+)(\[\d+\]|)(/?.*|)')
 
 
+def _get_xmp_metadata(absfp):
+    info = file_to_dict(absfp)
+    if not info:
+        # got nothing, likely nothing there
+        # TODO check if this is an XMP sidecar file, parse that, and assign metadata
+        # to the base file
+        return None
+    # update vocabulary
+    vocab = {info[ns][0][0].split(':')[0]: {'@id': ns, 'type': vocabulary_id} for ns in info}
+    # now pull out actual metadata
+    # cannot do simple dict comprehension, because we need to beautify things a little
+
+    meta = {}
+    for ns in info:
+        for key, val, props in info[ns]:
+            if not val:
+                # skip everything empty
+                continue
+            if key.count('[') > 1:
+                # this is a nested array
+                # MIH: I do not think it is worth going here
+                continue
+            if props['VALUE_IS_ARRAY']:
+                # we'll catch the actuall array values later
+                continue
+            # normalize value
+            val = assure_unicode(val)
+            # non-breaking space
+            val = val.replace(u"\xa0", ' ')
+
+            field, idx, qual = xmp_field_re.match(key).groups()
+            normkey = u'{}{}'.format(field, qual)
+            if '/' in key:
+                normkey = u'{0}<{1}>'.format(*normkey.split('/'))
+            if idx:
+                # array
+                arr = meta.get(normkey, [])
+                arr.append(val)
+                meta[normkey] = arr
+            else:
+                meta[normkey] = val
+    # compact
+    meta = {k: v[0] if isinstance(v, list) and len(v) == 1 else v for k, v in meta.items()}
+    return vocab, meta
+
+
 class MetadataExtractor(BaseMetadataExtractor):
     def get_metadata(self, dataset, content):
         if not content:
@@ -34,71 +80,30 @@ class MetadataExtractor(BaseMetadataExtractor):
         contentmeta = []
         log_progress(
             lgr.info,
-            'extractorxmp',
+            'extractorxmp-%s' % self.ds.path,
             'Start XMP metadata extraction from %s', self.ds,
             total=len(self.paths),
             label='XMP metadata extraction',
             unit=' Files',
         )
-        for f in self.paths:
-            absfp = opj(self.ds.path, f)
+        for f, res in self._iter_file_metadata(_get_xmp_metadata):
             log_progress(
                 lgr.info,
-                'extractorxmp',
-                'Extract XMP metadata from %s', absfp,
+                'extractorxmp-%s' % self.ds.path,
+                'Extracted XMP metadata from %s', opj(self.ds.path, f),
                 update=1,
                 increment=True)
-            info = file_to_dict(absfp)
-            if not info:
-                # got nothing, likely nothing there
-                # TODO check if this is an XMP sidecar file, parse that, and assign metadata
-                # to the base file
+            if res is None:
                 continue
-            # update vocabulary
-            vocab = {info[ns][0][0].split(':')[0]: {'@id': ns, 'type': vocabulary_id} for ns in info}
+            vocab, meta = res
             # TODO this is dirty and assumed that XMP is internally consistent with the
             # definitions across all files -- which it likely isn't
             context.update(vocab)
-            # now pull out actual metadata
-            # cannot do simple dict comprehension, because we need to beautify things a little
-
-            meta = {}
-            for ns in info:
-                for key, val, props in info[ns]:
-                    if not val:
-                        # skip everything empty
-                        continue
-                    if key.count('[') > 1:
-                        # this is a nested array
-                        # MIH: I do not think it is worth going here
-                        continue
-                    if props['VALUE_IS_ARRAY']:
-                        # we'll catch the actuall array values later
-                        continue
-                    # normalize value
-                    val = assure_unicode(val)
-                    # non-breaking space
-                    val = val.replace(u"\xa0", ' ')
-
-                    field, idx, qual = xmp_field_re.match(key).groups()
-                    normkey = u'{}{}'.format(field, qual)
-                    if '/' in key:
-                        normkey = u'{0}<{1}>'.format(*normkey.split('/'))
-                    if idx:
-                        # array
-                        arr = meta.get(normkey, [])
-                        arr.append(val)
-                        meta[normkey] = arr
-                    else:
-                        meta[normkey] = val
-            # compact
-            meta = {k: v[0] if isinstance(v, list) and len(v) == 1 else v for k, v in meta.items()}
-
             contentmeta.append((f, meta))
 
         log_progress(
             lgr.info,
-            'extractorxmp',
+            'extractorxmp-%s' % self.ds.path,
             'Finished XMP metadata extraction from %s', self.ds
         )
         return {
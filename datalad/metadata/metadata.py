@@ -13,7 +13,7 @@ __docformat__ = 'restructuredtext'
 
 import logging
 import re
-import os
+from copy import deepcopy
 from os.path import dirname
 from os.path import relpath
 from os.path import normpath
@@ -21,6 +21,9 @@ from os.path import curdir
 from os.path import exists
 from os.path import lexists
 from os.path import join as opj
+from os.path import sep
+from bisect import bisect_left
+from itertools import chain
 from collections import OrderedDict
 from collections import Mapping
 from six import binary_type, string_types
@@ -34,6 +37,8 @@ from datalad.interface.results import get_status_dict
 from datalad.interface.utils import eval_results
 from datalad.interface.base import build_doc
 from datalad.metadata.definitions import version as vocabulary_version
+from datalad.metadata.cache import ExtractorResultCache
+from datalad.metadata.cache import get_content_keys
 from datalad.support.constraints import EnsureNone
 from datalad.support.constraints import EnsureBool
 from datalad.support.constraints import EnsureStr
@@ -43,6 +48,8 @@ from datalad.support.param import Parameter
 import datalad.support.ansi_colors as ac
 from datalad.support.json_py import load as jsonload
 from datalad.support.json_py import load_xzstream
+from datalad.support.json_py import IndexedXZStream
+from datalad.support.cache import FileObjectCache
 from datalad.interface.common_opts import recursion_flag
 from datalad.interface.common_opts import reporton_opt
 from datalad.distribution.dataset import Dataset
@@ -51,7 +58,9 @@ from datalad.distribution.dataset import datasetmethod
 from datalad.distribution.dataset import require_dataset
 from datalad.utils import assure_list
 from datalad.utils import path_is_subpath, path_startswith
+from datalad.utils import with_pathsep
 from datalad.utils import as_unicode
+from datalad.utils import getpwd
 from datalad.ui import ui
 from datalad.dochelpers import exc_str
 from datalad.dochelpers import single_or_plural
@@ -70,6 +79,10 @@ agginfo_relpath = opj(
 # including anything underneath them
 exclude_from_metadata = ('.datalad', '.git', '.gitmodules', '.gitattributes')
 
+# file name suffix of content metadata objects in the indexed format
+# (see `datalad.support.json_py.dump2indexedxzstream`)
+indexed_obj_suffix = '.xzi'
+
 
 def get_metadata_type(ds):
     """Return the metadata type(s)/scheme(s) of a dataset
@@ -103,26 +116,90 @@ class MetadataDict(dict):
     pass
 
 
+# process-wide cache of loaded metadata objects, see _get_objcache()
+_objcache = None
+
+
+def _get_objcache():
+    """Return the process-wide cache for loaded metadata objects
+
+    Its size is set by `datalad.metadata.objcache-size` on first use.
+    """
+    global _objcache
+    if _objcache is None:
+        _objcache = FileObjectCache(
+            size_limit=cfg.obtain('datalad.metadata.objcache-size'))
+    return _objcache
+
+
+def _load_json(fpath):
+    return jsonload(fpath, fixup=True)
+
+
+def _load_xz_json(fpath):
+    # take out the 'path' from the payload
+    return {s['path']: {k: v for k, v in s.items() if k != 'path'}
+            for s in load_xzstream(fpath)}
+
+
 def _load_json_object(fpath, cache=None):
+    """Load a JSON metadata object, or return an empty dict if there is none
+
+    Parameters
+    ----------
+    fpath : str
+    cache : FileObjectCache, optional
+      If given, the object is loaded via this cache, and must not be
+      modified by the caller.
+    """
+    if not lexists(fpath):
+        return {}
     if cache is None:
-        cache = {}
-    obj = cache.get(
-        fpath,
-        jsonload(fpath, fixup=True) if lexists(fpath) else {})
-    cache[fpath] = obj
-    return obj
+        return _load_json(fpath)
+    return cache.load(fpath, _load_json)
 
 
 def _load_xz_json_stream(fpath, cache=None):
+    """Load a content metadata object
+
+    Records of an XZ-compressed JSON stream are returned in a dict keyed on
+    their path.  For an indexed object (see `indexed_obj_suffix`) only its
+    index is loaded, and an `IndexedXZStream` is returned instead.  See
+    `_load_json_object()` for the meaning of the arguments, and
+    `_iter_content_metadata()` to access either of them.
+    """
+    if not lexists(fpath):
+        return {}
+    loader = IndexedXZStream if fpath.endswith(indexed_obj_suffix) \
+        else _load_xz_json
     if cache is None:
-        cache = {}
-    obj = cache.get(
-        fpath,
-        {s['path']: {k: v for k, v in s.items() if k != 'path'}
-         # take out the 'path' from the payload
-         for s in load_xzstream(fpath)} if lexists(fpath) else {})
-    cache[fpath] = obj
-    return obj
+        return loader(fpath)
+    return cache.load(fpath, loader)
+
+
+def _iter_content_metadata(contentmeta, rpath):
+    """Yield (path, metadata) of content records at or underneath `rpath`
+
+    Parameters
+    ----------
+    contentmeta : dict or IndexedXZStream
+      As returned by `_load_xz_json_stream()`.
+    rpath : str
+      Path relative to the dataset the records were aggregated from.
+    """
+    if isinstance(contentmeta, IndexedXZStream):
+        if rpath == curdir:
+            recs = iter(contentmeta)
+        else:
+            rec = contentmeta.get(rpath)
+            recs = chain([rec] if rec else [],
+                         contentmeta.iter_prefix(with_pathsep(rpath)))
+        for rec in recs:
+            yield rec['path'], {k: v for k, v in rec.items() if k != 'path'}
+    else:
+        for fpath in [f for f in contentmeta.keys()
+                      if rpath == curdir or path_startswith(f, rpath)]:
+            yield fpath, contentmeta[fpath]
 
 
 def _get_metadatarelevant_paths(ds, subds_relpaths):
@@ -148,19 +225,43 @@ def _get_containingds_from_agginfo(info, rpath):
       containing subdataset otherwise.
     """
     if rpath in info:
-        dspath = rpath
-    else:
-        # not a direct hit, hence we find the closest
-        # containing subdataset (if there is any)
-        containing_ds = sorted(
-            [subds for subds in sorted(info)
-             if path_is_subpath(rpath, subds)],
-            # TODO os.sep might not be OK on windows,
-            # depending on where it was aggregated, ensure uniform UNIX
-            # storage
-            key=lambda x: x.count(os.sep), reverse=True)
-        dspath = containing_ds[0] if len(containing_ds) else None
-    return dspath
+        return rpath
+    # not a direct hit, hence we find the closest containing subdataset
+    # (if there is any), by looking up all parent paths, deepest first
+    # TODO os.sep might not be OK on windows,
+    # depending on where it was aggregated, ensure uniform UNIX
+    # storage
+    dspath = dirname(rpath)
+    while dspath:
+        if dspath in info:
+            return dspath
+        dspath = dirname(dspath)
+    return None
+
+
+def _get_subds_from_agginfo(rpaths, rpath):
+    """Return relative paths of all datasets underneath a relative query path
+
+    Parameters
+    ----------
+    rpaths : list
+      Sorted relative dataset paths (keys of aggregate.json)
+    rpath : str
+      Relative query path
+
+    Returns
+    -------
+    list
+      In the order of `rpaths`.
+    """
+    if rpath == curdir:
+        return [p for p in rpaths if p != curdir]
+    # all paths with this prefix are in a contiguous range,
+    # before the first path with any "larger" prefix
+    prefix = with_pathsep(rpath)
+    return rpaths[
+        bisect_left(rpaths, prefix):
+        bisect_left(rpaths, prefix[:-1] + chr(ord(sep) + 1))]
 
 
 def query_aggregated_metadata(reporton, ds, aps, recursive=False,
@@ -200,15 +301,15 @@ def query_aggregated_metadata(reporton, ds, aps, recursive=False,
     agg_base_path = dirname(info_fpath)
     agginfos = _load_json_object(info_fpath)
 
-    # cache once loaded metadata objects for additional lookups
-    # TODO possibly supply this cache from outside, if objects could
-    # be needed again -- their filename does not change in a superdataset
-    # if done, cache under relpath, not abspath key
+    # cache once loaded metadata objects for additional lookups, also
+    # across queries -- objects are validated against their mtime
     cache = {
-        'objcache': {},
+        'objcache': _get_objcache(),
         'subds_relpaths': None,
     }
     reported = set()
+    # sorted once, if needed for recursive queries
+    agginfo_rpaths = None
 
     # for all query paths
     for ap in aps:
@@ -240,11 +341,11 @@ def query_aggregated_metadata(reporton, ds, aps, recursive=False,
         if recursive:
             # in case of recursion this is also anything in any dataset underneath
             # the query path
+            if agginfo_rpaths is None:
+                agginfo_rpaths = sorted(agginfos)
             matching_subds = [{'metaprovider': sub, 'rpath': sub, 'type': 'dataset'}
-                              for sub in sorted(agginfos)
-                              # we already have the base dataset
-                              if (rpath == curdir and sub != curdir) or
-                              path_is_subpath(sub, rpath)]
+                              for sub in _get_subds_from_agginfo(
+                                  agginfo_rpaths, rpath)]
             to_query.extend(matching_subds)
 
         # one heck of a beast to get the set of filenames for all metadata objects that are
@@ -313,7 +414,8 @@ def _query_aggregated_metadata_singlepath(
         # datasets) -> prep result
         res = get_status_dict(
             status='ok',
-            metadata=dsmeta,
+            # hand out a copy, the loaded object might be cached
+            metadata=deepcopy(dsmeta),
             # normpath to avoid trailing dot
             path=normpath(opj(ds.path, rpath)),
             type='dataset')
@@ -335,11 +437,9 @@ def _query_aggregated_metadata_singlepath(
         opj(agg_base_path, contentinfo_objloc),
         cache=cache['objcache']) if contentinfo_objloc else {}
 
-    for fpath in [f for f in contentmeta.keys()
-                  if rparentpath == curdir or
-                  path_startswith(f, rparentpath)]:
+    for fpath, fmeta in _iter_content_metadata(contentmeta, rparentpath):
         # we might be onto something here, prepare result
-        metadata = MetadataDict(contentmeta.get(fpath, {}))
+        metadata = MetadataDict(fmeta)
 
         # we have to pull out the context for each extractor from the dataset
         # metadata
@@ -349,7 +449,8 @@ def _query_aggregated_metadata_singlepath(
             context = dsmeta.get(tlk, {}).get('@context', None)
             if context is None:
                 continue
-            metadata[tlk]['@context'] = context
+            # do not modify the (cached) content metadata record itself
+            metadata[tlk] = dict(metadata[tlk], **{'@context': context})
         if '@context' in dsmeta:
             metadata['@context'] = dsmeta['@context']
 
@@ -360,7 +461,8 @@ def _query_aggregated_metadata_singlepath(
             path=normpath(opj(ds.path, containing_ds, fpath)),
             # we can only match files
             type='file',
-            metadata=metadata)
+            # the record still refers to the (cached) loaded objects
+            metadata=deepcopy(metadata))
         yield res
 
 
@@ -400,13 +502,17 @@ def _ok_metadata(meta, mtype, ds, loc):
     return False
 
 
-def _get_metadata(ds, types, global_meta=None, content_meta=None, paths=None):
+def _get_metadata(ds, types, global_meta=None, content_meta=None, paths=None,
+                  jobs=None):
     """Make a direct query of a dataset to extract its metadata.
 
     Parameters
     ----------
     ds : Dataset
     types : list
+    jobs : int or 'auto' or None, optional
+      Passed on to the extractors, to possibly extract content metadata
+      with multiple processes.
     """
     errored = False
     dsmeta = MetadataDict()
@@ -424,8 +530,11 @@ def _get_metadata(ds, types, global_meta=None, content_meta=None, paths=None):
 
     fullpathlist = paths
     if paths and isinstance(ds.repo, AnnexRepo):
-        # Ugly? Jep: #2055
-        content_info = zip(paths, ds.repo.file_has_content(paths), ds.repo.is_under_annex(paths))
+        annexinfo = ds.repo.get_content_annexinfo(paths)
+        content_info = [
+            (p, annexinfo.get(p, {}).get('has_content', False),
+             annexinfo.get(p, {}).get('key') is not None)
+            for p in paths]
         paths = [p for p, c, a in content_info if not a or c]
         nocontent = len(fullpathlist) - len(paths)
         if nocontent:
@@ -443,10 +552,13 @@ def _get_metadata(ds, types, global_meta=None, content_meta=None, paths=None):
     max_fieldsize = ds.config.obtain('datalad.metadata.maxfieldsize')
     # keep local, who knows what some extractors might pull in
     extractors = {ep.name: ep for ep in iter_entry_points('datalad.metadata.extractors')}
+    # cache of per-file extractor results, and the content keys of `paths`,
+    # set up on first use
+    result_cache = content_keys = None
 
     log_progress(
         lgr.info,
-        'metadataextractors',
+        'metadataextractors-%s' % ds.path,
         'Start metadata extraction from %s', ds,
         total=len(types),
         label='Metadata extraction',
@@ -456,7 +568,7 @@ def _get_metadata(ds, types, global_meta=None, content_meta=None, paths=None):
         mtype_key = mtype
         log_progress(
             lgr.info,
-            'metadataextractors',
+            'metadataextractors-%s' % ds.path,
             'Engage %s metadata extractor', mtype_key,
             update=1,
             increment=True)
@@ -464,19 +576,28 @@ def _get_metadata(ds, types, global_meta=None, content_meta=None, paths=None):
             # we said that we want to fail, rather then just moan about less metadata
             log_progress(
                 lgr.error,
-                'metadataextractors',
+                'metadataextractors-%s' % ds.path,
                 'Failed %s metadata extraction from %s', mtype_key, ds,
             )
             raise ValueError(
                 'Enable metadata extractor %s is not available in this installation',
                 mtype_key)
+        want_dataset = global_meta if global_meta is not None else ds.config.obtain(
+            'datalad.metadata.aggregate-dataset-{}'.format(mtype.replace('_', '-')),
+            default=True,
+            valtype=EnsureBool())
+        want_content = content_meta if content_meta is not None else ds.config.obtain(
+            'datalad.metadata.aggregate-content-{}'.format(mtype.replace('_', '-')),
+            default=True,
+            valtype=EnsureBool())
         try:
             extractor_cls = extractors[mtype_key].load()
             extractor = extractor_cls(ds, paths=paths)
+            extractor.jobs = jobs
         except Exception as e:
             log_progress(
                 lgr.error,
-                'metadataextractors',
+                'metadataextractors-%s' % ds.path,
                 'Failed %s metadata extraction from %s', mtype_key, ds,
             )
             raise ValueError(
@@ -484,23 +605,50 @@ def _get_metadata(ds, types, global_meta=None, content_meta=None, paths=None):
                 "broken dataset configuration (%s)?: %s",
                 mtype, ds, exc_str(e))
             continue
+        # only extract from files whose metadata are not cached already
+        cache_version = getattr(extractor_cls, '_cache_version', None)
+        use_cache = paths and want_content and cache_version is not None \
+            and ds.config.obtain('datalad.metadata.extractor-cache')
+        extract_paths = paths
+        cached_cm = []
+        if use_cache:
+            if result_cache is None:
+                result_cache = ExtractorResultCache(
+                    opj(cfg.obtain('datalad.locations.cache'), 'metadata'))
+                content_keys = get_content_keys(ds, paths)
+            extract_paths = []
+            for p in paths:
+                hit, meta = result_cache.get(
+                    mtype_key, cache_version, content_keys[p]) \
+                    if p in content_keys else (False, None)
+                if not hit:
+                    extract_paths.append(p)
+                elif meta is not None:
+                    cached_cm.append((p, meta))
+            extractor.paths = extract_paths
+            lgr.debug('Using cached %s metadata for %i out of %i files',
+                      mtype_key, len(paths) - len(extract_paths), len(paths))
         try:
             dsmeta_t, contentmeta_t = extractor.get_metadata(
-                dataset=global_meta if global_meta is not None else ds.config.obtain(
-                    'datalad.metadata.aggregate-dataset-{}'.format(mtype.replace('_', '-')),
-                    default=True,
-                    valtype=EnsureBool()),
-                content=content_meta if content_meta is not None else ds.config.obtain(
-                    'datalad.metadata.aggregate-content-{}'.format(mtype.replace('_', '-')),
-                    default=True,
-                    valtype=EnsureBool()))
+                dataset=want_dataset,
+                content=want_content)
+            if use_cache:
+                contentmeta_t = list(contentmeta_t or [])
+                reported = dict(contentmeta_t)
+                for p in extract_paths:
+                    if p in content_keys:
+                        # also cache that there was nothing to report
+                        result_cache.set(
+                            mtype_key, cache_version, content_keys[p],
+                            reported.get(p))
+                contentmeta_t = cached_cm + contentmeta_t
         except Exception as e:
             lgr.error('Failed to get dataset metadata ({}): {}'.format(
                 mtype, exc_str(e)))
             if cfg.get('datalad.runtime.raiseonerror'):
                 log_progress(
                     lgr.error,
-                    'metadataextractors',
+                    'metadataextractors-%s' % ds.path,
                     'Failed %s metadata extraction from %s', mtype_key, ds,
                 )
                 raise
@@ -603,7 +751,7 @@ def _get_metadata(ds, types, global_meta=None, content_meta=None, paths=None):
 
     log_progress(
         lgr.info,
-        'metadataextractors',
+        'metadataextractors-%s' % ds.path,
         'Finished metadata extraction from %s', ds,
     )
 
@@ -750,6 +898,16 @@ class Metadata(Interface):
             results contain a datasets's ID, the commit hash at which
             metadata aggregation was performed, and the location of the
             object file(s) containing the aggregated metadata."""),
+        export_table=Parameter(
+            args=('--export-table',),
+            metavar='DIRECTORY',
+            doc="""if given, all reported metadata records are written into a
+            columnar table in this directory, instead of being reported
+            individually. Dataset and content metadata are stored as
+            dictionary-encoded NumPy arrays that can be loaded
+            (memory-mapped) with `datalad.metadata.table.MetadataTable` for
+            vectorized filtering. Requires NumPy.""",
+            constraints=EnsureStr() | EnsureNone()),
         reporton=reporton_opt,
         recursive=recursion_flag)
         # MIH: not sure of a recursion limit makes sense here
@@ -764,7 +922,8 @@ class Metadata(Interface):
             dataset=None,
             get_aggregates=False,
             reporton='all',
-            recursive=False):
+            recursive=False,
+            export_table=None):
         # prep results
         refds_path = Interface.get_refds_path(dataset)
         res_kwargs = dict(action='metadata', logger=lgr)
@@ -874,6 +1033,43 @@ class Metadata(Interface):
                     'dataset', 'datasets', len(to_aggregate), include_count=True),
                 to_aggregate)
 
+        if export_table:
+            # write all records into a table as they come, and only report
+            # on that (and any failures)
+            failed = []
+
+            def _records():
+                for r in Metadata._query_content_by_ds(
+                        content_by_ds, refds_path, reporton, recursive,
+                        res_kwargs):
+                    if r.get('status', None) != 'ok':
+                        failed.append(r)
+                    else:
+                        yield r
+
+            from datalad.metadata.table import dump_metadata_table
+            nrecords = dump_metadata_table(
+                _records(), export_table, refds_path or getpwd())
+            for r in failed:
+                yield r
+            yield get_status_dict(
+                action='export_metadata',
+                path=export_table,
+                type='directory',
+                status='ok',
+                message=('exported %s',
+                         single_or_plural('record', 'records', nrecords,
+                                          include_count=True)),
+                logger=lgr)
+            return
+
+        for r in Metadata._query_content_by_ds(
+                content_by_ds, refds_path, reporton, recursive, res_kwargs):
+            yield r
+
+    @staticmethod
+    def _query_content_by_ds(content_by_ds, refds_path, reporton, recursive,
+                             res_kwargs):
         for ds_path in content_by_ds:
             ds = Dataset(ds_path)
             query_agg = [ap for ap in content_by_ds[ds_path]
@@ -899,7 +1095,6 @@ class Metadata(Interface):
                     recursive=recursive,
                     **res_kwargs):
                 yield r
-        return
 
     @staticmethod
     def custom_result_renderer(res, **kwargs):
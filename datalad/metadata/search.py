@@ -15,8 +15,12 @@ import logging
 from datalad.log import log_progress
 lgr = logging.getLogger('datalad.metadata.search')
 
+import io
 import os
 import re
+import sre_constants
+import sre_parse
+from bisect import bisect_right
 from functools import partial
 from os.path import join as opj, exists
 from os.path import relpath
@@ -47,11 +51,23 @@ from datalad.ui import ui
 from datalad.dochelpers import single_or_plural
 from datalad.dochelpers import exc_str
 from datalad.metadata.metadata import query_aggregated_metadata
+from datalad.support.json_py import dump as jsondump
+from datalad.support.json_py import dump2stream as jsondump2stream
+from datalad.support.json_py import load as jsonload
+from datalad.support.json_py import loads as json_loads
 
 # TODO: consider using plain as_unicode, without restricting
 # the types?
 _any2unicode = partial(as_unicode, cast_types=(int, float, tuple, list, dict))
 
+# character classes that never match a newline
+_NEWLINE = ord('\n')
+_SAFE_CATEGORIES = (
+    sre_constants.CATEGORY_DIGIT,
+    sre_constants.CATEGORY_WORD,
+    sre_constants.CATEGORY_NOT_SPACE,
+)
+
 
 def _listdict2dictlist(lst):
     # unique values that we got, always a list
@@ -91,6 +107,18 @@ def _listdict2dictlist(lst):
         if len(v)}
 
 
+def _get_indexed_agginfo(info):
+    """Return the part of a dataset's aggregation info that went into an index
+
+    That is its ID, and the metadata objects the documents were made from.
+    """
+    if info is None:
+        return None
+    return {k: info[k]
+            for k in ('id', 'dataset_info', 'content_info')
+            if k in info}
+
+
 def _meta2autofield_dict(meta, val2str=True, schema=None, consider_ucn=True):
     """Takes care of dtype conversion into unicode, potential key mappings
     and concatenation of sequence-type fields into CSV strings
@@ -152,6 +180,94 @@ def _meta2autofield_dict(meta, val2str=True, schema=None, consider_ucn=True):
     }
 
 
+def _is_columnscan_safe(query_re):
+    """Whether a regex matches the same in a column of values as in each value
+
+    A column is made of values joined by newlines.  It must be impossible
+    for a match to span multiple values, match at a position that does not
+    belong to a value, or behave differently at the start or end of a value.
+    Anything not known to be safe is considered unsafe.
+    """
+    if query_re.flags & re.DOTALL or query_re.search(u'') is not None:
+        # could match a newline, or empty strings anywhere
+        return False
+    try:
+        parsed = sre_parse.parse(query_re.pattern, query_re.flags)
+    except Exception:
+        return False
+    return _sre_columnscan_safe(parsed)
+
+
+def _sre_columnscan_safe(items):
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            if av == _NEWLINE:
+                return False
+        elif op == sre_constants.ANY:
+            # without DOTALL does not match newline
+            pass
+        elif op == sre_constants.IN:
+            for iop, iav in av:
+                if iop == sre_constants.LITERAL:
+                    if iav == _NEWLINE:
+                        return False
+                elif iop == sre_constants.RANGE:
+                    if iav[0] <= _NEWLINE <= iav[1]:
+                        return False
+                elif iop == sre_constants.CATEGORY:
+                    if iav not in _SAFE_CATEGORIES:
+                        return False
+                else:
+                    # NEGATE, or whatever else
+                    return False
+        elif op == sre_constants.AT:
+            # ^ and $ are fine with MULTILINE, \A and \Z are not
+            if av in (sre_constants.AT_BEGINNING_STRING,
+                      sre_constants.AT_END_STRING):
+                return False
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            if not _sre_columnscan_safe(av[2]):
+                return False
+        elif op == sre_constants.SUBPATTERN:
+            # (group, pattern) or (group, add_flags, del_flags, pattern)
+            if len(av) > 2 and av[1] & sre_constants.SRE_FLAG_DOTALL:
+                return False
+            if not _sre_columnscan_safe(av[-1]):
+                return False
+        elif op == sre_constants.BRANCH:
+            if not all(_sre_columnscan_safe(b) for b in av[1]):
+                return False
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if not _sre_columnscan_safe(av[1]):
+                return False
+        elif op == sre_constants.GROUPREF:
+            # can only repeat what was matched already
+            pass
+        else:
+            # NOT_LITERAL, conditionals, ...
+            return False
+    return True
+
+
+def _load_egrep_store(fname):
+    """Load a store of metadata columns, as written by `_EGrepSearch`"""
+    with io.open(fname, 'r', encoding='utf-8') as f:
+        store = json_loads(f.readline())
+        store['columns'] = columns = []
+        for line in f:
+            column = json_loads(line)
+            values = column['values']
+            if not isinstance(values, list):
+                # offsets of the values in the column
+                starts = [0]
+                for v in values.split(u'\n'):
+                    starts.append(starts[-1] + len(v) + 1)
+                column['starts'] = starts[:-1]
+            # else: values with newlines, not joined
+            columns.append(column)
+    return store
+
+
 def _search_from_virgin_install(dataset, query):
     #
     # this is to be nice to newbies
@@ -270,27 +386,37 @@ class _WhooshSearch(_Search):
         """
         from whoosh import index as widx
         from .metadata import agginfo_relpath
+        from .metadata import _load_json_object
         # what is the lastest state of aggregated metadata
         metadata_state = self.ds.repo.get_last_commit_hash(agginfo_relpath)
-        # use location common to all index types, they would all invalidate
-        # simultaneously
-        stamp_fname = opj(self.index_dir, 'datalad_metadata_state')
+        # record of the aggregated metadata that was indexed, to be able to
+        # update an index incrementally.  One per index type, as they are
+        # (re)built independently
+        state_fname = opj(
+            self.index_dir,
+            'datalad_metadata_state_{}.json'.format(self._mode_label))
         index_dir = opj(self.index_dir, self._mode_label)
 
+        idx_obj = None
+        indexed = None
         if (not force_reindex) and \
                 exists(index_dir) and \
-                exists(stamp_fname) and \
-                open(stamp_fname).read() == metadata_state:
+                exists(state_fname):
+            try:
+                indexed = jsonload(state_fname, fixup=False)
+            except ValueError as e:
+                lgr.warning(exc_str(e))
+            if indexed and indexed.get('documenttype') != self.documenttype:
+                # different documents entirely
+                indexed = None
+        if indexed:
             try:
                 # TODO check that the index schema is the same
                 # as the one we would have used for reindexing
-                # TODO support incremental re-indexing, whoosh can do it
-                idx = widx.open_dir(index_dir)
+                idx_obj = widx.open_dir(index_dir)
                 lgr.debug(
                     'Search index contains %i documents',
-                    idx.doc_count())
-                self.idx_obj = idx
-                return
+                    idx_obj.doc_count())
             except widx.LockError as e:
                 raise e
             except widx.IndexError as e:
@@ -317,6 +443,26 @@ class _WhooshSearch(_Search):
                 # we can just continue with generating an index
                 pass
 
+        if idx_obj is not None and indexed['metadata_state'] == metadata_state:
+            self.idx_obj = idx_obj
+            return
+
+        agginfos = _load_json_object(opj(self.ds.path, agginfo_relpath))
+
+        if idx_obj is not None:
+            try:
+                self._update_search_index(
+                    idx_obj, indexed.get('agginfo', {}), agginfos)
+                self._save_index_state(state_fname, metadata_state, agginfos)
+                self.idx_obj = idx_obj
+                return
+            except widx.LockError as e:
+                raise e
+            except Exception as e:
+                lgr.warning(
+                    'Failed to update search index, rebuilding it: %s',
+                    exc_str(e))
+
         lgr.info('{} search index'.format(
             'Rebuilding' if exists(index_dir) else 'Building'))
 
@@ -366,15 +512,8 @@ class _WhooshSearch(_Search):
             # this assumes that files are reported after each dataset report,
             # and after a subsequent dataset report no files for the previous
             # dataset will be reported again
-            meta = res.get('metadata', {})
-            doc = self._meta2doc(meta)
-            admin = {
-                'type': res['type'],
-                'path': relpath(res['path'], start=self.ds.path),
-            }
-            if 'parentds' in res:
-                admin['parentds'] = relpath(res['parentds'], start=self.ds.path)
-            if admin['type'] == 'dataset':
+            doc = self._mk_doc(res)
+            if doc['type'] == 'dataset':
                 if old_ds_rpath:
                     lgr.debug(
                         'Added %s on dataset %s',
@@ -388,10 +527,8 @@ class _WhooshSearch(_Search):
                              'Indexed dataset at %s', old_ds_rpath,
                              update=1, increment=True)
                 old_idx_size = idx_size
-                old_ds_rpath = admin['path']
-                admin['id'] = res.get('dsid', None)
+                old_ds_rpath = doc['path']
 
-            doc.update({k: assure_unicode(v) for k, v in admin.items()})
             lgr.debug("Adding document to search index: {}".format(doc))
             # inject into index
             idx.add_document(**doc)
@@ -413,12 +550,109 @@ class _WhooshSearch(_Search):
             lgr.info, 'autofieldidxbuild', 'Done building search index')
 
         # "timestamp" the search index to allow for automatic invalidation
-        with open(stamp_fname, 'w') as f:
-            f.write(metadata_state)
+        self._save_index_state(state_fname, metadata_state, agginfos)
 
         lgr.info('Search index contains %i documents', idx_size)
         self.idx_obj = idx_obj
 
+    def _mk_doc(self, res):
+        """Return index document for a metadata query result"""
+        meta = res.get('metadata', {})
+        doc = self._meta2doc(meta)
+        admin = {
+            'type': res['type'],
+            'path': relpath(res['path'], start=self.ds.path),
+        }
+        if 'parentds' in res:
+            admin['parentds'] = relpath(res['parentds'], start=self.ds.path)
+        if admin['type'] == 'dataset':
+            admin['id'] = res.get('dsid', None)
+        doc.update({k: assure_unicode(v) for k, v in admin.items()})
+        return doc
+
+    def _save_index_state(self, fname, metadata_state, agginfos):
+        jsondump(
+            dict(metadata_state=metadata_state,
+                 documenttype=self.documenttype,
+                 agginfo={k: _get_indexed_agginfo(v)
+                          for k, v in iteritems(agginfos)}),
+            fname)
+
+    def _update_search_index(self, idx_obj, indexed_agginfos, agginfos):
+        """Replace the documents of datasets with changed metadata
+
+        Datasets are considered changed, whenever any of their metadata
+        objects is different from the one that was indexed.
+        """
+        from whoosh import query as wq
+
+        changed = sorted(
+            rpath for rpath in set(indexed_agginfos).union(agginfos)
+            if indexed_agginfos.get(rpath, None) !=
+            _get_indexed_agginfo(agginfos.get(rpath, None)))
+        if not changed:
+            return
+        present = [rpath for rpath in changed if rpath in agginfos]
+        lgr.info('Updating search index for %s',
+                 single_or_plural('dataset', 'datasets', len(changed),
+                                  include_count=True))
+
+        new_fields = self._get_new_schema_fields(idx_obj.schema, present)
+        idx = idx_obj.writer(
+            limitmb=cfg.obtain('datalad.search.indexercachesize'))
+        try:
+            for name, field in iteritems(new_fields):
+                lgr.debug('Adding field %s to search index', name)
+                idx.add_field(name, field)
+            self.schema = idx.schema
+            for rpath in changed:
+                # a dataset's own document, and the ones of all its files
+                idx.delete_by_query(wq.Or([
+                    wq.Term('path', assure_unicode(rpath)),
+                    wq.Term('parentds', assure_unicode(rpath))]))
+            idx_size = 0
+            if present:
+                for res in query_aggregated_metadata(
+                        reporton=self.documenttype,
+                        ds=self.ds,
+                        aps=[dict(path=normpath(opj(self.ds.path, rpath)),
+                                  type='dataset')
+                             for rpath in present],
+                        # everything underneath is in other datasets
+                        recursive=False):
+                    doc = self._mk_doc(res)
+                    lgr.debug("Adding document to search index: {}".format(doc))
+                    idx.add_document(**doc)
+                    idx_size += 1
+        except:
+            idx.cancel()
+            raise
+        lgr.debug("Committing index")
+        # no optimization, would rewrite the entire index
+        idx.commit()
+        lgr.debug('Added %s on %s',
+                  single_or_plural('document', 'documents', idx_size,
+                                   include_count=True),
+                  single_or_plural('dataset', 'datasets', len(present),
+                                   include_count=True))
+
+    def _get_new_schema_fields(self, schema, rpaths):
+        """Return fields needed in addition to `schema` for some datasets
+
+        Parameters
+        ----------
+        schema : Schema
+        rpaths : list
+          Paths of datasets (relative to the searched dataset) whose documents
+          are to be added to the index.
+
+        Returns
+        -------
+        dict
+          field name: field type
+        """
+        return {}
+
     def __call__(self, query, max_nresults=None, force_reindex=False, full_record=False):
         with self.idx_obj.searcher() as searcher:
             wquery = self.get_query(query)
@@ -546,7 +780,6 @@ class _AutofieldSearch(_WhooshSearch):
 
     def _mk_schema(self, dsinfo):
         from whoosh import fields as wf
-        from whoosh.analysis import SimpleAnalyzer
 
         # haven for terms that have been found to be undefined
         # (for faster decision-making upon next encounter)
@@ -582,14 +815,8 @@ class _AutofieldSearch(_WhooshSearch):
                 ds=self.ds,
                 aps=[dict(path=self.ds.path, type='dataset')],
                 recursive=True):
-            meta = res.get('metadata', {})
-            # no stringification of values for speed, we do not need/use the
-            # actual values at this point, only the keys
-            idxd = _meta2autofield_dict(meta, val2str=False)
-
-            for k in idxd:
-                schema_fields[k] = wf.TEXT(stored=False,
-                                           analyzer=SimpleAnalyzer())
+            for k in self._get_metadata_fields(res):
+                schema_fields[k] = self._mk_field()
             log_progress(lgr.info, 'idxschemabuild',
                          'Scanned dataset at %s', res['path'],
                          update=1, increment=True)
@@ -598,6 +825,33 @@ class _AutofieldSearch(_WhooshSearch):
 
         self.schema = wf.Schema(**schema_fields)
 
+    def _get_metadata_fields(self, res):
+        meta = res.get('metadata', {})
+        # no stringification of values for speed, we do not need/use the
+        # actual values at this point, only the keys
+        return _meta2autofield_dict(meta, val2str=False)
+
+    def _mk_field(self):
+        from whoosh import fields as wf
+        from whoosh.analysis import SimpleAnalyzer
+        return wf.TEXT(stored=False, analyzer=SimpleAnalyzer())
+
+    def _get_new_schema_fields(self, schema, rpaths):
+        fields = {}
+        if not rpaths:
+            return fields
+        for res in query_aggregated_metadata(
+                reporton='datasets',
+                ds=self.ds,
+                aps=[dict(path=normpath(opj(self.ds.path, rpath)),
+                          type='dataset')
+                     for rpath in rpaths],
+                recursive=False):
+            for k in self._get_metadata_fields(res):
+                if k not in schema and k not in fields:
+                    fields[k] = self._mk_field()
+        return fields
+
     def _mk_parser(self):
         from whoosh import qparser as qparse
 
@@ -618,13 +872,40 @@ class _EGrepSearch(_Search):
     _mode_label = 'egrep'
     _default_documenttype = 'datasets'
 
+    def __init__(self, ds, force_reindex=False, **kwargs):
+        super(_EGrepSearch, self).__init__(ds, **kwargs)
+        self.index_dir = opj(self.ds.path, get_git_dir(self.ds.path), SEARCH_INDEX_DOTGITDIR)
+        self.force_reindex = force_reindex
+
     # If there were custom "per-search engine" options, we could expose
     # --consider_ucn - search through unique content properties of the dataset
     #    which might be more computationally demanding
     def __call__(self, query, max_nresults=None, consider_ucn=False, full_record=True):
         query_re = re.compile(self.get_query(query))
 
+        if consider_ucn or not _is_columnscan_safe(query_re):
+            lgr.debug('Querying all metadata records for %s', query_re.pattern)
+            hits = self._query_records(query_re, consider_ucn)
+        else:
+            hits = self._query_columns(query_re)
+
         nhits = 0
+        for hit in hits:
+            yield hit
+            nhits += 1
+            if max_nresults and nhits == max_nresults:
+                # report query stats
+                topstr = '{} top {}'.format(
+                    max_nresults,
+                    single_or_plural('match', 'matches', max_nresults)
+                )
+                lgr.info(
+                    "Reached the limit of {}, there could be more which "
+                    "were not reported.".format(topstr)
+                )
+                break
+
+    def _query_records(self, query_re, consider_ucn):
         for res in query_aggregated_metadata(
                 reporton=self.documenttype,
                 ds=self.ds,
@@ -652,24 +933,110 @@ class _EGrepSearch(_Search):
             # retain what actually matched
             matches = {k: match.group() for k, match in matches.items() if match}
             if matches:
-                hit = dict(
+                yield dict(
                     res,
                     action='search',
                     query_matched=matches,
                 )
-                yield hit
-                nhits += 1
-                if max_nresults and nhits == max_nresults:
-                    # report query stats
-                    topstr = '{} top {}'.format(
-                        max_nresults,
-                        single_or_plural('match', 'matches', max_nresults)
-                    )
-                    lgr.info(
-                        "Reached the limit of {}, there could be more which "
-                        "were not reported.".format(topstr)
-                    )
-                    break
+
+    def _query_columns(self, query_re):
+        """Query the columns of the store, one scan per metadata field"""
+        store = self._get_store()
+        # values in a column are separated by newlines, so anchors must
+        # match at those
+        column_re = re.compile(query_re.pattern, query_re.flags | re.MULTILINE)
+        matches = {}
+        t0 = time()
+        for column in store['columns']:
+            field = column['field']
+            if 'starts' in column:
+                last = None
+                for match in column_re.finditer(column['values']):
+                    # every match is within a single value (see
+                    # _is_columnscan_safe), only the first one of each
+                    # value counts
+                    i = bisect_right(column['starts'], match.start()) - 1
+                    if i == last:
+                        continue
+                    last = i
+                    matches.setdefault(
+                        column['records'][i], {})[field] = match.group()
+            else:
+                # values with newlines are not in the column text
+                for i, value in zip(column['records'], column['values']):
+                    match = query_re.search(value)
+                    if match:
+                        matches.setdefault(i, {})[field] = match.group()
+        lgr.log(7, "Finished querying %i columns in %f sec",
+                len(store['columns']), time() - t0)
+        if not matches:
+            return
+        records = store['records']
+        for res in query_aggregated_metadata(
+                # type is taken from the query path
+                reporton=None,
+                ds=self.ds,
+                aps=[dict(path=normpath(opj(self.ds.path, records[i][0])),
+                          type=records[i][1],
+                          query_matched=matches[i])
+                     for i in sorted(matches)],
+                # never recursive, we have direct hits already
+                recursive=False):
+            res['action'] = 'search'
+            yield res
+
+    def _get_store(self):
+        """Return the store of flattened metadata values, (re)build if needed
+
+        The store contains, for each metadata field, a column of the
+        lower-cased values of all records with this field, joined by
+        newlines, so a query needs a single scan per field.  The store is
+        built once per state of the aggregated metadata.
+        """
+        from .metadata import agginfo_relpath
+        metadata_state = self.ds.repo.get_last_commit_hash(agginfo_relpath)
+        fname = opj(self.index_dir, 'egrep_columns.json')
+        if not self.force_reindex and exists(fname):
+            try:
+                store = _load_egrep_store(fname)
+                if store['metadata_state'] == metadata_state and \
+                        store['documenttype'] == self.documenttype:
+                    return store
+            except (ValueError, KeyError) as e:
+                lgr.warning('Cannot load %s: %s', fname, exc_str(e))
+        lgr.info('Building search store')
+        records = []
+        columns = {}
+        for res in query_aggregated_metadata(
+                reporton=self.documenttype,
+                ds=self.ds,
+                aps=[dict(path=self.ds.path, type='dataset')],
+                recursive=True):
+            doc = _meta2autofield_dict(
+                res.get('metadata', {}), val2str=True, consider_ucn=False)
+            for k, v in iteritems(doc):
+                column = columns.setdefault(
+                    (k, '\n' in v), dict(field=k, records=[], values=[]))
+                column['records'].append(len(records))
+                column['values'].append(v.lower())
+            records.append([relpath(res['path'], start=self.ds.path),
+                            res['type']])
+        header = dict(
+            metadata_state=metadata_state,
+            documenttype=self.documenttype,
+            records=records)
+        for (k, multiline), column in iteritems(columns):
+            if not multiline:
+                column['values'] = u'\n'.join(column['values'])
+        if not exists(self.index_dir):
+            os.makedirs(self.index_dir)
+        # other processes must not see a partial store
+        tmp_fname = fname + '.tmp'
+        jsondump2stream([header] + list(columns.values()), tmp_fname)
+        os.rename(tmp_fname, fname)
+        # load it again, to have the same structure as when loaded
+        # from an existing store
+        return _load_egrep_store(fname)
 
     def show_keys(self, mode=None):
         maxl = 100  # maximal line length for unique values in mode=short
@@ -790,9 +1157,11 @@ class Search(Interface):
     simply performs matching of a search pattern against a flat
     string-representation of metadata. This mode is advantageous when the
     query is simple and the metadata structure is irrelevant. Moreover,
-    this mode does not require a search index, hence results can be reported
-    without an initial latency for building a search index when the underlying
-    metadata has changed (e.g. due to a dataset update). By default, this
+    this mode does not require a search index. Instead, the flattened values
+    of all metadata fields are kept in a simple store, which is much faster
+    to build than an index when the underlying metadata has changed (e.g.
+    due to a dataset update), and allows for querying all values of a
+    field at once. By default, this
     search mode only considers datasets and does not investigate records
     for individual files for speed reasons.
 
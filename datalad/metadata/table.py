@@ -0,0 +1,242 @@
+# emacs: -*- mode: python; py-indent-offset: 4; tab-width: 4; indent-tabs-mode: nil -*-
+# ex: set sts=4 ts=4 sw=4 noet:
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+#
+#   See COPYING file distributed along with the datalad package for the
+#   copyright and license terms.
+#
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+"""Columnar tables of metadata records, for analysis with NumPy
+
+A table is a directory with one NumPy array file per column, and JSON files
+with the vocabularies the columns refer to:
+
+- ``header.json``: format version, number of records and values, base path
+- ``paths.json``, ``dsids.json``, ``fields.json``, ``vocabulary.json``:
+  record paths (relative to the base path), dataset IDs, (flattened)
+  metadata field names, and unique metadata values
+- ``record_type.npy`` (0: dataset, 1: file), ``record_dsid.npy`` (index
+  into the dataset IDs, -1 if unknown): one item per record
+- ``value_record.npy``, ``value_field.npy``, ``value_value.npy``: one item
+  per metadata value of a record (index into records, field names and
+  vocabulary), sorted by field, then record.  Items of list values are
+  separate values.
+- ``field_offsets.npy``: the values of field ``i`` are in the slice
+  ``field_offsets[i]:field_offsets[i + 1]`` of the value columns
+
+Array files are loaded memory-mapped, so only the parts of them used by a
+query are read.
+"""
+
+__docformat__ = 'restructuredtext'
+
+import logging
+import re
+from array import array
+from os import makedirs
+from os.path import exists
+from os.path import join as opj
+from os.path import relpath
+
+from six import iteritems
+from six import string_types
+
+from datalad.support.json_py import dump as jsondump
+from datalad.support.json_py import load as jsonload
+from datalad.metadata.search import _meta2autofield_dict
+
+lgr = logging.getLogger('datalad.metadata.table')
+
+table_format_version = 1
+
+_record_types = ('dataset', 'file')
+
+
+class _Vocabulary(object):
+    """Dictionary-encoding of hashable items, in order of appearance"""
+    def __init__(self):
+        self.items = []
+        self._index = {}
+
+    def __call__(self, item):
+        # keep e.g. True, 1, and 1.0 apart
+        key = (type(item), item)
+        idx = self._index.get(key)
+        if idx is None:
+            idx = self._index[key] = len(self.items)
+            self.items.append(item)
+        return idx
+
+
+def _iter_values(v):
+    """Yield the scalar values of a flattened metadata field"""
+    for i in (v if isinstance(v, (list, tuple)) else [v]):
+        if isinstance(i, (dict, list, tuple)):
+            # nested beyond what a table can represent
+            i = repr(i)
+        yield i
+
+
+def _as_ndarray(arr, dtype):
+    """Convert a stdlib array into a NumPy array of the given dtype"""
+    import numpy as np
+    if not len(arr):
+        return np.zeros(0, dtype=dtype)
+    return np.frombuffer(arr, dtype=np.dtype(arr.typecode)).astype(dtype)
+
+
+def dump_metadata_table(results, path, basepath):
+    """Write metadata records into a columnar table
+
+    Parameters
+    ----------
+    results : iterable
+      Metadata query results, as reported by `query_aggregated_metadata()`.
+    path : str
+      Directory to write the table into, created if needed.
+    basepath : str
+      Record paths are stored relative to it.
+
+    Returns
+    -------
+    int
+      Number of records in the table.
+    """
+    import numpy as np
+
+    paths = []
+    dsids = _Vocabulary()
+    fields = _Vocabulary()
+    vocab = _Vocabulary()
+    record_type = array('B')
+    record_dsid = array('l')
+    value_record = array('L')
+    value_field = array('L')
+    value_value = array('L')
+    for res in results:
+        irec = len(paths)
+        paths.append(relpath(res['path'], start=basepath))
+        record_type.append(_record_types.index(res.get('type', 'file')))
+        record_dsid.append(dsids(res['dsid']) if res.get('dsid') else -1)
+        doc = _meta2autofield_dict(
+            res.get('metadata', {}), val2str=False, consider_ucn=False)
+        for k, v in iteritems(doc):
+            ifield = fields(k)
+            for i in _iter_values(v):
+                value_record.append(irec)
+                value_field.append(ifield)
+                value_value.append(vocab(i))
+
+    value_field = _as_ndarray(value_field, np.uint32)
+    # stable sort to keep record order within a field
+    order = np.argsort(value_field, kind='mergesort')
+    columns = dict(
+        record_type=_as_ndarray(record_type, np.uint8),
+        record_dsid=_as_ndarray(record_dsid, np.int32),
+        value_record=_as_ndarray(value_record, np.uint32)[order],
+        value_field=value_field[order],
+        value_value=_as_ndarray(value_value, np.uint32)[order],
+        field_offsets=np.searchsorted(
+            value_field[order],
+            np.arange(len(fields.items) + 1)).astype(np.uint64),
+    )
+
+    if not exists(path):
+        makedirs(path)
+    for name, column in iteritems(columns):
+        np.save(opj(path, '{}.npy'.format(name)), column)
+    for name, items in (('paths', paths),
+                        ('dsids', dsids.items),
+                        ('fields', fields.items),
+                        ('vocabulary', vocab.items)):
+        jsondump(items, opj(path, '{}.json'.format(name)))
+    # last, to mark a complete table
+    jsondump(
+        dict(version=table_format_version,
+             nrecords=len(paths),
+             nvalues=len(order),
+             basepath=basepath),
+        opj(path, 'header.json'))
+    return len(paths)
+
+
+class MetadataTable(object):
+    """Columnar table of metadata records, see module docstring for layout
+
+    Attributes
+    ----------
+    header : dict
+    paths, dsids, fields, vocabulary : list
+    record_type, record_dsid : ndarray
+      One item per record.
+    value_record, value_field, value_value, field_offsets : ndarray
+      One item per value, and the offsets of each field's values.
+    """
+    def __init__(self, path):
+        import numpy as np
+
+        self.path = path
+        self.header = jsonload(opj(path, 'header.json'))
+        if self.header.get('version') != table_format_version:
+            raise ValueError(
+                "Unsupported metadata table format version {} in {}".format(
+                    self.header.get('version'), path))
+        for name in ('paths', 'dsids', 'fields', 'vocabulary'):
+            setattr(self, name, jsonload(opj(path, '{}.json'.format(name))))
+        for name in ('record_type', 'record_dsid', 'value_record',
+                     'value_field', 'value_value', 'field_offsets'):
+            setattr(self, name, np.load(
+                opj(path, '{}.npy'.format(name)), mmap_mode='r'))
+        self._field_index = {f: i for i, f in enumerate(self.fields)}
+
+    def __len__(self):
+        return self.header['nrecords']
+
+    def get_field_values(self, field):
+        """Return the records and vocabulary indices of all values of a field
+
+        Returns
+        -------
+        tuple
+          (record indices, vocabulary indices) arrays, empty if there is no
+          such field.
+        """
+        ifield = self._field_index.get(field)
+        if ifield is None:
+            return self.value_record[:0], self.value_value[:0]
+        start, end = self.field_offsets[ifield:ifield + 2]
+        return self.value_record[start:end], self.value_value[start:end]
+
+    def find(self, field, value=None, regex=None):
+        """Return indices of the records with a matching value in a field
+
+        Parameters
+        ----------
+        field : str
+          Flattened field name (e.g. 'exif.Model').
+        value : optional
+          Match values equal to this one.
+        regex : str, optional
+          Match string values containing a match of this regular expression.
+          Without `value` or `regex`, any record with the field matches.
+
+        Returns
+        -------
+        ndarray
+          Sorted, unique record indices.
+        """
+        import numpy as np
+
+        records, values = self.get_field_values(field)
+        if value is not None or regex is not None:
+            # match against the (small) vocabulary, then select all
+            # values referring to a matching vocabulary entry at once
+            regex = re.compile(regex) if regex is not None else None
+            vids = [i for i, v in enumerate(self.vocabulary)
+                    if (value is None or (
+                        v == value and
+                        isinstance(v, bool) == isinstance(value, bool))) and
+                    (regex is None or (isinstance(v, string_types)
+                                       and regex.search(v)))]
+            records = records[np.in1d(values, vids)]
+        return np.unique(records)
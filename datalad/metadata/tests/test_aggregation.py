@@ -9,12 +9,24 @@
 # ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
 """Test metadata aggregation"""
 
-
+import os
 from os.path import join as opj
+from os.path import islink
+from os.path import samefile
+
+from mock import patch
+from git import Git
 
 from datalad.api import metadata
 from datalad.api import install
 from datalad.distribution.dataset import Dataset
+from datalad.metadata.aggregate import ANNEXMET_CACHE_DOTGITDIR
+from datalad.metadata.aggregate import _get_annex_metadata_digest
+from datalad.metadata.aggregate import _get_content_tree_digest
+from datalad.metadata.aggregate import _is_same_object
+from datalad.metadata.aggregate import _link_or_copy
+from datalad.support.annexrepo import AnnexRepo
+from datalad.support.json_py import load
 
 
 from datalad.tests.utils import skip_ssh
@@ -23,8 +35,14 @@ from datalad.tests.utils import with_tempfile
 from datalad.tests.utils import assert_result_count
 from datalad.tests.utils import assert_status
 from datalad.tests.utils import assert_dict_equal
+from datalad.tests.utils import assert_false
+from datalad.tests.utils import assert_in
+from datalad.tests.utils import assert_not_equal
+from datalad.tests.utils import assert_not_in
 from datalad.tests.utils import eq_
+from datalad.tests.utils import ok_
 from datalad.tests.utils import ok_clean_git
+from datalad.tests.utils import ok_file_has_content
 from datalad.tests.utils import skip_direct_mode
 
 
@@ -356,3 +374,164 @@ def test_partial_aggregation(path):
     #res = ds.metadata(get_aggregates=True)
     #assert_result_count(res, 3)
     #assert_result_count(res, 1, path=sub2.path)
+
+
+@with_tree(tree=_dataset_hierarchy_template)
+@skip_direct_mode  #FIXME
+def test_parallel_aggregate(path):
+    base = Dataset(opj(path, 'origin')).create(force=True)
+    base.create('sub', force=True)
+    base.create(opj('sub', 'subsub'), force=True)
+    base.add('.', recursive=True)
+    ok_clean_git(base.path)
+    base.aggregate_metadata(recursive=True, update_mode='all')
+    ok_clean_git(base.path)
+    seq_meta = base.metadata(recursive=True, return_type='list')
+    # extract from all datasets concurrently, nothing changes
+    res = base.aggregate_metadata(recursive=True, update_mode='all', jobs=3)
+    assert_status(('ok', 'notneeded'), res)
+    ok_clean_git(base.path)
+    par_meta = base.metadata(recursive=True, return_type='list')
+    eq_(len(seq_meta), len(par_meta))
+    for s, p in zip(seq_meta, par_meta):
+        assert_dict_equal(s, p)
+
+
+@with_tree(tree=_dataset_hierarchy_template)
+@skip_direct_mode  #FIXME
+def test_aggregate_fingerprint(path):
+    base = Dataset(opj(path, 'origin')).create(force=True)
+    sub = base.create('sub', force=True)
+    base.create(opj('sub', 'subsub'), force=True)
+    base.add('.', recursive=True)
+    ok_clean_git(base.path)
+    subds_relpaths = base.subdatasets(result_xfm='relpaths')
+    digest = _get_content_tree_digest(base, subds_relpaths)
+    # subdatasets and datalad's own files do not matter
+    for fpath in (opj(sub.path, 'subfile'), opj(base.path, '.datalad', 'some')):
+        with open(fpath, 'w') as f:
+            f.write('some')
+    base.add('.', recursive=True)
+    ok_clean_git(base.path)
+    eq_(digest, _get_content_tree_digest(base, subds_relpaths))
+    # content does
+    with open(opj(base.path, 'new'), 'w') as f:
+        f.write('new')
+    base.add('new')
+    assert_not_equal(digest, _get_content_tree_digest(base, subds_relpaths))
+
+    base.aggregate_metadata(recursive=True, update_mode='all')
+    ok_clean_git(base.path)
+    agginfo_fpath = opj(base.path, '.datalad', 'metadata', 'aggregate_v1.json')
+    agginfo = load(agginfo_fpath)
+    for rec in agginfo.values():
+        assert_in('fingerprint', rec)
+    # nothing changed, nothing is extracted again, same result
+    with patch('datalad.metadata.aggregate._get_metadata') as get_metadata:
+        base.aggregate_metadata(recursive=True, update_mode='all')
+        assert_false(get_metadata.called)
+    ok_clean_git(base.path)
+    assert_dict_equal(agginfo, load(agginfo_fpath))
+    # but a change of the effective configuration is picked up
+    base.config.add('datalad.metadata.maxfieldsize', '10', where='local')
+    base.aggregate_metadata(recursive=True, update_mode='all')
+    assert_not_equal(
+        agginfo['.']['fingerprint'],
+        load(agginfo_fpath)['.']['fingerprint'])
+
+
+@with_tree(tree={'file1': 'content1', 'file2': 'content2'})
+def test_annex_metadata_digest(path):
+    repo = AnnexRepo(path, create=True)
+    repo.add(['file1', 'file2'])
+    repo.commit('add')
+    ds = Dataset(path)
+    cache_fname = opj(path, '.git', ANNEXMET_CACHE_DOTGITDIR)
+    # no metadata, no digest, but the state is recorded already
+    eq_(_get_annex_metadata_digest(ds), '')
+    eq_(load(cache_fname)['metlogs'], {})
+
+    def _full_digest():
+        # what would come out without any recorded state
+        os.unlink(cache_fname)
+        return _get_annex_metadata_digest(ds)
+
+    list(repo.set_metadata('file1', init={'tag': 'one'}))
+    digest = _get_annex_metadata_digest(ds)
+    assert_not_equal(digest, '')
+    eq_(len(load(cache_fname)['metlogs']), 1)
+    eq_(digest, _full_digest())
+    # any other change of the git-annex branch does not matter, and is
+    # picked up from the difference to the recorded state
+    repo.drop('file2', options=['--force'])
+    with patch.object(Git, '_call_process', autospec=True,
+                      side_effect=Git._call_process) as call_git:
+        eq_(_get_annex_metadata_digest(ds), digest)
+        assert_not_in('ls_tree', [c[0][1] for c in call_git.call_args_list])
+    eq_(load(cache_fname)['annex_sha'],
+        repo.repo.git.rev_parse('git-annex'))
+    list(repo.set_metadata('file2', init={'tag': 'two'}))
+    with patch.object(Git, '_call_process', autospec=True,
+                      side_effect=Git._call_process) as call_git:
+        digest2 = _get_annex_metadata_digest(ds)
+        assert_not_in('ls_tree', [c[0][1] for c in call_git.call_args_list])
+    assert_not_equal(digest2, digest)
+    eq_(len(load(cache_fname)['metlogs']), 2)
+    eq_(digest2, _full_digest())
+    # an unusable recorded state is listed anew
+    with open(cache_fname, 'w') as f:
+        f.write('{"annex_sha": "0000000000000000000000000000000000000000", '
+                '"metlogs": {}}')
+    eq_(_get_annex_metadata_digest(ds), digest2)
+
+
+@with_tree(tree={'obj1': 'content', 'obj2': 'content', 'obj3': 'other'})
+def test_link_or_copy_object(path):
+    obj1, obj2, obj3 = [opj(path, o) for o in ('obj1', 'obj2', 'obj3')]
+    ok_(_is_same_object(obj1, obj2))
+    ok_(not _is_same_object(obj1, obj3))
+    ok_(not _is_same_object(obj1, opj(path, 'nothere')))
+    target = opj(path, 'target')
+    _link_or_copy(obj1, target)
+    ok_(_is_same_object(obj1, target))
+    ok_file_has_content(target, 'content')
+    # (annexed) content behind a symlink is copied, never hardlinked
+    symlink = opj(path, 'symlink')
+    os.symlink(obj3, symlink)
+    copy = opj(path, 'copy')
+    _link_or_copy(symlink, copy)
+    ok_(not islink(copy))
+    ok_(not samefile(obj3, copy))
+    ok_file_has_content(copy, 'other')
+
+
+@with_tree(tree=_dataset_hierarchy_template)
+@skip_direct_mode  #FIXME
+def test_aggregate_skips_unchanged_objects(path):
+    base = Dataset(opj(path, 'origin')).create(force=True)
+    base.create('sub', force=True)
+    base.create(opj('sub', 'subsub'), force=True)
+    base.add('.', recursive=True)
+    ok_clean_git(base.path)
+    base.aggregate_metadata(recursive=True, update_mode='all')
+    ok_clean_git(base.path)
+    # change the superdataset only
+    with open(opj(base.path, 'new'), 'w') as f:
+        f.write('new')
+    base.add('new')
+    base_commit = base.repo.get_hexsha()
+    with patch('datalad.metadata.aggregate._link_or_copy') as link_or_copy:
+        base.aggregate_metadata(recursive=True, update_mode='all')
+        # all subdataset objects in the superdataset are still identical
+        assert_false(link_or_copy.called)
+    ok_clean_git(base.path)
+    # only the objects of the superdataset itself were (re-)added
+    changed = base.repo.repo.git.diff(
+        base_commit, name_only=True).splitlines()
+    agginfo = load(opj(base.path, '.datalad', 'metadata', 'aggregate_v1.json'))
+    objlocs = set(
+        opj('.datalad', 'metadata', rec[k])
+        for dspath, rec in agginfo.items() if dspath != '.'
+        for k in ('dataset_info', 'content_info') if k in rec)
+    ok_(objlocs)
+    ok_(not objlocs.intersection(changed))
@@ -11,15 +11,27 @@
 
 import os
 
+from json import dumps
 from os.path import join as opj
 from os.path import relpath
 
+from mock import patch
+
 from datalad.api import Dataset
 from datalad.api import aggregate_metadata
 from datalad.api import install
 from datalad.api import search
 from datalad.api import metadata
+from datalad.metadata.cache import ExtractorResultCache
+from datalad.metadata.cache import get_content_keys
 from datalad.metadata.metadata import get_metadata_type
+from datalad.metadata.metadata import _get_containingds_from_agginfo
+from datalad.metadata.metadata import _get_subds_from_agginfo
+from datalad.metadata.metadata import indexed_obj_suffix
+from datalad.metadata.metadata import query_aggregated_metadata
+from datalad.support.gitrepo import GitRepo
+from datalad.support.json_py import dump2indexedxzstream
+from datalad.support.json_py import dump2xzstream
 from datalad.utils import chpwd
 from datalad.utils import assure_unicode
 from datalad.tests.utils import with_tree, with_tempfile
@@ -39,7 +51,7 @@ from datalad.support.exceptions import NoDatasetArgumentFound
 from datalad.support.gitrepo import GitRepo
 from datalad.support.annexrepo import AnnexRepo
 
-from nose.tools import assert_true, assert_equal, assert_raises
+from nose.tools import assert_true, assert_false, assert_equal, assert_raises
 
 
 _dataset_hierarchy_template = {
@@ -246,3 +258,140 @@ def test_bf2458(src, dst):
     clone.metadata('.')
     # XXX whereis says nothing in direct mode
     eq_(clone.repo.whereis('dummy'), [ds.config.get('annex.uuid')])
+
+
+def test_get_containingds_from_agginfo():
+    info = dict.fromkeys([
+        os.curdir, 'sub', opj('sub', 'deep'), 'sub-2', opj('sub-2', 'a', 'b')])
+    for rpath, target in (
+            (os.curdir, os.curdir),
+            ('sub', 'sub'),
+            ('file', None),
+            (opj('sub', 'file'), 'sub'),
+            (opj('sub', 'deep', 'er', 'file'), opj('sub', 'deep')),
+            (opj('sub-2', 'a', 'file'), 'sub-2'),
+            (opj('sub-2', 'a', 'b', 'file'), opj('sub-2', 'a', 'b')),
+            ('sub-22', None)):
+        eq_(_get_containingds_from_agginfo(info, rpath), target)
+
+    rpaths = sorted(info)
+    eq_(_get_subds_from_agginfo(rpaths, os.curdir),
+        [p for p in rpaths if p != os.curdir])
+    eq_(_get_subds_from_agginfo(rpaths, 'sub'), [opj('sub', 'deep')])
+    eq_(_get_subds_from_agginfo(rpaths, 'sub-2'), [opj('sub-2', 'a', 'b')])
+    eq_(_get_subds_from_agginfo(rpaths, opj('sub', 'deep')), [])
+    eq_(_get_subds_from_agginfo(rpaths, 'none'), [])
+
+
+@with_tree(tree={
+    '.datalad': {
+        'config': '[datalad "dataset"]\n\tid = someid\n',
+        'metadata': {'objects': {}}}})
+def test_query_indexed_content_metadata(path):
+    objpath = opj(path, '.datalad', 'metadata', 'objects')
+    recs = [{'path': p, 'extr': {'name': p}}
+            for p in sorted(['a', 'a.txt', opj('a', 'b'), opj('a', 'c', 'd'),
+                             'ab', 'z'])]
+    dump2xzstream(recs, opj(objpath, 'cn-plain.xz'))
+    dump2indexedxzstream(
+        recs, opj(objpath, 'cn-indexed' + indexed_obj_suffix), blocksize=1)
+    for objname in ('cn-plain.xz', 'cn-indexed' + indexed_obj_suffix):
+        with open(opj(path, '.datalad', 'metadata', 'aggregate_v1.json'),
+                  'w') as f:
+            f.write(dumps({'.': {'id': 'someid',
+                                 'content_info': 'objects/' + objname}}))
+        repo = GitRepo(path, create=True)
+        repo.add('.')
+        repo.commit('aggregate')
+        ds = Dataset(path)
+        for qpath, matches in (
+                ('a', ['a', opj('a', 'b'), opj('a', 'c', 'd')]),
+                (opj('a', 'c'), [opj('a', 'c', 'd')]),
+                ('a.txt', ['a.txt']),
+                ('nothere', [])):
+            res = list(query_aggregated_metadata(
+                'files', ds,
+                [dict(path=opj(path, qpath), type='file')]))
+            eq_(sorted(relpath(r['path'], path) for r in res), matches)
+            for r in res:
+                eq_(r['metadata']['extr']['name'], relpath(r['path'], path))
+        res = list(query_aggregated_metadata(
+            'files', ds, [dict(path=path, type='dataset')]))
+        eq_(sorted(relpath(r['path'], path) for r in res),
+            [r['path'] for r in recs])
+
+
+@with_tree(tree={
+    '.datalad': {
+        'config': '[datalad "dataset"]\n\tid = someid\n',
+        'metadata': {'objects': {
+            'ds.json': dumps({'extr': {'name': 'ds',
+                                       '@context': {'some': 'context'}}})
+        }}}})
+def test_query_results_do_not_share_cached_objects(path):
+    objpath = opj(path, '.datalad', 'metadata', 'objects')
+    dump2xzstream([{'path': 'a', 'extr': {'name': 'a', 'tags': ['t']}}],
+                  opj(objpath, 'cn.xz'))
+    with open(opj(path, '.datalad', 'metadata', 'aggregate_v1.json'),
+              'w') as f:
+        f.write(dumps({'.': {'id': 'someid',
+                             'dataset_info': 'objects/ds.json',
+                             'content_info': 'objects/cn.xz'}}))
+    repo = GitRepo(path, create=True)
+    repo.add('.')
+    repo.commit('aggregate')
+    ds = Dataset(path)
+
+    def _query():
+        return {relpath(r['path'], path): r['metadata']
+                for r in query_aggregated_metadata(
+                    'all', ds, [dict(path=path, type='dataset')])}
+
+    orig = _query()
+    eq_(sorted(orig), [os.curdir, 'a'])
+    # callers are free to modify the results
+    for meta in orig.values():
+        meta['extr']['name'] = 'modified'
+        meta['extr'].setdefault('tags', []).append('modified')
+        meta['extr']['@context']['some'] = 'modified'
+    res = _query()
+    eq_(res[os.curdir]['extr'],
+        {'name': 'ds', '@context': {'some': 'context'}})
+    eq_(res['a']['extr'],
+        {'name': 'a', 'tags': ['t'], '@context': {'some': 'context'}})
+
+
+@with_tree(tree={'one': '1', 'two': '2', 'same': '1'})
+@with_tempfile(mkdir=True)
+def test_extractor_result_cache(path, cachepath):
+    repo = GitRepo(path, create=True)
+    repo.add('.')
+    repo.commit('content')
+    ds = Dataset(path)
+    # what git knows already is not hashed again
+    with patch('datalad.metadata.cache._get_git_blob_sha') as get_blob_sha:
+        keys = get_content_keys(ds, ['one', 'two', 'same'])
+        assert_false(get_blob_sha.called)
+    # same as what git knows
+    eq_(keys['one'], 'git:' + repo.repo.git.rev_parse('HEAD:one'))
+    eq_(keys['one'], keys['same'])
+    assert_true(keys['one'] != keys['two'])
+    # modified and untracked files are hashed
+    with open(opj(path, 'same'), 'w') as f:
+        f.write('2')
+    with open(opj(path, 'new'), 'w') as f:
+        f.write('1')
+    changed_keys = get_content_keys(ds, ['one', 'same', 'new'])
+    eq_(changed_keys, {'one': keys['one'], 'same': keys['two'],
+                       'new': keys['one']})
+
+    cache = ExtractorResultCache(cachepath)
+    eq_(cache.get('extr', 1, keys['one']), (False, None))
+    cache.set('extr', 1, keys['one'], {'some': 'meta'})
+    cache.set('extr', 1, keys['two'], None)
+    eq_(cache.get('extr', 1, keys['same']), (True, {'some': 'meta'}))
+    # no metadata is cached too
+    eq_(cache.get('extr', 1, keys['two']), (True, None))
+    # nothing for other extractors or versions
+    eq_(cache.get('extr', 2, keys['one']), (False, None))
+    eq_(cache.get('other', 1, keys['one']), (False, None))
@@ -9,6 +9,8 @@
 # ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
 """Some additional tests for search command (some are within test_base)"""
 
+import re
+from json import dumps
 from shutil import copy
 from mock import patch
 from os import makedirs
@@ -27,10 +29,16 @@ from datalad.tests.utils import ok_clean_git
 from datalad.tests.utils import SkipTest
 from datalad.tests.utils import eq_
 from datalad.support.exceptions import NoDatasetArgumentFound
+from datalad.support.gitrepo import GitRepo
+from datalad.tests.utils import with_tree
 
 from datalad.api import search
 from datalad.metadata import search as search_mod
 
+from ..search import _AutofieldSearch
+from ..search import _BlobSearch
+from ..search import _EGrepSearch
+from ..search import _is_columnscan_safe
 from ..search import _listdict2dictlist
 from ..search import _meta2autofield_dict
 
@@ -303,3 +311,95 @@ def test_meta2autofield_dict():
             'extr1': {'prop1': 'value'}}),
         {'extr1.prop1': 'value'}
     )
+
+
+def _update_aggregate(path, metadata):
+    # aggregate metadata of (fake) subdatasets, one object per dataset
+    agginfo = {}
+    for rpath, meta in metadata.items():
+        objpath = 'objects/{}'.format(meta['name'].replace(' ', '_'))
+        with open(opj(path, '.datalad', 'metadata', objpath), 'w') as f:
+            f.write(dumps(meta))
+        agginfo[rpath] = {'id': rpath, 'dataset_info': objpath}
+    with open(opj(path, '.datalad', 'metadata', 'aggregate_v1.json'), 'w') as f:
+        f.write(dumps(agginfo))
+    repo = GitRepo(path, create=True)
+    repo.add('.')
+    repo.commit('aggregate')
+
+
+@with_tree(tree={
+    '.datalad': {
+        'config': '[datalad "dataset"]\n\tid = someid\n',
+        'metadata': {'objects': {}}}})
+def test_incremental_index(path):
+    ds = Dataset(path)
+    _update_aggregate(path, {
+        'sub1': {'name': 'first one'},
+        'sub2': {'name': 'second one', 'author': 'someone'}})
+    for mode in ('textblob', 'autofield'):
+        assert_result_count(ds.search('one', mode=mode), 2)
+        assert_result_count(ds.search('someone', mode=mode), 1)
+
+    # change one dataset, add another
+    _update_aggregate(path, {
+        'sub1': {'name': 'first one'},
+        'sub2': {'name': 'second two', 'license': 'free'},
+        'sub3': {'name': 'third one'}})
+    # the concrete classes define their own schemas
+    with patch.object(_BlobSearch, '_mk_schema') as blob_mk_schema, \
+            patch.object(_AutofieldSearch, '_mk_schema') as autofield_mk_schema:
+        for mode in ('textblob', 'autofield'):
+            res = ds.search('one', mode=mode)
+            assert_result_count(res, 2)
+            assert_result_count(res, 1, path=opj(path, 'sub3'))
+            assert_result_count(ds.search('someone', mode=mode), 0)
+            assert_result_count(
+                ds.search('free', mode=mode), 1, path=opj(path, 'sub2'))
+        # no rebuild
+        assert not blob_mk_schema.called
+        assert not autofield_mk_schema.called
+    # new field is known
+    assert_result_count(ds.search('license:free', mode='autofield'), 1)
+
+
+def test_is_columnscan_safe():
+    for query in ('abc', 'a.c', '^ab', 'ab$', r'\bab', r'\d+', '[a-z]+',
+                  'a|b', '(?:ab)+c', r'(a)\1', r'\S+@'):
+        assert _is_columnscan_safe(re.compile(query)), query
+    for query in (r'\Aab', r'ab\Z', '[^a]', r'\s', r'\W', 'a\nb',
+                  '(?s)a.b', 'a*'):
+        assert not _is_columnscan_safe(re.compile(query)), query
+
+
+@with_tree(tree={
+    '.datalad': {
+        'config': '[datalad "dataset"]\n\tid = someid\n',
+        'metadata': {'objects': {}}}})
+def test_egrep_columns(path):
+    ds = Dataset(path)
+    _update_aggregate(path, {
+        'sub1': {'name': 'first one', 'description': 'multi\nline One'},
+        'sub2': {'name': 'second one', 'author': ['Some One', 'two']},
+        opj('sub2', 'deep'): {'name': 'deep', 'x': {'y': 'nested ONE'}}})
+    searcher = _EGrepSearch(ds)
+
+    def _hits(hits):
+        return [(h['path'], h['query_matched'], h['metadata']) for h in hits]
+
+    for query in ('one', '^one', 'one$', 'e o', 'deep|two', 'line one$',
+                  'nomatch', '[^x]ne'):
+        query_re = re.compile(searcher.get_query(query))
+        # same as querying each record
+        eq_(_hits(searcher._query_columns(query_re)),
+            _hits(searcher._query_records(query_re, False)))
+    res = ds.search('one', mode='egrep')
+    assert_result_count(res, 3)
+    assert_result_count(
+        res, 1, path=opj(path, 'sub1'), dsid='sub1',
+        query_matched={'name': 'one', 'description': 'one'})
+
+    # store is rebuilt for new aggregated metadata
+    _update_aggregate(path, {'sub3': {'name': 'third one'}})
+    assert_result_count(
+        ds.search('one', mode='egrep'), 1, path=opj(path, 'sub3'))
@@ -0,0 +1,54 @@
+# emacs: -*- mode: python-mode; py-indent-offset: 4; tab-width: 4; indent-tabs-mode: nil -*-
+# ex: set sts=4 ts=4 sw=4 noet:
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+#
+#   See COPYING file distributed along with the datalad package for the
+#   copyright and license terms.
+#
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+"""Test columnar tables of metadata records"""
+
+from os.path import join as opj
+
+from datalad.tests.utils import with_tempfile
+from datalad.tests.utils import skip_if_no_module
+from datalad.tests.utils import eq_
+
+
+@with_tempfile(mkdir=True)
+def test_metadata_table(path):
+    skip_if_no_module('numpy')
+    from datalad.metadata.table import dump_metadata_table
+    from datalad.metadata.table import MetadataTable
+
+    records = [
+        dict(path=opj(path, 'ds'), type='dataset', dsid='id1',
+             metadata={'datalad_core': {'url': 'http://example.com'}}),
+        dict(path=opj(path, 'ds', 'a.jpg'), type='file', dsid='id1',
+             metadata={'exif': {'Model': 'Cam', 'ISO': 100},
+                       'annex': {'tag': ['one', 'two']}}),
+        dict(path=opj(path, 'ds', 'b.jpg'), type='file', dsid='id1',
+             metadata={'exif': {'Model': 'Other Cam', 'ISO': True}}),
+        dict(path=opj(path, 'c.txt'), type='file',
+             metadata={}),
+    ]
+    table_path = opj(path, 'table')
+    eq_(dump_metadata_table(records, table_path, path), 4)
+
+    table = MetadataTable(table_path)
+    eq_(len(table), 4)
+    eq_(table.paths, [opj('ds'), opj('ds', 'a.jpg'), opj('ds', 'b.jpg'),
+                      'c.txt'])
+    eq_(list(table.record_type), [0, 1, 1, 1])
+    eq_(list(table.record_dsid), [0, 0, 0, -1])
+    eq_(table.dsids, ['id1'])
+    eq_(list(table.find('exif.Model')), [1, 2])
+    eq_(list(table.find('exif.Model', value='Cam')), [1])
+    eq_(list(table.find('exif.Model', regex='Cam$')), [1, 2])
+    # same value, but of another type
+    eq_(list(table.find('exif.ISO', value=100)), [1])
+    eq_(list(table.find('exif.ISO', value=True)), [2])
+    # list items are individual values
+    eq_(list(table.find('annex.tag', value='two')), [1])
+    eq_(list(table.find('datalad_core.url')), [0])
+    eq_(list(table.find('nothere')), [])
@@ -66,6 +66,7 @@ from .gitrepo import normalize_path
 from .gitrepo import normalize_paths
 from .gitrepo import GitCommandError
 from .gitrepo import to_options
+from .gitrepo import _BatchWriter
 from . import ansi_colors
 from .external_versions import external_versions
 from .exceptions import CommandNotAvailableError
@@ -111,6 +112,9 @@ class AnnexRepo(GitRepo, RepoInterface):
     # 6.20161210 -- annex add  to add also changes (not only new files) to git
     # 6.20170220 -- annex status provides --ignore-submodules
     GIT_ANNEX_MIN_VERSION = '6.20170220'
+    # number of requests fed to a batched annex process at once, when
+    # streaming replies (see `_stream_batched`)
+    _BATCH_CHUNK_SIZE = 10000
     git_annex_version = None
 
     def __init__(self, path, url=None, runner=None,
@@ -1608,9 +1612,10 @@ class AnnexRepo(GitRepo, RepoInterface):
         """
 
         if len(files) > 1:
-            return self._batched.get('lookupkey',
-                                     git_options=self._GIT_COMMON_OPTIONS,
-                                     path=self.path)(files)
+            return list(self._batched.get(
+                'lookupkey',
+                git_options=self._GIT_COMMON_OPTIONS,
+                path=self.path).stream(files))
         else:
             files = files[0]
             # single file
@@ -1792,7 +1797,10 @@ class AnnexRepo(GitRepo, RepoInterface):
         """
         objects = []
         if batch:
-            objects = self._batched.get('find', git_options=self._GIT_COMMON_OPTIONS, path=self.path)(files)
+            objects = list(self._batched.get(
+                'find',
+                git_options=self._GIT_COMMON_OPTIONS,
+                path=self.path).stream(files))
         else:
             for f in files:
                 try:
@@ -1885,6 +1893,94 @@ class AnnexRepo(GitRepo, RepoInterface):
                 )
             return out
 
+    @normalize_paths(match_return_type=False)
+    def get_content_annexinfo(self, files):
+        """Query key, size, and local availability of files in a single pass
+
+        In indirect mode no annex command is run: keys are read from the
+        symlink targets (or, for unlocked files, the pointer files) of the
+        files in git's index, and content availability is determined by
+        looking at the local object store or work tree.
+
+        Parameters
+        ----------
+        files: list of str
+          File(s) to query.  Directories are queried for all the files
+          underneath.
+
+        Returns
+        -------
+        dict
+          {path: dict(key=..., size=..., has_content=...)}, for all files
+          known to git (for all given paths in direct mode).  `key` is None for files not under annex, and
+          `has_content` is then False as with `file_has_content()`.  `size`
+          is the content size as encoded in the key, or None if unknown.
+        """
+        if not files:
+            return {}
+        if self.is_direct_mode():
+            # the index does not tell which files are annexed in direct mode,
+            # so ask annex
+            keys = list(self._stream_batched('lookupkey', files))
+            has_content = self.file_has_content(
+                files, normalize_paths=False, batch=True)
+            return {
+                f: dict(key=k or None,
+                        size=self.get_size_from_key(k) if k else None,
+                        has_content=bool(k) and c)
+                for f, k, c in zip(files, keys, has_content)}
+
+        # unlocked files are only possible in v6 repositories
+        check_pointers = int(self.config.get("annex.version", 5)) >= 6
+        info = {}
+        chunk_size = CMD_MAX_ARG // max(map(len, files))
+        for file_chunk in generate_chunks(files, chunk_size):
+            out, err = self._git_custom_command(
+                file_chunk, ['git', 'ls-files', '--stage', '-z'])
+            for line in out.split('\0'):
+                if not line:
+                    continue
+                props, f = line.split('\t', 1)
+                mode, sha = props.split(' ', 2)[:2]
+                info[f] = self._get_index_entry_annexinfo(
+                    f, mode, sha, check_pointers)
+        return info
+
+    # maximal size of an annex pointer file, as assumed by git-annex itself
+    _MAX_POINTER_SIZE = 81920
+
+    def _get_index_entry_annexinfo(self, f, mode, sha, check_pointers):
+        """Helper for `get_content_annexinfo()` to inspect one index entry"""
+        filepath = opj(self.path, f)
+        key = None
+        has_content = False
+        if mode == '120000':
+            # in indirect mode the symlink is committed as is, so the work
+            # tree copy is as good as the blob, unless it was changed
+            target = os.readlink(filepath) if islink(filepath) \
+                else self.repo.git.get_object_data(sha)[3].decode('utf-8')
+            if 'annex/objects/' in target:
+                key = target.rstrip('/').split('/')[-1]
+                has_content = exists(opj(os.path.dirname(filepath), target))
+        elif check_pointers and mode in ('100644', '100755'):
+            size = self.repo.git.get_object_header(sha)[2]
+            if size <= self._MAX_POINTER_SIZE:
+                pointer = self.repo.git.get_object_data(sha)[3]
+                if pointer.startswith(b'/annex/objects/'):
+                    key = pointer.splitlines()[0].decode('utf-8').split('/')[-1]
+                    # the work tree file is replaced by the content when it
+                    # is present
+                    try:
+                        with open(filepath, 'rb') as fp:
+                            has_content = \
+                                fp.read(len(pointer)).rstrip() != pointer.rstrip()
+                    except (IOError, OSError):
+                        has_content = False
+        return dict(
+            key=key,
+            size=self.get_size_from_key(key) if key else None,
+            has_content=has_content)
+
     def init_remote(self, name, options):
         """Creates a new special remote
 
@@ -2433,6 +2529,10 @@ class AnnexRepo(GitRepo, RepoInterface):
             Either provided files are actually annex keys
         options: list, optional
             Options to pass into git-annex call
+        batch: bool, optional
+            Initiate or continue with a batched run of annex whereis, to
+            which all files are streamed at once.  Ignored if `key` or
+            `options` are provided
 
         Returns
         -------
@@ -2455,9 +2555,6 @@ class AnnexRepo(GitRepo, RepoInterface):
                   'urls': ['http://127.0.0.1:43442/about.txt', 'http://example.com/someurl']
                 }}
         """
-        if batch:
-            lgr.warning("TODO: --batch mode for whereis.  Operating serially")
-
         OUTPUTS = {'descriptions', 'uuids', 'full'}
         if output not in OUTPUTS:
             raise ValueError(
@@ -2466,12 +2563,21 @@ class AnnexRepo(GitRepo, RepoInterface):
             )
 
         options = assure_list(options, copy=True)
-        if key:
-            kwargs = {'opts': options + ["--key"] + files}
+        if batch and (key or options):
+            lgr.debug("Not batching whereis call with key=%s, options=%s",
+                      key, options)
+            batch = False
+        if batch:
+            json_objects = list(self._stream_batched('whereis', files, json=True))
+            if output == 'full':
+                # files unknown to annex get an empty reply
+                json_objects = [j for j in json_objects if j]
         else:
-            kwargs = {'files': files}
-
-        json_objects = self._run_annex_command_json('whereis', **kwargs)
+            if key:
+                kwargs = {'opts': options + ["--key"] + files}
+            else:
+                kwargs = {'files': files}
+            json_objects = self._run_annex_command_json('whereis', **kwargs)
         if output in {'descriptions', 'uuids'}:
             return [
                 [remote.get(output[:-1]) for remote in j.get('whereis')]
@@ -2488,6 +2594,50 @@ class AnnexRepo(GitRepo, RepoInterface):
                 if not j.get('key').endswith('.this-is-a-test-key')
             }
 
+    def iter_whereis(self, files):
+        """Yield where the content of annexed files is, as reported by annex
+
+        In contrast to `whereis()`, records are yielded as soon as git-annex
+        reports them.  Files are fed to a batched 'whereis' in chunks, so
+        neither the command line length nor memory demands depend on the
+        number of files.
+
+        Parameters
+        ----------
+        files: list of str
+            files to look for.  Files not under annex are not reported.
+
+        Returns
+        -------
+        generator
+          (file, dict) tuples, the dict is like the values reported by
+          `whereis(output='full')`.
+        """
+        for j in self._stream_batched('whereis', files, json=True):
+            if not j:
+                # not annexed
+                continue
+            yield j['file'], self._whereis_json_to_dict(j)
+
+    def _stream_batched(self, codename, entries, **kwargs):
+        """Yield replies of a batched annex command, feeding it in chunks
+
+        Parameters
+        ----------
+        codename : str
+          Annex command, see `BatchedAnnexes.get`.
+        entries : list
+          Requests for the command, one per reply.
+        **kwargs
+          Passed to `BatchedAnnexes.get`.
+        """
+        batched = self._batched.get(
+            codename, git_options=self._GIT_COMMON_OPTIONS, path=self.path,
+            **kwargs)
+        for i in range(0, len(entries), self._BATCH_CHUNK_SIZE):
+            for out in batched.stream(entries[i:i + self._BATCH_CHUNK_SIZE]):
+                yield out
+
     # TODO:
     # I think we should make interface cleaner and less ambigious for those annex
     # commands which could operate on globs, files, and entire repositories, separating
@@ -2521,7 +2671,7 @@ class AnnexRepo(GitRepo, RepoInterface):
                 'info',
                 git_options=self._GIT_COMMON_OPTIONS,
                 annex_options=options, json=True, path=self.path
-            )(files)
+            ).stream(files)
 
         # Some aggressive checks. ATM info can be requested only per file
         # json_objects is a generator, let's keep it that way
@@ -3137,7 +3287,7 @@ class AnnexRepo(GitRepo, RepoInterface):
             self.config.set(var, url, where='local', reload=True)
         super(AnnexRepo, self).set_remote_url(name, url, push)
 
-    def get_metadata(self, files, timestamps=False):
+    def get_metadata(self, files, timestamps=False, batch=False):
         """Query git-annex file metadata
 
         Parameters
@@ -3149,6 +3299,12 @@ class AnnexRepo(GitRepo, RepoInterface):
           key for every metadata item, reflecting the modification
           time, as well as a 'lastchanged' key with the most recent
           modification time of any metadata item.
+        batch: bool, optional
+          If set, files are fed to a batched 'metadata' in chunks, and
+          records are yielded as soon as git-annex reports them.  Files
+          not under annex are not reported, annexed files without any
+          metadata are reported with an empty dictionary.  Directories are not supported
+          in this mode.
 
         Returns
         -------
@@ -3162,13 +3318,30 @@ class AnnexRepo(GitRepo, RepoInterface):
         if not files:
             return
         files = assure_list(files)
-        opts = ['--json']
-        for res in self._run_annex_command_json(
-                'metadata', opts=opts, files=files):
+        if batch and self.git_annex_version < '6.20180206':
+            lgr.debug("git-annex %s does not support batched metadata "
+                      "queries, querying directly", self.git_annex_version)
+            batch = False
+        if batch:
+            results = (
+                res for res in self._stream_batched(
+                    'metadata',
+                    # batch mode takes JSON requests
+                    [json.dumps({'file': f}) for f in files],
+                    json=True)
+                # empty record for files not annexed
+                if res)
+        else:
+            results = self._run_annex_command_json(
+                'metadata', opts=['--json'], files=files)
+        for res in results:
+            # annexed files without any metadata are reported with
+            # an empty dict, just like in the one-shot mode
+            fields = res.get('fields', {})
             yield (
                 res['file'],
-                res['fields'] if timestamps else \
-                {k: v for k, v in res['fields'].items()
+                fields if timestamps else \
+                {k: v for k, v in fields.items()
                  if not k.endswith('lastchanged')})
 
     def set_metadata(
@@ -3324,7 +3497,10 @@ def readlines_until_ok_or_failed(stdout, maxlines=100):
 
 
 def readline_json(stdout):
-    return json_loads(stdout.readline().strip())
+    line = stdout.readline().strip()
+    # annex replies with an empty line to the entries it has nothing to say
+    # about (e.g. whereis for a file which is not annexed)
+    return json_loads(line) if line else {}
 
 
 @auto_repr
@@ -3443,6 +3619,73 @@ class BatchedAnnex(object):
 
         return output if input_multiple else output[0]
 
+    def stream(self, cmds):
+        """Pipeline `cmds` into the process and yield replies as they arrive
+
+        In contrast to `__call__`, which sends a single request and then
+        waits for its reply before sending the next one, all requests are
+        written to stdin from a separate thread while replies are read (in
+        the order of the requests) in the calling one.  Thus throughput is
+        limited by git-annex itself and not by the latency of the pipes.
+
+        Parameters
+        ----------
+        cmds : iterable of (str or tuple)
+
+        Returns
+        -------
+        generator
+          Output received from annex, one item per entry in `cmds`.
+          If the generator is not exhausted, remaining replies are still
+          consumed upon its closing, so the process could be reused.
+        """
+        entries = [
+            (e if isinstance(e, string_types) else ' '.join(e)) + '\n'
+            for e in cmds
+        ]
+        if not entries:
+            return
+        if not self._process:
+            self._initialize()
+        self._check_process(restart=True)
+        process = self._process
+        writer = _BatchWriter(process.stdin, entries)
+        lgr.log(5, "Streaming %d entries to batched annex %s",
+                len(entries), self)
+        writer.start()
+        nreceived = 0
+        try:
+            while nreceived < len(entries):
+                out = self.output_proc(process.stdout) \
+                    if not process.stdout.closed else None
+                if not out and process.poll() is not None:
+                    stderr = self.close(return_stderr=True)
+                    raise AnnexBatchCommandError(
+                        cmd=' '.join(self.annex_cmd),
+                        msg="Process has terminated after replying to %d out "
+                            "of %d requests%s"
+                            % (nreceived, len(entries),
+                               (": %s" % stderr) if stderr else ""))
+                nreceived += 1
+                lgr.log(5, "Received output: %r", out)
+                yield out
+        finally:
+            if nreceived < len(entries) and self._process is process:
+                if writer.exc is None and process.poll() is None:
+                    # the consumer is gone early, but annex would still reply
+                    # to everything we have sent, so drain it before the
+                    # process could be used again
+                    lgr.log(5, "Draining %d remaining replies from %s",
+                            len(entries) - nreceived, self)
+                    for _ in range(len(entries) - nreceived):
+                        self.output_proc(process.stdout)
+                else:
+                    self.close()
+            writer.join()
+            if writer.exc is not None:
+                lgr.warning("Failed to send all entries to %s: %s",
+                            self, exc_str(writer.exc))
+
     def __del__(self):
         self.close()
 
@@ -11,16 +11,25 @@
 """
 
 import hashlib
+import json
 import patoolib
 from .external_versions import external_versions
 # There were issues, so let's stay consistently with recent version
 assert(external_versions["patoolib"] >= "1.7")
 
 import os
+import posixpath
+import shutil
+import tarfile
 import tempfile
+import time
+import zipfile
 from os.path import join as opj, exists, abspath, isabs, normpath, relpath, pardir, isdir
 from os.path import sep as opsep
 from os.path import realpath
+from os.path import dirname
+from distutils.spawn import find_executable
+from subprocess import Popen, PIPE
 from six import next
 from six.moves.urllib.parse import unquote as urlunquote
 
@@ -60,6 +69,8 @@ from ..support.exceptions import CommandError
 from ..utils import swallow_outputs
 from ..utils import rmtemp
 from ..cmd import Runner
+from ..cmd import link_file_load
+from ..dochelpers import exc_str
 from ..consts import ARCHIVES_TEMP_DIR
 from ..utils import rmtree
 from ..utils import get_tempfile_kwargs
@@ -68,6 +79,8 @@ from ..utils import on_windows
 
 _runner = Runner()
 
+archive_index_version = 1
+
 
 def _patool_run(cmd, verbosity=0, **kwargs):
     """Decorated runner for patool so it doesn't spit out outputs to stdout"""
@@ -94,6 +107,28 @@ DECOMPRESSORS = {
     '\.(zip)$': 'unzip %(file)s -d %(dir)s',
 }
 
+# multi-threaded decompressors (in order of preference) to stream compressed
+# tar archives through, reading stdin and writing stdout
+PARALLEL_DECOMPRESSORS = {
+    'gz': (('pigz', '-dc'),),
+    'bz2': (('lbzip2', '-dc'), ('pbzip2', '-dc')),
+    'xz': (('pixz', '-d'), ('xz', '-dc', '-T0')),
+}
+_parallel_decompressors = {}
+
+
+def _get_parallel_decompressor(compression):
+    """Return the command of an available parallel decompressor, or None"""
+    if compression not in _parallel_decompressors:
+        cmd = None
+        for candidate in PARALLEL_DECOMPRESSORS.get(compression, ()):
+            exe = find_executable(candidate[0])
+            if exe:
+                cmd = [exe] + list(candidate[1:])
+                break
+        _parallel_decompressors[compression] = cmd
+    return _parallel_decompressors[compression]
+
 
 def unixify_path(path):
     """On windows convert paths from drive:\d\file to /drive/d/file
@@ -115,9 +150,64 @@ def unixify_path(path):
         return path
 
 
+def _decompress_tar_parallel(archive, dir_):
+    """Extract a compressed tar archive piping it through a parallel decompressor
+
+    Returns
+    -------
+    bool
+      False if no parallel decompressor (or tar) is available for `archive`,
+      in which case nothing was done.
+    """
+    if on_windows:
+        return False
+    compression = _get_tar_compression(archive)
+    decompressor = _get_parallel_decompressor(compression) \
+        if compression else None
+    tar = find_executable('tar') if decompressor else None
+    if not tar:
+        return False
+    try:
+        if not tarfile.is_tarfile(archive):
+            return False
+    except Exception as exc:
+        # e.g. a truncated archive, leave reporting it to patool
+        lgr.debug("Cannot check if %s is a tar archive: %s",
+                  archive, exc_str(exc))
+        return False
+    cmd = [tar, '-xf', '-', '-C', dir_]
+    lgr.debug("Extracting %s using %s", archive, ' '.join(decompressor))
+    # the decompressor's stderr goes to a file, since nobody would read a
+    # pipe while waiting for tar, and it could block on a full pipe buffer
+    with open(archive, 'rb') as f, tempfile.TemporaryFile() as derrf:
+        dproc = Popen(decompressor, stdin=f, stdout=PIPE, stderr=derrf)
+        tproc = Popen(cmd, stdin=dproc.stdout, stdout=PIPE, stderr=PIPE)
+        # so the decompressor gets SIGPIPE if tar exits early
+        dproc.stdout.close()
+        out, err = tproc.communicate()
+        dproc.wait()
+        derrf.seek(0)
+        derr = derrf.read()
+    # tar failing first would make the decompressor fail as well
+    for proc, cmd_, stderr in ((tproc, cmd, err),
+                               (dproc, decompressor, derr)):
+        if proc.returncode:
+            raise CommandError(
+                cmd=' '.join(cmd_),
+                msg="Failed to extract %s" % archive,
+                code=proc.returncode,
+                stdout=out,
+                stderr=stderr)
+    return True
+
+
 def decompress_file(archive, dir_, leading_directories='strip'):
     """Decompress `archive` into a directory `dir_`
 
+    Compressed tar archives are piped through a multi-threaded decompressor
+    (see `PARALLEL_DECOMPRESSORS`) if one is available, any other archive is
+    extracted by patool.
+
     Parameters
     ----------
     archive: str
@@ -131,17 +221,18 @@ def decompress_file(archive, dir_, leading_directories='strip'):
         lgr.debug("Creating directory %s to extract archive into" % dir_)
         os.makedirs(dir_)
 
-    with swallow_outputs() as cmo:
-        patoolib.util.check_existing_filename(archive)
-        patoolib.util.check_existing_filename(dir_, onlyfiles=False)
-        # Call protected one to avoid the checks on existence on unixified path
-        patoolib._extract_archive(unixify_path(archive),
-                                  outdir=unixify_path(dir_),
-                                  verbosity=100)
-        if cmo.out:
-            lgr.debug("patool gave stdout:\n%s" % cmo.out)
-        if cmo.err:
-            lgr.debug("patool gave stderr:\n%s" % cmo.err)
+    if not _decompress_tar_parallel(archive, dir_):
+        with swallow_outputs() as cmo:
+            patoolib.util.check_existing_filename(archive)
+            patoolib.util.check_existing_filename(dir_, onlyfiles=False)
+            # Call protected one to avoid the checks on existence on unixified path
+            patoolib._extract_archive(unixify_path(archive),
+                                      outdir=unixify_path(dir_),
+                                      verbosity=100)
+            if cmo.out:
+                lgr.debug("patool gave stdout:\n%s" % cmo.out)
+            if cmo.err:
+                lgr.debug("patool gave stderr:\n%s" % cmo.err)
 
     # Note: (ben) Experienced issue, where extracted tarball
     # lacked execution bit of directories, leading to not being
@@ -219,6 +310,177 @@ def compress_files(files, archive, path=None, overwrite=True):
             lgr.debug("patool gave stderr:\n%s" % cmo.err)
 
 
+def _normalize_member_name(name):
+    """Normalize a path within an archive, e.g. './a//b' -> 'a/b'"""
+    name = posixpath.normpath(name.replace('\\', '/')).lstrip('/')
+    return '' if name == '.' else name
+
+
+def _open_archive_member(archive, member):
+    """Open a regular file member of a tar or zip archive for reading
+
+    Returns
+    -------
+    (file object, closer) or None
+      None if the archive is neither a tar nor a zip archive, or has no
+      such regular file.  `closer` must be called once done with the file
+      object.  If an archive contains the member more than once, the last
+      occurrence is opened, as it is the one a full extraction leaves
+      behind.
+    """
+    if zipfile.is_zipfile(archive):
+        zf = zipfile.ZipFile(archive)
+        infos = [info for info in zf.infolist()
+                 if _normalize_member_name(info.filename) == member]
+        if infos and not infos[-1].filename.endswith('/'):
+            return zf.open(infos[-1]), zf.close
+        zf.close()
+    elif tarfile.is_tarfile(archive):
+        tf = tarfile.open(archive, 'r:*')
+        infos = [info for info in tf
+                 if _normalize_member_name(info.name) == member]
+        if infos and \
+                (infos[-1].isfile() or infos[-1].islnk() or infos[-1].issym()):
+            fobj = tf.extractfile(infos[-1])
+            if fobj is not None:
+                return fobj, tf.close
+        tf.close()
+    return None
+
+
+def _open_indexed_member(archive, info):
+    """Open a member at the offset recorded in an archive index"""
+    f = open(archive, 'rb')
+    f.seek(info['offset'])
+    return _BoundedReader(f, info['size']), lambda: None
+
+
+class _BoundedReader(object):
+    """Read-only file object limited to a number of bytes"""
+    def __init__(self, fobj, size):
+        self._fobj = fobj
+        self._remaining = size
+
+    def read(self, size=-1):
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._fobj.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._fobj.close()
+
+
+def extract_archive_member(archive, member, dst, info=None):
+    """Extract a single file from a tar or zip archive
+
+    In contrast to `decompress_file`, which extracts an entire archive, only
+    the member's content is read from the archive and streamed into `dst`.
+
+    Parameters
+    ----------
+    archive : str
+    member : str
+      Path of the file within the archive.
+    dst : str
+      Path of the file to write the content into.
+    info : dict, optional
+      Record of the member in the archive's index (see `index_archive`).
+      The content of a seekable member is read directly at its offset.
+
+    Returns
+    -------
+    bool
+      False if the member could not be extracted this way (any other
+      archive format, no such regular file), in which case nothing was done.
+    """
+    member_ = _normalize_member_name(member)
+    if info and info.get('seekable'):
+        opened = _open_indexed_member(archive, info)
+    else:
+        opened = _open_archive_member(archive, member_) if member_ else None
+    if opened is None:
+        lgr.debug("Cannot extract %s from %s directly", member, archive)
+        return False
+    fobj, closer = opened
+    lgr.debug("Extracting %s from %s into %s", member, archive, dst)
+    try:
+        with open(dst, 'wb') as f:
+            shutil.copyfileobj(fobj, f, 1024 * 1024)
+    except:
+        # do not leave a partial file behind
+        if exists(dst):
+            os.unlink(dst)
+        raise
+    finally:
+        fobj.close()
+        closer()
+    return True
+
+
+def _get_tar_compression(archive):
+    """Return the compression ('gz', 'bz2', 'xz') of a tar archive, or None"""
+    with open(archive, 'rb') as f:
+        magic = f.read(6)
+    for compression, prefix in (('gz', b'\x1f\x8b'),
+                                ('bz2', b'BZh'),
+                                ('xz', b'\xfd7zXZ\x00')):
+        if magic.startswith(prefix):
+            return compression
+    return None
+
+
+def index_archive(archive):
+    """Create an index of the files in a tar or zip archive
+
+    Returns
+    -------
+    dict
+      'format' ('tar', 'zip', or None for any other archive format), and
+      'members': {path: dict(offset=..., size=..., compression=...,
+      seekable=...)} of all regular files (and links in tar archives), with
+      normalized paths.  For a seekable member, `size` bytes at `offset` of
+      the archive file are its content (uncompressed tar archives).
+      Otherwise `offset` is that of the member in the (decompressed) tar
+      stream, or of its local header in a zip archive.
+    """
+    members = {}
+    if zipfile.is_zipfile(archive):
+        fmt = 'zip'
+        zf = zipfile.ZipFile(archive)
+        try:
+            for info in zf.infolist():
+                if info.filename.endswith('/'):
+                    continue
+                members[_normalize_member_name(info.filename)] = dict(
+                    offset=info.header_offset,
+                    size=info.file_size,
+                    compression=info.compress_type,
+                    seekable=False)
+        finally:
+            zf.close()
+    elif tarfile.is_tarfile(archive):
+        fmt = 'tar'
+        compression = _get_tar_compression(archive)
+        tf = tarfile.open(archive, 'r:*')
+        try:
+            for info in tf:
+                if not (info.isfile() or info.islnk() or info.issym()):
+                    continue
+                members[_normalize_member_name(info.name)] = dict(
+                    offset=info.offset_data,
+                    size=info.size,
+                    compression=compression,
+                    seekable=compression is None and info.isfile()
+                    and not info.issparse())
+        finally:
+            tf.close()
+    else:
+        fmt = None
+    return dict(version=archive_index_version, format=fmt, members=members)
+
+
 def _get_cached_filename(archive):
     """A helper to generate a filename which has original filename and additional suffix
     which wouldn't collide across files with the same name from different locations
@@ -238,6 +500,27 @@ def _get_random_id(size=6, chars=string.ascii_uppercase + string.digits):
     return ''.join(random.choice(chars) for _ in range(size))
 
 
+def _get_tree_size(path):
+    """Return the total size of the files under `path`"""
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.lstat(opj(root, name)).st_size
+            except OSError:
+                # removed meanwhile
+                pass
+    return size
+
+
+def _used_since(stamp_path, since):
+    """Check if an extracted archive was used since a point in time"""
+    try:
+        return os.stat(stamp_path).st_atime >= since
+    except OSError:
+        return False
+
+
 class ArchivesCache(object):
     """Cache to maintain extracted archives
 
@@ -248,11 +531,14 @@ class ArchivesCache(object):
       If not provided -- random tempdir is used
     persistent : bool, optional
       Passed over into generated ExtractedArchives
+    size_limit : int, optional
+      Maximal size (in bytes) of the archives extracted in a persistent
+      cache.  Least recently used ones beyond it are removed whenever a
+      cache is opened or cleaned (see `evict`).
     """
-    # TODO: make caching persistent across sessions/runs, with cleanup
     # IDEA: extract under .git/annex/tmp so later on annex unused could clean it
     #       all up
-    def __init__(self, toppath=None, persistent=False):
+    def __init__(self, toppath=None, persistent=False, size_limit=None):
 
         self._toppath = toppath
         if toppath:
@@ -268,6 +554,7 @@ class ArchivesCache(object):
             path = tempfile.mktemp(**get_tempfile_kwargs())
         self._path = path
         self.persistent = persistent
+        self.size_limit = size_limit
         # TODO?  assure that it is absent or we should allow for it to persist a bit?
         #if exists(path):
         #    self._clean_cache()
@@ -286,6 +573,9 @@ class ArchivesCache(object):
         else:
             lgr.debug("Not initiating existing cache for the archives under %s" % self.path)
             self._made_path = False
+            if persistent:
+                # might have been left beyond the limit by previous sessions
+                self.evict()
 
     @property
     def path(self):
@@ -302,6 +592,97 @@ class ArchivesCache(object):
         if (not self.persistent) or force:
             lgr.debug("Removing the entire archives cache under %s" % self.path)
             rmtemp(self.path)
+        else:
+            self.evict()
+
+    def evict(self, size_limit=None):
+        """Remove least recently used extracted archives beyond a size limit
+
+        Archives are ordered by the last time their extracted content was
+        used (access time of their stamp files).  Any archive which is being
+        extracted, or gets used, by another process in the meantime is not
+        removed.  Indexes of archives' members count towards the size, and
+        are removed along with their extracted archive.
+
+        Parameters
+        ----------
+        size_limit : int, optional
+          Maximal size in bytes.  By default the `size_limit` of the cache,
+          nothing is removed if there is none.
+
+        Returns
+        -------
+        list
+          Paths of the extracted archives which were removed.
+        """
+        if size_limit is None:
+            size_limit = self.size_limit
+        if not size_limit or not exists(self.path):
+            return []
+        started = time.time()
+        index_suffix = ExtractedArchive.INDEX_SUFFIX
+        paths = set()
+        for name in os.listdir(self.path):
+            path = opj(self.path, name)
+            if name.endswith(index_suffix):
+                paths.add(path[:-len(index_suffix)])
+            elif isdir(path):
+                paths.add(path)
+            # else: stamps, locks
+        entries = []
+        for path in paths:
+            stamp_path = path + ExtractedArchive.STAMP_SUFFIX
+            index_path = path + index_suffix
+            try:
+                if exists(stamp_path):
+                    atime = os.stat(stamp_path).st_atime
+                elif isdir(path):
+                    # directories without a stamp are left from failed or
+                    # ongoing extractions, and are considered the oldest
+                    atime = 0
+                else:
+                    # only an index is left
+                    atime = os.stat(index_path).st_atime
+                size = _get_tree_size(path) + \
+                    (os.stat(index_path).st_size if exists(index_path) else 0)
+            except OSError:
+                # removed meanwhile
+                continue
+            entries.append((atime, path, size))
+        total = sum(size for _, _, size in entries)
+        evicted = []
+        for atime, path, size in sorted(entries):
+            if total <= size_limit:
+                break
+            stamp_path = path + ExtractedArchive.STAMP_SUFFIX
+            index_path = path + index_suffix
+            lock_path = path
+            if path.endswith(ExtractedArchive.TMP_SUFFIX):
+                # extraction directory, locked along with its archive
+                lock_path = path[:-len(ExtractedArchive.TMP_SUFFIX)]
+            # do not wait for a process extracting this archive
+            with lock_if_check_fails(
+                check=(_used_since, (stamp_path, started)),
+                lock_path=lock_path,
+                operation="extract",
+                blocking=False
+            ) as (check, lock):
+                if lock is None or not lock.acquired:
+                    lgr.debug("Not evicting %s from the archives cache "
+                              "since it is in use", path)
+                    continue
+                lgr.debug("Evicting %s from the archives cache", path)
+                # remove the stamp first, so it is not considered to be
+                # extracted by anyone
+                if exists(stamp_path):
+                    os.unlink(stamp_path)
+                if exists(path):
+                    rmtree(path)
+                if exists(index_path):
+                    os.unlink(index_path)
+            total -= size
+            evicted.append(path)
+        return evicted
 
     def _get_normalized_archive_path(self, archive):
         """Return full path to archive
@@ -355,6 +736,10 @@ class ExtractedArchive(object):
 
     # suffix to use for a stamp so we could guarantee that extracted archive is
     STAMP_SUFFIX = '.stamp'
+    # suffix of the file with the index of archive's members
+    INDEX_SUFFIX = '.index.json'
+    # suffix of the directory the archive is extracted into at first
+    TMP_SUFFIX = '.extracting'
 
     def __init__(self, archive, path=None, persistent=False):
         self._archive = archive
@@ -367,11 +752,12 @@ class ExtractedArchive(object):
                                "persist" % path)
         self._persistent = persistent
         self._path = path
+        self._index = None
 
     def __repr__(self):
         return "%s(%r, path=%r)" % (self.__class__.__name__, self._archive, self.path)
 
-    def clean(self, force=False):
+    def clean(self, force=False, keep_index=False):
         # would interfere with tests
         # if os.environ.get('DATALAD_TESTS_TEMP_KEEP'):
         #     lgr.info("As instructed, not cleaning up the cache under %s"
@@ -380,8 +766,12 @@ class ExtractedArchive(object):
 
         for path, name in [
             (self._path, 'cache'),
-            (self.stamp_path, 'stamp file')
+            (self.stamp_path, 'stamp file'),
+            (None if keep_index else self.index_path, 'index'),
+            (self.tmp_path, 'extraction directory'),
         ]:
+            if path is None:
+                continue
             if exists(path):
                 if (not self._persistent) or force:
                     lgr.debug("Cleaning up the %s for %s under %s", name, self._archive, path)
@@ -399,11 +789,104 @@ class ExtractedArchive(object):
     def stamp_path(self):
         return self._path + self.STAMP_SUFFIX
 
+    @property
+    def index_path(self):
+        return self._path + self.INDEX_SUFFIX
+
+    def get_index(self, build=True):
+        """Return the index of the archive's members (see `index_archive`)
+
+        The index is stored next to the extracted archive, so it persists
+        along with it, and is created only once.
+
+        Parameters
+        ----------
+        build : bool, optional
+          Whether to create the index if there is none yet.  Otherwise None
+          is returned then.
+        """
+        if self._index is not None:
+            return self._index
+        index_path = self.index_path
+        if exists(index_path) and \
+                os.stat(index_path).st_mtime >= os.stat(self._archive).st_mtime:
+            try:
+                with open(index_path) as f:
+                    index = json.load(f)
+                if index.get('version') == archive_index_version:
+                    self._index = index
+                    return index
+            except (IOError, OSError, ValueError) as exc:
+                lgr.debug("Failed to load index of %s from %s: %s",
+                          self._archive, index_path, exc_str(exc))
+        if not build:
+            return None
+        lgr.debug("Indexing %s", self._archive)
+        index = index_archive(self._archive)
+        try:
+            index_dir = dirname(index_path)
+            if not exists(index_dir):
+                os.makedirs(index_dir)
+            # write to a temporary file and rename, so any concurrent
+            # process would see either no or the complete index
+            fd, tmpfname = tempfile.mkstemp(dir=index_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(index, f)
+            os.rename(tmpfname, index_path)
+        except (IOError, OSError) as exc:
+            lgr.debug("Failed to store index of %s in %s: %s",
+                      self._archive, index_path, exc_str(exc))
+        self._index = index
+        return index
+
+    def get_member_info(self, afile, build=True):
+        """Return the record of `afile` in the archive's index
+
+        Returns
+        -------
+        dict or None
+          None if the archive does not contain this file, or if it is not
+          known (archive format which cannot be indexed, or no index and not
+          `build`).
+        """
+        index = self.get_index(build=build)
+        if not index:
+            return None
+        return index['members'].get(_normalize_member_name(urlunquote(afile)))
+
+    def has_member(self, afile):
+        """Check if the archive contains `afile`, using an existing index
+
+        Returns
+        -------
+        bool or None
+          None if it is not known without indexing or extracting the archive.
+        """
+        if self.is_extracted:
+            return exists(self.get_extracted_filename(afile))
+        index = self.get_index(build=False)
+        if not index or not index['format']:
+            return None
+        return _normalize_member_name(urlunquote(afile)) in index['members']
+
     @property
     def is_extracted(self):
         return exists(self.path) and exists(self.stamp_path) \
             and os.stat(self.stamp_path).st_mtime >= os.stat(self.path).st_mtime
 
+    def touch(self):
+        """Mark the extracted archive as used now, for the cache eviction
+
+        Only the access time of the stamp is changed, its modification time
+        marks the extraction.
+        """
+        try:
+            os.utime(self.stamp_path,
+                     (time.time(), os.stat(self.stamp_path).st_mtime))
+        except OSError as exc:
+            lgr.debug("Failed to update the stamp of %s: %s",
+                      self, exc_str(exc))
+
     def assure_extracted(self):
         """Return path to the extracted `archive`.  Extract archive if necessary
         """
@@ -419,27 +902,38 @@ class ExtractedArchive(object):
                 self._extract_archive(path)
         return path
 
+    @property
+    def tmp_path(self):
+        """Directory to extract the archive into before moving it to `path`"""
+        return self._path + self.TMP_SUFFIX
+
     def _extract_archive(self, path):
         # we need to extract the archive
-        # TODO: extract to _tmp and then move in a single command so we
-        # don't end up picking up broken pieces
         lgr.debug("Extracting {self._archive} under {path}".format(**locals()))
-        if exists(path):
-            lgr.debug(
-                "Previous extracted (but probably not fully) cached archive "
-                "found. Removing %s",
-                path)
-            rmtree(path)
-        os.makedirs(path)
-        assert (exists(path))
         # remove old stamp
         if exists(self.stamp_path):
             rmtree(self.stamp_path)
-        decompress_file(self._archive, path, leading_directories=None)
+        # extract into a sibling directory and move it in place in a single
+        # rename, so we never end up picking up broken pieces
+        tmp_path = self.tmp_path
+        for path_ in (path, tmp_path):
+            if exists(path_):
+                lgr.debug(
+                    "Previous extracted (but probably not fully) cached archive "
+                    "found. Removing %s",
+                    path_)
+                rmtree(path_)
+        os.makedirs(tmp_path)
+        try:
+            decompress_file(self._archive, tmp_path, leading_directories=None)
+        except:
+            rmtree(tmp_path)
+            raise
         # TODO: must optional since we might to use this content, move it
         # into the tree etc
         # lgr.debug("Adjusting permissions to R/O for the extracted content")
         # rotree(path)
+        os.rename(tmp_path, path)
         assert (exists(path))
         # create a stamp
         with open(self.stamp_path, 'w') as f:
@@ -522,12 +1016,51 @@ class ExtractedArchive(object):
         # We could somehow adjust them while extracting and here channel back
         # "fixed" up names since they are only to point to the load
         self.assure_extracted()
+        self.touch()
         path = self.get_extracted_filename(afile)
+        if not exists(path) and not self.is_extracted:
+            # evicted from the cache by another process meanwhile
+            self.assure_extracted()
         # TODO: make robust
         lgr.log(2, "Verifying that %s exists" % abspath(path))
         assert exists(path), "%s must exist" % path
         return path
 
+    def extract_file(self, afile, dst):
+        """Provide the content of `afile` at `dst`
+
+        From an archive which was not extracted already, only that file is
+        extracted if possible (see `extract_archive_member`), directly from
+        its offset if the archive's index tells it, otherwise the entire
+        archive is extracted and the file linked/copied from there.
+        """
+        if not self.is_extracted:
+            try:
+                # compressed tar archives would need to be read entirely to
+                # get indexed, so stream those without an index
+                info = self.get_member_info(
+                    afile,
+                    build=_get_tar_compression(self._archive) is None)
+                if extract_archive_member(
+                        self._archive, urlunquote(afile), dst, info=info):
+                    return
+            except Exception as exc:
+                lgr.debug("Failed to extract %s from %s directly, will "
+                          "extract the entire archive: %s",
+                          afile, self._archive, exc_str(exc))
+        for attempt in range(3):
+            path = self.get_extracted_file(afile)
+            try:
+                link_file_load(path, dst)
+                return
+            except (IOError, OSError) as exc:
+                if exists(path) or attempt == 2:
+                    raise
+                # evicted from the cache by another process right after
+                # we have touched it, get_extracted_file() extracts again
+                lgr.debug("%s vanished from the cache while linking it, "
+                          "retrying: %s", path, exc_str(exc))
+
     def __del__(self):
         try:
             if self._persistent:
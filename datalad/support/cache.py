@@ -9,6 +9,9 @@
 """Simple constructs to be used as caches
 """
 
+import os
+import threading
+
 from collections import OrderedDict
 from six import PY2
 
@@ -35,3 +38,63 @@ class DictCache(OrderedDict):
         if self.size_limit is not None:
             while len(self) > self.size_limit:
                 self.popitem(last=False)
+
+
+class FileObjectCache(object):
+    """LRU cache of objects loaded from files
+
+    Entries are keyed on the file path (and the loader used), and are only
+    reused as long as the file's modification time, size, and inode remain
+    unchanged.  At most `size_limit` objects are kept, the least recently
+    used ones are expunged first.  Cached objects are shared among all
+    callers and must not be modified.
+
+    Attributes
+    ----------
+    hits, misses : int
+      Number of loads served from the cache, and of actual loads.
+    """
+    def __init__(self, size_limit=None):
+        self.size_limit = size_limit
+        self.hits = 0
+        self.misses = 0
+        self._objs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._objs)
+
+    def clear(self):
+        with self._lock:
+            self._objs.clear()
+            self.hits = self.misses = 0
+
+    def load(self, fpath, loader):
+        """Return `loader(fpath)`, possibly from the cache
+
+        If the file cannot be stat'ed (e.g. a broken symlink), `loader` is
+        called without caching anything, so it can report the problem.
+        """
+        try:
+            st = os.stat(fpath)
+        except OSError:
+            return loader(fpath)
+        key = (fpath, loader)
+        stamp = (st.st_mtime, st.st_size, st.st_ino)
+        with self._lock:
+            entry = self._objs.pop(key, None)
+            if entry is not None and entry[0] == stamp:
+                # re-insert as the most recently used
+                self._objs[key] = entry
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        obj = loader(fpath)
+        if self.size_limit is not None and self.size_limit < 1:
+            return obj
+        with self._lock:
+            self._objs[key] = (stamp, obj)
+            while self.size_limit is not None \
+                    and len(self._objs) > self.size_limit:
+                self._objs.popitem(last=False)
+        return obj
@@ -0,0 +1,596 @@
+# emacs: -*- mode: python; py-indent-offset: 4; tab-width: 4; indent-tabs-mode: nil -*-
+# ex: set sts=4 ts=4 sw=4 noet:
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+#
+#   See COPYING file distributed along with the datalad package for the
+#   copyright and license terms.
+#
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+"""In-process reader of git configuration files
+
+Reads configuration the way `git config -l` does (same sources, same order,
+same parsing rules, including `include.path` and `includeIf.<cond>.path`),
+but without running git.  Whenever something is encountered which is not
+supported here, `GitConfigUnsupported` is raised, and the caller is
+expected to ask git itself.
+
+Note, that this module must not use the datalad configuration (or logging
+configured by it), since it is used to load it.
+"""
+
+__docformat__ = 'restructuredtext'
+
+import io
+import os
+import re
+import string
+
+from os.path import join as opj
+from os.path import abspath
+from os.path import dirname
+from os.path import expanduser
+from os.path import exists
+from os.path import isabs
+from os.path import isdir
+from os.path import isfile
+from os.path import realpath
+
+from distutils.spawn import find_executable
+from six import PY2
+
+from datalad.cmd import GitRunner
+from datalad.utils import on_windows
+
+# git would refuse to go deeper
+MAX_INCLUDE_DEPTH = 10
+
+_SPACES = ' \t\n\v\f\r'
+_ALPHA = string.ascii_letters
+_KEYCHARS = string.ascii_letters + string.digits + '-'
+
+
+class GitConfigUnsupported(Exception):
+    """Configuration cannot be read here the same way git would read it"""
+    pass
+
+
+class _Source(object):
+    """Character source mimicking git's get_next_char()"""
+
+    def __init__(self, content, origin):
+        self.content = content
+        self.origin = origin
+        self.pos = 0
+        self.linenr = 1
+        self.eof = False
+        # git skips UTF-8 BOM
+        if content.startswith('\xef\xbb\xbf' if PY2 else u'\ufeff'):
+            self.pos = 3 if PY2 else 1
+
+    def next(self):
+        content = self.content
+        if self.pos >= len(content):
+            # EOF looks like the end of a line, ever after
+            self.eof = True
+            return '\n'
+        c = content[self.pos]
+        self.pos += 1
+        if c == '\r' and content[self.pos:self.pos + 1] == '\n':
+            self.pos += 1
+            c = '\n'
+        if c == '\n':
+            self.linenr += 1
+        return c
+
+    def error(self, msg):
+        return ValueError(
+            "bad config line %d in %s: %s"
+            % (self.linenr, self.origin or 'command line', msg))
+
+
+def _parse_section(src):
+    """Parse section header after the opening '['
+
+    Returns
+    -------
+    str
+      Canonical section name, with the subsection (if any).
+    """
+    name = []
+    while True:
+        c = src.next()
+        if src.eof:
+            raise src.error('incomplete section header')
+        if c == ']':
+            return ''.join(name)
+        if c in _SPACES:
+            break
+        if c not in _KEYCHARS and c != '.':
+            raise src.error('invalid character in section name')
+        # also old-style [section.Subsection] ends up lower case
+        name.append(c.lower())
+    # extended [section "subsection"]
+    while c in _SPACES:
+        if c == '\n':
+            raise src.error('incomplete section header')
+        c = src.next()
+    if c != '"':
+        raise src.error('subsection name must be quoted')
+    name.append('.')
+    while True:
+        c = src.next()
+        if c == '\n':
+            raise src.error('incomplete section header')
+        if c == '"':
+            break
+        if c == '\\':
+            c = src.next()
+            if c == '\n':
+                raise src.error('incomplete section header')
+        name.append(c)
+    if src.next() != ']':
+        raise src.error('subsection name must be followed by ]')
+    return ''.join(name)
+
+
+def _parse_value(src):
+    value = []
+    quote = comment = False
+    space = 0
+    while True:
+        c = src.next()
+        if c == '\n':
+            if quote:
+                raise src.error('unterminated quote')
+            return ''.join(value)
+        if comment:
+            continue
+        if c in _SPACES and not quote:
+            # only whitespace within a value is kept (normalized)
+            if value:
+                space += 1
+            continue
+        if not quote and c in '#;':
+            comment = True
+            continue
+        value.extend(' ' * space)
+        space = 0
+        if c == '\\':
+            c = src.next()
+            if c == '\n':
+                # line continuation
+                continue
+            elif c == 't':
+                c = '\t'
+            elif c == 'b':
+                c = '\b'
+            elif c == 'n':
+                c = '\n'
+            elif c not in '\\"':
+                raise src.error('unknown escape sequence')
+            value.append(c)
+            continue
+        if c == '"':
+            quote = not quote
+            continue
+        value.append(c)
+
+
+def parse_gitconfig(content, origin=None):
+    """Parse content of a git configuration file
+
+    Parameters
+    ----------
+    content : str
+    origin : str, optional
+      Name of the file the content was read from, only used in error
+      messages.
+
+    Yields
+    ------
+    tuple
+      (name, value) for each configuration item in the order of
+      appearance.  Names are canonical like the ones reported by
+      `git config -l` (lower case section and variable names, case of
+      subsection names preserved).  Value is None for items without
+      a value (which git treats as boolean true).
+
+    Raises
+    ------
+    ValueError
+      for any content git would consider invalid
+    """
+    src = _Source(content, origin)
+    section = None
+    comment = False
+    while True:
+        c = src.next()
+        if c == '\n':
+            if src.eof:
+                return
+            comment = False
+            continue
+        if comment or c in _SPACES:
+            continue
+        if c in '#;':
+            comment = True
+            continue
+        if c == '[':
+            section = _parse_section(src)
+            continue
+        if c not in _ALPHA:
+            raise src.error('invalid variable name')
+        if not section:
+            raise src.error('variable outside of a section')
+        var = [c.lower()]
+        while True:
+            c = src.next()
+            if c not in _KEYCHARS:
+                break
+            var.append(c.lower())
+        while c in ' \t':
+            c = src.next()
+        value = None
+        if c != '\n':
+            if c != '=':
+                raise src.error("variable name must be followed by '='")
+            value = _parse_value(src)
+        yield '%s.%s' % (section, ''.join(var)), value
+
+
+def _read_file(fname):
+    with io.open(fname, 'rb') as f:
+        content = f.read()
+    # keep native str, as git output is
+    return content if PY2 else content.decode('utf-8')
+
+
+#
+# Conditional includes
+#
+def _wildmatch_regex(pattern, icase=False):
+    """Translate git's wildmatch pattern (with WM_PATHNAME) into a regex"""
+    res = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern[i:i + 2] == '**' and (i == 0 or pattern[i - 1] == '/'):
+                if pattern[i + 2:i + 3] == '/':
+                    # zero or more leading directories
+                    res.append('(?:.*/)?')
+                    i += 3
+                    continue
+                elif i + 2 == n:
+                    # anything underneath
+                    res.append('.*')
+                    i += 2
+                    continue
+            while i < n and pattern[i] == '*':
+                i += 1
+            res.append('[^/]*')
+            continue
+        elif c == '?':
+            res.append('[^/]')
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            res.append(re.escape(pattern[i]))
+        elif c == '[':
+            j = i + 1
+            negate = pattern[j:j + 1] in ('!', '^')
+            if negate:
+                j += 1
+            # a leading ] is literal
+            end = pattern.find(']', j + 1)
+            if end < 0:
+                res.append(re.escape(c))
+            else:
+                chars = pattern[j:end]
+                if '[:' in chars:
+                    raise GitConfigUnsupported(
+                        'character classes in %r' % pattern)
+                chars = chars.replace('\\', '\\\\').replace('[', '\\[')
+                res.append(
+                    ('[^/%s]' if negate else '[%s]') % chars)
+                i = end
+        else:
+            res.append(re.escape(c))
+        i += 1
+    return re.compile(''.join(res) + r'\Z', re.IGNORECASE if icase else 0)
+
+
+def _include_by_gitdir(pattern, origin, repo, icase):
+    if not repo or not repo['gitdir']:
+        return False
+    pattern = expanduser(pattern) if pattern.startswith('~') else pattern
+    if pattern.startswith('./'):
+        if not origin:
+            raise ValueError(
+                'relative config include conditionals must come from files')
+        pattern = opj(dirname(realpath(origin)), pattern[2:])
+    elif not isabs(pattern):
+        pattern = '**/' + pattern
+    if pattern.endswith('/'):
+        pattern += '**'
+    regex = _wildmatch_regex(pattern, icase=icase)
+    gitdir = repo['gitdir']
+    return any(regex.match(p)
+               for p in (realpath(gitdir), abspath(gitdir)))
+
+
+def _include_by_branch(pattern, repo):
+    branch = repo.get('branch') if repo else None
+    if not branch:
+        return False
+    if pattern.endswith('/'):
+        pattern += '**'
+    return bool(_wildmatch_regex(pattern).match(branch))
+
+
+def _include_condition(cond, origin, repo):
+    if cond.startswith('gitdir:'):
+        return _include_by_gitdir(cond[7:], origin, repo, False)
+    elif cond.startswith('gitdir/i:'):
+        return _include_by_gitdir(cond[9:], origin, repo, True)
+    elif cond.startswith('onbranch:'):
+        return _include_by_branch(cond[9:], repo)
+    elif cond.startswith('hasconfig:'):
+        raise GitConfigUnsupported('includeIf.%s' % cond)
+    # unknown conditions are false, so future versions could add some
+    return False
+
+
+def _get_include_path(path, origin):
+    if path is None:
+        raise ValueError('missing value for include.path')
+    path = expanduser(path)
+    if not isabs(path):
+        if not origin:
+            raise ValueError(
+                'relative config includes must come from files')
+        path = opj(dirname(origin), path)
+    return path
+
+
+def _iter_items(items, origin, repo, depth):
+    """Yield (origin, name, value) and whatever gets included"""
+    for name, value in items:
+        yield origin, name, value
+        path = None
+        if name == 'include.path':
+            path = _get_include_path(value, origin)
+        elif name.startswith('includeif.') and name.endswith('.path'):
+            # the condition is the subsection
+            if _include_condition(name[10:-5], origin, repo):
+                path = _get_include_path(value, origin)
+        if path is None or not os.access(path, os.R_OK):
+            # git ignores includes which are not there
+            continue
+        if depth >= MAX_INCLUDE_DEPTH:
+            raise ValueError(
+                'exceeded maximum include depth (%d) while including %s'
+                % (MAX_INCLUDE_DEPTH, path))
+        for item in _iter_file(path, repo, depth + 1):
+            yield item
+
+
+def _iter_file(fname, repo, depth=0):
+    for item in _iter_items(
+            parse_gitconfig(_read_file(fname), fname), fname, repo, depth):
+        yield item
+
+
+def read_gitconfig_file(fname):
+    """Read a single configuration file, like `git config -l --file` does
+
+    Includes are not followed (as git does not by default for --file).
+
+    Yields
+    ------
+    tuple
+      (origin, name, value), with origin being the absolute file name.
+    """
+    fname = abspath(fname)
+    for name, value in parse_gitconfig(_read_file(fname), fname):
+        yield fname, name, value
+
+
+#
+# Where git would read its configuration from
+#
+def _getenv_bool(var):
+    val = os.environ.get(var)
+    if val is None:
+        return False
+    return val.lower() in ('1', 'true', 'yes', 'on')
+
+
+def _is_gitdir(path):
+    if not isfile(opj(path, 'HEAD')):
+        return False
+    if isfile(opj(path, 'commondir')):
+        return True
+    return isdir(opj(path, 'objects')) and isdir(opj(path, 'refs'))
+
+
+def _read_gitfile(path):
+    """Return the git directory a .git file points to"""
+    content = _read_file(path).strip()
+    if not content.startswith('gitdir: '):
+        raise ValueError('invalid gitfile format: %s' % path)
+    gitdir = content[8:]
+    if not isabs(gitdir):
+        gitdir = opj(dirname(path), gitdir)
+    return abspath(gitdir)
+
+
+def _check_owner(path):
+    # git (since 2.35.2) ignores repositories owned by others unless
+    # safe.directory says otherwise -- leave it to git to decide
+    if hasattr(os, 'getuid') and os.stat(path).st_uid != os.getuid():
+        raise GitConfigUnsupported('repository %s owned by other user' % path)
+
+
+def find_gitdir(path):
+    """Find git directory of the repository `path` is in, like git does
+
+    Returns
+    -------
+    str or None
+    """
+    if os.environ.get('GIT_DIR'):
+        gitdir = opj(path, os.environ['GIT_DIR'])
+        return abspath(gitdir) if _is_gitdir(gitdir) else None
+    ceilings = set(
+        realpath(p)
+        for p in os.environ.get('GIT_CEILING_DIRECTORIES', '').split(os.pathsep)
+        if isabs(p))
+    across_fs = _getenv_bool('GIT_DISCOVERY_ACROSS_FILESYSTEM')
+    cur = realpath(path)
+    if not exists(cur):
+        return None
+    dev = os.stat(cur).st_dev
+    while True:
+        dotgit = opj(cur, '.git')
+        if isdir(dotgit) and _is_gitdir(dotgit):
+            _check_owner(cur)
+            return dotgit
+        elif isfile(dotgit):
+            gitdir = _read_gitfile(dotgit)
+            if _is_gitdir(gitdir):
+                _check_owner(cur)
+                return gitdir
+            raise ValueError('not a git repository: %s' % gitdir)
+        elif _is_gitdir(cur):
+            # bare
+            _check_owner(cur)
+            return cur
+        parent = dirname(cur)
+        if parent == cur or parent in ceilings:
+            return None
+        if not across_fs and os.stat(parent).st_dev != dev:
+            return None
+        cur = parent
+
+
+def _get_repo_info(gitdir):
+    if not gitdir:
+        return None
+    branch = None
+    try:
+        head = _read_file(opj(gitdir, 'HEAD')).strip()
+    except (IOError, OSError):
+        head = ''
+    if head.startswith('ref: refs/heads/'):
+        branch = head[16:]
+    commondir = gitdir
+    if isfile(opj(gitdir, 'commondir')):
+        commondir = _read_file(opj(gitdir, 'commondir')).strip()
+        commondir = abspath(opj(gitdir, commondir))
+    return dict(gitdir=gitdir, commondir=commondir, branch=branch)
+
+
+def get_system_gitconfig():
+    """Return file name of the system-wide git configuration, or None"""
+    if _getenv_bool('GIT_CONFIG_NOSYSTEM'):
+        return None
+    if 'GIT_CONFIG_SYSTEM' in os.environ:
+        return os.environ['GIT_CONFIG_SYSTEM'] or None
+    # bundled or relocatable git could have it anywhere
+    if GitRunner._GIT_PATH or on_windows:
+        raise GitConfigUnsupported('location of system git configuration')
+    git = find_executable('git')
+    if not git:
+        raise GitConfigUnsupported('no git found')
+    prefix = dirname(dirname(realpath(git)))
+    return '/etc/gitconfig' if prefix == '/usr' \
+        else opj(prefix, 'etc', 'gitconfig')
+
+
+def get_global_gitconfigs():
+    """Return file names of the user's git configuration files"""
+    if 'GIT_CONFIG_GLOBAL' in os.environ:
+        return [os.environ['GIT_CONFIG_GLOBAL']] \
+            if os.environ['GIT_CONFIG_GLOBAL'] else []
+    fnames = []
+    xdg = os.environ.get('XDG_CONFIG_HOME')
+    if xdg:
+        fnames.append(opj(xdg, 'git', 'config'))
+    if os.environ.get('HOME'):
+        home = os.environ['HOME']
+        if not xdg:
+            fnames.append(opj(home, '.config', 'git', 'config'))
+        fnames.append(opj(home, '.gitconfig'))
+    return fnames
+
+
+def _iter_cmdline_items():
+    if os.environ.get('GIT_CONFIG_PARAMETERS'):
+        # quoted and escaped, leave it to git
+        raise GitConfigUnsupported('GIT_CONFIG_PARAMETERS')
+    count = os.environ.get('GIT_CONFIG_COUNT')
+    if not count:
+        return
+    for i in range(int(count)):
+        key = os.environ['GIT_CONFIG_KEY_%d' % i]
+        value = os.environ.get('GIT_CONFIG_VALUE_%d' % i)
+        if '.' not in key:
+            raise ValueError('key does not contain a section: %s' % key)
+        section, _, rest = key.partition('.')
+        sub, _, var = rest.rpartition('.')
+        yield '.'.join(
+            [section.lower()] + ([sub] if sub else []) + [var.lower()]), value
+
+
+def read_gitconfig(path=None):
+    """Read all configuration, like `git config -l` would when run in `path`
+
+    Parameters
+    ----------
+    path : str, optional
+      Directory to determine the repository (if any) from.  Defaults to
+      the current directory.
+
+    Yields
+    ------
+    tuple
+      (origin, name, value), with origin being the absolute name of the
+      file the item was read from, or None for items from the environment.
+
+    Raises
+    ------
+    GitConfigUnsupported
+      if git would read or interpret its configuration in a way
+      not supported here
+    ValueError, IOError, OSError
+      for invalid configuration (git would fail for it as well) or
+      inaccessible files
+    """
+    if os.environ.get('GIT_CONFIG'):
+        raise GitConfigUnsupported('GIT_CONFIG')
+    repo = _get_repo_info(find_gitdir(path or os.getcwd()))
+    fnames = []
+    sysconfig = get_system_gitconfig()
+    if sysconfig:
+        fnames.append(sysconfig)
+    fnames.extend(get_global_gitconfigs())
+    for fname in fnames:
+        if os.access(fname, os.R_OK):
+            for item in _iter_file(abspath(fname), repo):
+                yield item
+    if repo:
+        fname = opj(repo['commondir'], 'config')
+        worktree_config = False
+        if os.access(fname, os.R_OK):
+            for item in _iter_file(fname, repo):
+                if item[1] == 'extensions.worktreeconfig':
+                    worktree_config = item[2] is None or \
+                        item[2].lower() in ('true', 'yes', 'on', '1')
+                yield item
+        fname = opj(repo['gitdir'], 'config.worktree')
+        if worktree_config and os.access(fname, os.R_OK):
+            for item in _iter_file(fname, repo):
+                yield item
+    for item in _iter_items(_iter_cmdline_items(), None, repo, 0):
+        yield item
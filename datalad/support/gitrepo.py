@@ -12,9 +12,11 @@ For further information on GitPython see http://gitpython.readthedocs.org/
 
 """
 
+import binascii
 import logging
 import re
 import shlex
+import threading
 import time
 import os
 from os import linesep
@@ -31,6 +33,8 @@ from os.path import curdir
 from os.path import pardir
 from os.path import sep
 import posixpath
+from collections import OrderedDict
+from subprocess import Popen, PIPE
 from weakref import WeakValueDictionary
 
 
@@ -41,7 +45,6 @@ import git as gitpy
 from git.exc import GitCommandError
 from git.exc import NoSuchPathError
 from git.exc import InvalidGitRepositoryError
-from git.objects.blob import Blob
 
 from datalad import ssh_manager
 from datalad.cmd import GitRunner
@@ -560,6 +563,7 @@ class GitRepo(RepoInterface):
         self.cmd_call_wrapper = runner or GitRunner(cwd=self.path)
         self._repo = repo
         self._cfg = None
+        self._object_reader = None
 
         _valid_repo = GitRepo.is_valid_repo(path)
         if create and not _valid_repo:
@@ -619,6 +623,8 @@ class GitRepo(RepoInterface):
         if self.inode != inode:
             # reset background processes invoked by GitPython:
             self._repo.git.clear_cache()
+            if self._object_reader is not None:
+                self._object_reader.close()
             self.inode = inode
 
         if self._repo is None:
@@ -635,6 +641,22 @@ class GitRepo(RepoInterface):
 
         return self._repo
 
+    @property
+    def object_reader(self):
+        """Persistent reader of the repository's objects
+
+        Returns
+        -------
+        GitObjectReader
+        """
+        # a repository recreated at the same path needs new processes, as
+        # detected by `repo`
+        self.repo
+        if self._object_reader is None:
+            self._object_reader = GitObjectReader(
+                self.path, git_options=self._GIT_COMMON_OPTIONS)
+        return self._object_reader
+
     @classmethod
     def clone(cls, url, path, *args, **kwargs):
         """Clone url into path
@@ -757,6 +779,8 @@ class GitRepo(RepoInterface):
                 # denied etc. So disabled 
                 #if exists(opj(self.path, '.git')):  # don't try to write otherwise
                 #    self.repo.index.write()
+            if getattr(self, '_object_reader', None) is not None:
+                self._object_reader.close()
         except InvalidGitRepositoryError:
             # might have being removed and no longer valid
             pass
@@ -1175,24 +1199,14 @@ class GitRepo(RepoInterface):
         object: str, optional
           Any type of Git object identifier. See `git show`.
         """
-        cmd = ['git', 'show', '--no-patch', "--format=%H"]
-        if object:
-            cmd.append(object)
-        # make sure Git takes our argument as a revision
-        cmd.append('--')
-        try:
-            stdout, stderr = self._git_custom_command(
-                '', cmd, expect_stderr=True, expect_fail=True)
-        except CommandError as e:
-            if 'bad revision' in e.stderr:
+        commit = self.object_reader.info(
+            '{}^{{commit}}'.format(object if object else 'HEAD'))
+        if commit is None:
+            if object:
                 raise ValueError("Unknown object identifier: %s" % object)
-            elif 'does not have any commits yet' in e.stderr:
-                return None
-            else:
-                raise e
-        stdout = stdout.splitlines()
-        assert(len(stdout) == 1)
-        return stdout[0]
+            # no commits yet
+            return None
+        return commit[0]
 
     @normalize_paths(match_return_type=False)
     def get_last_commit_hash(self, files):
@@ -1259,16 +1273,18 @@ class GitRepo(RepoInterface):
         int or None
           None if no commit
         """
-        try:
-            if branch:
-                commit = next(self.get_branch_commits(branch))
-            else:
-                commit = self.repo.head.commit
-        except Exception as exc:
-            lgr.debug("Got exception while trying to get last commit: %s",
-                      exc_str(exc))
+        field = {'authored': b'author ', 'committed': b'committer '}[date]
+        commit = self.object_reader.read(
+            '{}^{{commit}}'.format(branch if branch else 'HEAD'))
+        if commit is None:
+            lgr.debug("Found no last commit of %s", branch or 'HEAD')
             return None
-        return getattr(commit, "%s_date" % date)
+        # header lines are followed by an empty line and the message
+        for line in commit[2].split(b'\n\n', 1)[0].splitlines():
+            if line.startswith(field):
+                # "<name> <email> <timestamp> <timezone>"
+                return int(line.rsplit(b' ', 2)[1])
+        return None
 
     def get_active_branch(self):
         try:
@@ -1372,9 +1388,26 @@ class GitRepo(RepoInterface):
         if branch is None:
             # active branch can be queried way faster:
             return self.get_indexed_files()
-        else:
-            return [item.path for item in self.repo.tree(branch).traverse()
-                    if isinstance(item, Blob)]
+
+        files = []
+        # walk the tree breadth-first, pipelining the reads of all trees of
+        # a level
+        trees = [('', '{}^{{tree}}'.format(branch))]
+        while trees:
+            subtrees = []
+            for (prefix, _), tree in zip(
+                    trees, list(self.object_reader.stream(t for _, t in trees))):
+                if tree is None:
+                    raise ValueError("Unknown branch: %s" % branch)
+                for mode, sha, name in parse_tree(tree[2]):
+                    path = posixpath.join(prefix, name)
+                    if mode == '40000':
+                        subtrees.append((path, sha))
+                    elif mode != '160000':
+                        # anything but a submodule
+                        files.append(path)
+            trees = subtrees
+        return files
 
     def get_file_content(self, file_, branch='HEAD'):
         """
@@ -1384,7 +1417,10 @@ class GitRepo(RepoInterface):
         [str]
           content of file_ as a list of lines.
         """
-        content_str = self.repo.commit(branch).tree[file_].data_stream.read()
+        blob = self.object_reader.read('{}:{}'.format(branch, file_))
+        if blob is None:
+            raise KeyError("No file %s in %s" % (file_, branch))
+        content_str = blob[2]
 
         # in python3 a byte string is returned. Need to convert it:
         from six import PY3
@@ -2339,6 +2375,245 @@ class GitRepo(RepoInterface):
         return dict(o[1:] for o in out_split)
 
 
+class _BatchWriter(threading.Thread):
+    """Thread to feed entries into stdin of a batch-mode process
+
+    Writing happens in a separate thread so that the reader could keep
+    consuming stdout, and neither of the two sides would block on a full
+    pipe.
+    """
+
+    def __init__(self, stdin, entries):
+        super(_BatchWriter, self).__init__(name="BatchWriter")
+        self.daemon = True
+        self.stdin = stdin
+        self.entries = entries
+        self.exc = None
+
+    def run(self):
+        try:
+            for entry in self.entries:
+                self.stdin.write(entry)
+            self.stdin.flush()
+        except (IOError, OSError, ValueError) as exc:
+            # broken pipe or closed stdin: the reader would find out about
+            # the dead process on its own
+            self.exc = exc
+
+
+class GitObjectReader(object):
+    """Persistent `git cat-file` processes to read objects of a repository
+
+    Object requests are pipelined into `git cat-file --batch` (or
+    `--batch-check` if only type and size are needed), so reading many
+    objects costs no fork per object.  Small objects requested by their
+    full hexsha are kept in an LRU cache, since such objects never change.
+
+    A reader can be shared between threads, queries are served one after
+    the other.  Note, that the same thread must not query the reader while
+    iterating over the result of a `stream()` call.
+
+    Parameters
+    ----------
+    path : str
+      Path of the repository.
+    git_options : list of str, optional
+    cache_size : int, optional
+      Maximal number of objects to cache.
+    max_cached_size : int, optional
+      Objects larger than this number of bytes are not cached.
+    """
+
+    _header_regex = re.compile(
+        br'^(?P<sha>[0-9a-f]{40}) (?P<type>\w+) (?P<size>\d+)$')
+
+    def __init__(self, path, git_options=None, cache_size=1000,
+                 max_cached_size=65536):
+        self.path = path
+        self.git_options = git_options if git_options else []
+        self.cache_size = cache_size
+        self.max_cached_size = max_cached_size
+        self._processes = {}
+        self._cache = OrderedDict()
+        # held for the entire life of a `stream()` generator, as requests
+        # and replies of concurrent streams must not interleave
+        self._lock = threading.Lock()
+        self._lock_owner = None
+
+    def __repr__(self):
+        return "<GitObjectReader path=%s>" % self.path
+
+    def _get_process(self, mode):
+        process = self._processes.get(mode)
+        if process is not None and process.poll() is None:
+            return process
+        if process is not None:
+            lgr.warning("git cat-file --%s in %s has terminated with "
+                        "returncode %s, restarting",
+                        mode, self.path, process.returncode)
+            self._close_process(mode)
+        cmd = ['git'] + self.git_options + ['cat-file', '--%s' % mode]
+        lgr.debug("Initiating a new process for %s", cmd)
+        with open(os.devnull, 'w') as devnull:
+            process = Popen(
+                cmd, stdin=PIPE, stdout=PIPE, stderr=devnull,
+                env=GitRunner.get_git_environ_adjusted(),
+                cwd=self.path)
+        self._processes[mode] = process
+        return process
+
+    def _read_reply(self, stdout, data):
+        """Read one reply, returning None for an unknown object"""
+        line = stdout.readline()
+        if not line:
+            raise CommandError(
+                cmd='git cat-file',
+                msg="Process terminated before replying to all requests")
+        header = self._header_regex.match(line.rstrip(b'\n'))
+        if not header:
+            # "<object> missing" or "<object> ambiguous"
+            return None
+        sha = header.group('sha').decode('ascii')
+        obj_type = header.group('type').decode('ascii')
+        size = int(header.group('size'))
+        if not data:
+            return sha, obj_type, size
+        content = stdout.read(size)
+        # the content is followed by a newline
+        stdout.read(1)
+        return sha, obj_type, content
+
+    def stream(self, objects, data=True):
+        """Pipeline object requests and yield replies in the same order
+
+        Parameters
+        ----------
+        objects : iterable of str
+          Any object identifier `git cat-file` understands (hexsha,
+          '<rev>:<path>', '<rev>^{tree}', ...).
+        data : bool, optional
+          Whether to read the content of the objects, or only their size.
+
+        Returns
+        -------
+        generator
+          (hexsha, type, content) tuples, or (hexsha, type, size) if not
+          `data`.  None for an object which does not exist.
+        """
+        objects = list(objects)
+        if self._lock_owner is threading.current_thread():
+            # would wait for ourselves forever
+            raise RuntimeError(
+                "%s must not be queried while streaming from it" % self)
+        with self._lock:
+            self._lock_owner = threading.current_thread()
+            try:
+                for reply in self._stream(objects, data):
+                    yield reply
+            finally:
+                self._lock_owner = None
+
+    def _stream(self, objects, data):
+        cached = {o: self._cache[o] for o in objects if o in self._cache} \
+            if data else {}
+        todo = [o for o in objects if o not in cached]
+        if todo:
+            mode = 'batch' if data else 'batch-check'
+            process = self._get_process(mode)
+            writer = _BatchWriter(
+                process.stdin,
+                [(o + '\n').encode('utf-8') for o in todo])
+            writer.start()
+        nreceived = 0
+        try:
+            for o in objects:
+                if o in cached:
+                    self._cache_object(o, cached[o])
+                    yield cached[o]
+                    continue
+                reply = self._read_reply(process.stdout, data)
+                nreceived += 1
+                if data and reply and len(reply[2]) <= self.max_cached_size:
+                    self._cache_object(reply[0], reply)
+                yield reply
+        finally:
+            if todo:
+                if nreceived < len(todo):
+                    # consumer is gone early, or the process died.  Replies
+                    # to the requests sent are pending, so start afresh
+                    # next time
+                    self._close_process(mode)
+                writer.join()
+
+    def _cache_object(self, sha, obj):
+        if self.cache_size <= 0:
+            return
+        self._cache.pop(sha, None)
+        self._cache[sha] = obj
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def read(self, obj):
+        """Return (hexsha, type, content) of an object, or None"""
+        return list(self.stream([obj]))[0]
+
+    def info(self, obj):
+        """Return (hexsha, type, size) of an object, or None"""
+        return list(self.stream([obj], data=False))[0]
+
+    def read_tree(self, obj):
+        """Return entries of a tree object
+
+        Returns
+        -------
+        list or None
+          (mode, hexsha, name) for each entry, None if there is no such
+          tree.
+        """
+        reply = self.read(obj)
+        if reply is None or reply[1] != 'tree':
+            return None
+        return parse_tree(reply[2])
+
+    def _close_process(self, mode):
+        process = self._processes.pop(mode, None)
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.stdout.close()
+        except (IOError, OSError) as exc:
+            lgr.debug("Failed to close pipes of %s: %s", process, exc_str(exc))
+        process.wait()
+
+    def close(self):
+        """Close communication and wait for the processes to terminate"""
+        for mode in list(self._processes):
+            self._close_process(mode)
+
+    def __del__(self):
+        self.close()
+
+
+def parse_tree(content):
+    """Parse the content of a git tree object
+
+    Returns
+    -------
+    list
+      (mode, hexsha, name) for each entry.
+    """
+    entries = []
+    i = 0
+    while i < len(content):
+        nul = content.index(b'\0', i)
+        mode, name = content[i:nul].split(b' ', 1)
+        sha = binascii.hexlify(content[nul + 1:nul + 21]).decode('ascii')
+        entries.append((mode.decode('ascii'), sha, name.decode('utf-8')))
+        i = nul + 21
+    return entries
+
+
 # TODO
 # remove submodule: nope, this is just deinit_submodule + remove
 # status?
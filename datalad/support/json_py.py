@@ -13,6 +13,8 @@
 import io
 import lzma
 import codecs
+import struct
+from bisect import bisect_right
 from os.path import dirname
 from os.path import exists
 from os import makedirs
@@ -20,6 +22,7 @@ from os import makedirs
 # wrapped below
 from simplejson import load as jsonload
 from simplejson import dump as jsondump
+from simplejson import dumps as jsondumps
 # simply mirrored for now
 from simplejson import loads as json_loads
 from simplejson import JSONDecodeError
@@ -87,6 +90,136 @@ def dump2xzstream(obj, fname):
     dump2stream(obj, fname, compressed=True)
 
 
+# trailer of an indexed stream: offset of the index, and this magic
+_INDEXED_STREAM_MAGIC = b'DLXZIDX1'
+_INDEXED_STREAM_TRAILER = struct.Struct('>Q8s')
+
+
+def dump2indexedxzstream(obj, fname, key='path', blocksize=2 ** 16):
+    """Dump records into a block-compressed file with an index on `key`
+
+    Records are written as JSON lines into independently XZ-compressed
+    blocks of about `blocksize` bytes (uncompressed), followed by a
+    compressed index with the location and first key of each block, and a
+    fixed-size trailer pointing to the index.  This allows to access records
+    by their key without decompressing the whole file, see
+    `IndexedXZStream`.
+
+    Parameters
+    ----------
+    obj : iterable
+      Of dicts, sorted by their (unique) `key` value.
+    fname : str
+    key : str
+    blocksize : int
+    """
+    blocks = []
+    with io.open(fname, 'wb') as f:
+        lines = []
+        size = 0
+        firstkey = lastkey = None
+
+        def _flush():
+            data = lzma.compress(b''.join(lines))
+            blocks.append([f.tell(), len(data), firstkey])
+            f.write(data)
+
+        for o in obj:
+            k = o[key]
+            if lastkey is not None and not k > lastkey:
+                raise ValueError(
+                    "Records must be sorted by unique %r, got %r after %r"
+                    % (key, k, lastkey))
+            if not lines:
+                firstkey = k
+            lastkey = k
+            line = jsondumps(o, **compressed_json_dump_kwargs)
+            if not isinstance(line, bytes):
+                line = line.encode('utf-8')
+            lines.append(line + b'\n')
+            size += len(line) + 1
+            if size >= blocksize:
+                _flush()
+                lines = []
+                size = 0
+        if lines:
+            _flush()
+        index_offset = f.tell()
+        index = jsondumps(
+            {'key': key, 'blocks': blocks}, **compressed_json_dump_kwargs)
+        if not isinstance(index, bytes):
+            index = index.encode('utf-8')
+        f.write(lzma.compress(index))
+        f.write(_INDEXED_STREAM_TRAILER.pack(
+            index_offset, _INDEXED_STREAM_MAGIC))
+
+
+class IndexedXZStream(object):
+    """Read access to records in a file written by `dump2indexedxzstream()`
+
+    Only the index is loaded upon instantiation, records are read from the
+    file by decompressing just the block(s) that contain them.
+    """
+    def __init__(self, fname):
+        self.fname = fname
+        with io.open(fname, 'rb') as f:
+            f.seek(-_INDEXED_STREAM_TRAILER.size, io.SEEK_END)
+            trailer_offset = f.tell()
+            index_offset, magic = _INDEXED_STREAM_TRAILER.unpack(
+                f.read(_INDEXED_STREAM_TRAILER.size))
+            if magic != _INDEXED_STREAM_MAGIC:
+                raise ValueError("%s is not an indexed stream" % fname)
+            f.seek(index_offset)
+            index = loads(lzma.decompress(
+                f.read(trailer_offset - index_offset)).decode('utf-8'))
+        self.key = index['key']
+        self._blocks = [(offset, length) for offset, length, _ in index['blocks']]
+        self._firstkeys = [k for _, _, k in index['blocks']]
+        # last decompressed block, as records tend to be requested in order
+        self._lastblock = (None, None)
+
+    def _get_block(self, i):
+        if self._lastblock[0] != i:
+            offset, length = self._blocks[i]
+            with io.open(self.fname, 'rb') as f:
+                f.seek(offset)
+                data = lzma.decompress(f.read(length))
+            self._lastblock = (
+                i,
+                [loads(l) for l in data.decode('utf-8').split('\n') if l])
+        return self._lastblock[1]
+
+    def _iter_from(self, key):
+        """Yield all records starting with the block which would hold `key`"""
+        for i in range(max(bisect_right(self._firstkeys, key) - 1, 0),
+                       len(self._blocks)):
+            for o in self._get_block(i):
+                yield o
+
+    def __iter__(self):
+        for i in range(len(self._blocks)):
+            for o in self._get_block(i):
+                yield o
+
+    def get(self, key, default=None):
+        """Return the record with the given key, or `default`"""
+        for o in self._iter_from(key):
+            if o[self.key] == key:
+                return o
+            elif o[self.key] > key:
+                break
+        return default
+
+    def iter_prefix(self, prefix):
+        """Yield all records (in order) whose key starts with `prefix`"""
+        for o in self._iter_from(prefix):
+            k = o[self.key]
+            if k.startswith(prefix):
+                yield o
+            elif k > prefix:
+                break
+
+
 def load_stream(fname, compressed=False):
 
     _open = LZMAFile if compressed else open
@@ -0,0 +1,107 @@
+# emacs: -*- mode: python; py-indent-offset: 4; tab-width: 4; indent-tabs-mode: nil -*-
+# ex: set sts=4 ts=4 sw=4 noet:
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+#
+#   See COPYING file distributed along with the datalad package for the
+#   copyright and license terms.
+#
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+"""Helpers to carry out independent actions concurrently
+
+"""
+
+__docformat__ = 'restructuredtext'
+
+import logging
+import sys
+import threading
+
+from collections import deque
+
+from six import reraise
+from six.moves import queue
+
+lgr = logging.getLogger('datalad.parallel')
+
+
+def get_jobs(jobs):
+    """Return number of jobs to use for concurrent processing, or None
+
+    Only an explicitly requested number of jobs above 1 enables concurrent
+    processing.  'auto' (the default of `-J/--jobs`) is meant for the
+    tools (e.g. git-annex) we pass it to, and does not do it.
+    """
+    if isinstance(jobs, int) and jobs > 1:
+        return jobs
+    return None
+
+
+def process_tree(items, worker, jobs=None):
+    """Process a tree of items, possibly with multiple threads
+
+    Parameters
+    ----------
+    items : iterable
+      Items to start with (roots of the tree).
+    worker : callable
+      Called with an item, must return a tuple `(results, children)`.
+      `children` are scheduled for processing only after their parent was
+      processed, so they could rely on whatever `worker` did for it.
+    jobs : int, optional
+      If above 1, up to that many items are processed concurrently (in
+      threads) and results come in the order of completion.  Otherwise
+      items are processed sequentially, depth-first in the order given.
+
+    Yields
+    ------
+    all results returned by `worker`, in the calling thread.  An exception
+    raised by `worker` is re-raised after all already running workers have
+    finished, and nothing new gets scheduled.
+    """
+    if not jobs or jobs <= 1:
+        todo = list(items)[::-1]
+        while todo:
+            results, children = worker(todo.pop())
+            for res in results:
+                yield res
+            todo.extend(list(children)[::-1])
+        return
+
+    todo = deque(items)
+    done = queue.Queue()
+    # mutable only from this (calling) thread
+    running = [0]
+
+    def _process(item):
+        try:
+            done.put((worker(item), None))
+        except Exception:
+            done.put((None, sys.exc_info()))
+
+    def _start(item):
+        thread = threading.Thread(target=_process, args=(item,))
+        thread.daemon = True
+        thread.start()
+        running[0] += 1
+
+    try:
+        while todo or running[0]:
+            while todo and running[0] < jobs:
+                _start(todo.popleft())
+            lgr.log(5, "Waiting for one of %d running jobs (%d pending)",
+                    running[0], len(todo))
+            out, exc_info = done.get()
+            running[0] -= 1
+            if exc_info:
+                reraise(*exc_info)
+            results, children = out
+            todo.extend(children)
+            for res in results:
+                yield res
+    finally:
+        # either we are done, failed, or the consumer is gone.  Do not start
+        # anything new, but let the running ones finish
+        todo.clear()
+        while running[0]:
+            done.get()
+            running[0] -= 1
@@ -37,28 +37,29 @@ def branch_blobs(repo, branch):
     the returned file name matches what is returned by 'git rev-list'.
     """
     git = repo.repo.git
+    reader = repo.object_reader
     # Note: This might be nicer with rev-list's --filter and
     # --filter-print-omitted, but those aren't available until Git v2.16.
     lines = git.rev_list(branch, objects=True).splitlines()
     # Trees and blobs have an associated path printed.
     objects = (ln.split() for ln in lines)
     blob_trees = [obj for obj in objects if len(obj) == 2]
+    # Sort out the trees by their type, without reading any content.
+    types = list(reader.stream((obj for obj, _ in blob_trees), data=False))
+    blobs = [(obj, fname) for (obj, fname), info in zip(blob_trees, types)
+             if info and info[1] == "blob"]
 
-    num_objects = len(blob_trees)
+    num_objects = len(blobs)
 
     log_progress(lgr.info, "repodates_branch_blobs",
                  "Checking %d objects", num_objects,
                  label="Checking objects", total=num_objects, unit=" objects")
-    # This is inefficient.  It makes a git call for each object, some of which
-    # aren't even blobs.  We could instead use 'git cat-file --batch'.
-    for obj, fname in blob_trees:
+    contents = reader.stream(obj for obj, _ in blobs)
+    for (obj, fname), blob in zip(blobs, contents):
         log_progress(lgr.info, "repodates_branch_blobs",
                      "Checking %s", obj,
                      increment=True, update=1)
-        try:
-            yield obj, git.cat_file("blob", obj), fname
-        except GitCommandError:  # The object was a tree.
-            continue
+        yield obj, blob[2].decode("utf-8", "replace"), fname
     log_progress(lgr.info, "repodates_branch_blobs",
                  "Finished checking %d objects", num_objects)
 
@@ -83,22 +84,26 @@ def branch_blobs_in_tree(repo, branch):
     out = git.ls_tree(branch, z=True, r=True)
     if out:
         lines = out.strip("\0").split("\0")
-        num_lines = len(lines)
+        blobs = []
+        for line in lines:
+            _, obj_type, obj, fname = line.split()
+            if obj_type == "blob" and obj not in seen_blobs:
+                blobs.append((obj, fname))
+            seen_blobs.add(obj)
+        num_blobs = len(blobs)
         log_progress(lgr.info,
                      "repodates_blobs_in_tree",
-                     "Checking %d objects in git-annex tree", num_lines,
-                     label="Checking objects", total=num_lines,
+                     "Checking %d objects in git-annex tree", num_blobs,
+                     label="Checking objects", total=num_blobs,
                      unit=" objects")
-        for line in lines:
-            _, obj_type, obj, fname = line.split()
+        contents = repo.object_reader.stream(obj for obj, _ in blobs)
+        for (obj, fname), blob in zip(blobs, contents):
             log_progress(lgr.info, "repodates_blobs_in_tree",
                          "Checking %s", obj,
                          increment=True, update=1)
-            if obj_type == "blob" and obj not in seen_blobs:
-                yield obj, git.cat_file("blob", obj), fname
-            seen_blobs.add(obj)
+            yield obj, blob[2].decode("utf-8", "replace"), fname
         log_progress(lgr.info, "repodates_blobs_in_tree",
-                     "Finished checking %d blobs", num_lines)
+                     "Finished checking %d blobs", num_blobs)
 
 
 # In uuid.log, timestamps look like "timestamp=1523283745.683191724s" and occur
@@ -342,6 +342,31 @@ def test_AnnexRepo_is_under_annex(batch, direct, src, annex_path):
     ok_(ar.is_under_annex("test-annex.dat", batch=batch))
 
 
+@with_tree(tree={'annexed.dat': 'annexed', 'dropped.dat': 'dropped',
+                 'git.txt': 'git', 'sub': {'deep.dat': 'deep'}})
+def test_AnnexRepo_get_content_annexinfo(path):
+    ar = AnnexRepo(path, create=True)
+    if ar.is_direct_mode():
+        raise SkipTest("Directories are not expanded in direct mode")
+    ar.add(['annexed.dat', 'dropped.dat', opj('sub', 'deep.dat')])
+    ar.add('git.txt', git=True)
+    ar.commit("added")
+    ar.drop('dropped.dat', options=['--force'])
+    with open(opj(path, 'untracked.txt'), 'w') as f:
+        f.write('untracked')
+
+    files = ['annexed.dat', 'dropped.dat', 'git.txt', 'sub', 'untracked.txt']
+    info = ar.get_content_annexinfo(files)
+    eq_(sorted(info), ['annexed.dat', 'dropped.dat', 'git.txt', 'sub/deep.dat'])
+    for f in info:
+        eq_(info[f]['key'],
+            ar.get_file_key(f) if ar.is_under_annex(f) else None)
+        eq_(info[f]['has_content'], ar.file_has_content(f))
+    eq_(info['annexed.dat']['size'], len('annexed'))
+    eq_(info['git.txt']['size'], None)
+    eq_(ar.get_content_annexinfo([]), {})
+
+
 @with_tree(tree=(('about.txt', 'Lots of abouts'),
                  ('about2.txt', 'more abouts'),
                  ('d', {'sub.txt': 'more stuff'})))
@@ -2241,3 +2266,51 @@ def test_fake_dates(path):
         eq_(timestamp, commit.committed_date)
     assert_in("timestamp={}s".format(timestamp),
               ar.repo.git.cat_file("blob", "git-annex:uuid.log"))
+
+
+@with_tree(tree={'file%d.txt' % i: 'content %d' % i for i in range(20)})
+def test_BatchedAnnex_stream(path):
+    ar = AnnexRepo(path, create=True)
+    files = sorted('file%d.txt' % i for i in range(20))
+    ar.add(files)
+    ar.commit("added")
+
+    bcmd = ar._batched.get('lookupkey',
+                           git_options=ar._GIT_COMMON_OPTIONS,
+                           path=ar.path)
+    keys = list(bcmd.stream(files + ['bogus']))
+    eq_(len(keys), 21)
+    eq_(keys[:-1], [bcmd(f) for f in files])
+    eq_(keys[-1], '')
+    # abandoning the generator early still leaves the process usable
+    gen = bcmd.stream(files)
+    eq_(next(gen), keys[0])
+    gen.close()
+    eq_(bcmd(files[-1]), keys[-2])
+    # nothing to do
+    eq_(list(bcmd.stream([])), [])
+
+    # and it is used by the methods accepting batch=True
+    eq_(ar.get_file_key(files), keys[:-1])
+    eq_(ar.file_has_content(files, batch=True), [True] * len(files))
+    eq_(ar.whereis(files, batch=True), ar.whereis(files))
+    eq_(ar.whereis(files + ['bogus'], batch=True)[-1], [])
+
+
+@with_tree(tree={'file%d.txt' % i: 'content %d' % i for i in range(5)})
+def test_AnnexRepo_stream_metadata_whereis(path):
+    ar = AnnexRepo(path, create=True)
+    files = sorted('file%d.txt' % i for i in range(5))
+    ar.add(files)
+    ar.commit("added")
+    list(ar.set_metadata(files[:3], init={'tag': 'some'}))
+
+    eq_(dict(ar.get_metadata(files, batch=True)),
+        dict(ar.get_metadata(files)))
+    # annexed files without metadata are reported with an empty record
+    eq_(dict(ar.get_metadata(files, batch=True)),
+        dict([(f, {'tag': ['some']}) for f in files[:3]] +
+             [(f, {}) for f in files[3:]]))
+
+    whereis = ar.whereis(files, output='full')
+    eq_(dict(ar.iter_whereis(files + ['bogus'])), whereis)
@@ -7,8 +7,17 @@
 #
 # ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
 
+from os.path import basename
+from os.path import dirname
+
 from ..cache import DictCache
+from ..cache import FileObjectCache
 from ...tests.utils import assert_equal
+from ...tests.utils import assert_raises
+from ...tests.utils import create_tree
+from ...tests.utils import eq_
+from ...tests.utils import ok_
+from ...tests.utils import with_tempfile
 
 
 def test_DictCache():
@@ -21,3 +30,40 @@ def test_DictCache():
 
     d['c'] = 2
     assert_equal(d, {'c': 2, 'b': 1})
+
+
+@with_tempfile
+def test_FileObjectCache(path):
+    loads = []
+
+    def loader(fpath):
+        loads.append(fpath)
+        with open(fpath) as f:
+            return [f.read()]
+
+    create_tree(dirname(path), {basename(path): 'content'})
+    cache = FileObjectCache(size_limit=1)
+    obj = cache.load(path, loader)
+    eq_(obj, ['content'])
+    ok_(cache.load(path, loader) is obj)
+    eq_((cache.hits, cache.misses, len(loads)), (1, 1, 1))
+    # a modified file is loaded again
+    with open(path, 'w') as f:
+        f.write('modified content')
+    eq_(cache.load(path, loader), ['modified content'])
+    eq_((cache.hits, cache.misses), (1, 2))
+    # a different loader does not get a cached object of another one
+    eq_(cache.load(path, lambda p: 'other'), 'other')
+    eq_(len(cache), 1)
+    # and the previous one was expunged
+    cache.load(path, loader)
+    eq_((cache.hits, cache.misses, len(loads)), (1, 4, 3))
+    # no caching at all
+    cache = FileObjectCache(size_limit=0)
+    cache.load(path, loader)
+    cache.load(path, loader)
+    eq_((cache.hits, cache.misses, len(cache)), (0, 2, 0))
+    # errors are left to the loader
+    assert_raises(IOError, cache.load, path + 'nothere', loader)
+    cache.clear()
+    eq_((cache.hits, cache.misses), (0, 0))
@@ -0,0 +1,88 @@
+# emacs: -*- mode: python; py-indent-offset: 4; tab-width: 4; indent-tabs-mode: nil -*-
+# ex: set sts=4 ts=4 sw=4 noet:
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+#
+#   See COPYING file distributed along with the datalad package for the
+#   copyright and license terms.
+#
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+"""Tests for the in-process git configuration reader"""
+
+from os.path import join as opj
+
+from ..gitconfig import GitConfigUnsupported
+from ..gitconfig import find_gitdir
+from ..gitconfig import parse_gitconfig
+from ..gitconfig import _wildmatch_regex
+
+from datalad.support.gitrepo import GitRepo
+from datalad.tests.utils import assert_raises
+from datalad.tests.utils import eq_
+from datalad.tests.utils import ok_
+from datalad.tests.utils import with_tempfile
+
+
+def _parse(content):
+    return list(parse_gitconfig(content))
+
+
+def test_parse_gitconfig():
+    eq_(_parse(''), [])
+    eq_(_parse('# only\n; comments\n'), [])
+    eq_(_parse('[Core]\n\tBare = false\n'), [('core.bare', 'false')])
+    # without a trailing newline, with CRLF, key right after the header
+    eq_(_parse('[a]b=1'), [('a.b', '1')])
+    eq_(_parse('[a]\r\nb = 1\r\n'), [('a.b', '1')])
+    # subsections keep their case, unless old-style
+    eq_(_parse('[Sec "Sub \\"S\\" ec"]\nkey=v\n[Sec.Old]\nkey=v'),
+        [('sec.Sub "S" ec.key', 'v'), ('sec.old.key', 'v')])
+    # multiple values are all reported
+    eq_(_parse('[a]\nb=1\nb=2\n'), [('a.b', '1'), ('a.b', '2')])
+    # no value at all
+    eq_(_parse('[a]\nflag\nb\t\n'), [('a.flag', None), ('a.b', None)])
+    # value parsing: whitespace (one space per character), quotes, escapes,
+    # comments, continuation
+    eq_(_parse('[a]\nb =  x  \t y  # comment\n'), [('a.b', 'x    y')])
+    eq_(_parse('[a]\nb = " x ; y "x\n'), [('a.b', ' x ; y x')])
+    eq_(_parse('[a]\nb = x\\ty\\n\\"\\\\\n'), [('a.b', 'x\ty\n"\\')])
+    eq_(_parse('[a]\nb = one \\\n  two\n'), [('a.b', 'one   two')])
+    eq_(_parse('[a]\nb = \n'), [('a.b', '')])
+
+
+def test_parse_gitconfig_invalid():
+    for content in (
+            'b = 1',
+            '[a\n',
+            '[a "b]\n',
+            '[a b]\n',
+            '[a]\n1b = 1\n',
+            '[a]\nb # comment\n',
+            '[a]\nb = "unterminated\n',
+            '[a]\nb = \\x\n'):
+        assert_raises(ValueError, _parse, content)
+
+
+def test_wildmatch_regex():
+    for pattern, path, match in (
+            ('**/repo/**', '/some/repo/.git', True),
+            ('**/repo/**', '/repo/.git', True),
+            ('**/repo/**', '/some/other/.git', False),
+            ('/some/*/.git', '/some/repo/.git', True),
+            ('/some/*/.git', '/some/re/po/.git', False),
+            ('/some/r?po/**', '/some/repo/.git', True),
+            ('/some/r[a-f]po/**', '/some/repo/.git', True),
+            ('/some/r[!e]po/**', '/some/repo/.git', False),
+            ('/some/**/.git', '/some/a/b/.git', True),
+            ('/some/**/.git', '/some/.git', True)):
+        eq_(bool(_wildmatch_regex(pattern).match(path)), match,
+            msg='%s %s' % (pattern, path))
+    ok_(_wildmatch_regex('/Some/**', icase=True).match('/some/repo'))
+    assert_raises(GitConfigUnsupported, _wildmatch_regex, '[[:alpha:]]')
+
+
+@with_tempfile(mkdir=True)
+def test_find_gitdir(path):
+    eq_(find_gitdir(path), None)
+    GitRepo(path, create=True)
+    eq_(find_gitdir(path), opj(path, '.git'))
+    eq_(find_gitdir(opj(path, '.git')), opj(path, '.git'))
@@ -13,6 +13,7 @@
 from nose.tools import assert_is_instance
 
 import os
+import threading
 
 from datalad.tests.utils import *
 from datalad.tests.utils_testrepos import BasicAnnexTestRepo
@@ -671,6 +672,70 @@ def test_GitRepo_get_files(url, path):
     eq_(set([filename]), branch_files.difference(local_files))
 
 
+@with_tree(tree={'d': {'f': 'content1'}, 'file': 'content2'})
+def test_GitObjectReader(path):
+    gr = GitRepo(path, create=True)
+    gr.add(['d', 'file'])
+    gr.commit("added")
+    reader = gr.object_reader
+
+    hexsha = gr.get_hexsha()
+    eq_(reader.info('HEAD^{commit}')[:2], (hexsha, 'commit'))
+    blob = reader.read('HEAD:file')
+    eq_(blob[1:], ('blob', b'content2'))
+    eq_(reader.read(blob[0]), blob)
+    eq_(reader.info('HEAD:file'), (blob[0], 'blob', len(b'content2')))
+    eq_(reader.read('HEAD:bogus'), None)
+    eq_(reader.info('bogus'), None)
+    eq_(sorted(name for _, _, name in reader.read_tree('HEAD^{tree}')),
+        ['d', 'file'])
+    eq_(reader.read_tree('HEAD:file'), None)
+
+    # replies come in the order of the requests, also when cached
+    objs = ['HEAD:d/f', 'HEAD:file', 'HEAD:bogus', blob[0]]
+    eq_([r and r[2] for r in reader.stream(objs)],
+        [b'content1', b'content2', None, b'content2'])
+    # abandoning a stream early leaves the reader usable
+    gen = reader.stream(objs)
+    next(gen)
+    gen.close()
+    eq_(reader.read('HEAD:d/f')[2], b'content1')
+    eq_(list(reader.stream([])), [])
+    # the same thread must not query the reader while streaming from it
+    gen = reader.stream(objs)
+    next(gen)
+    assert_raises(RuntimeError, reader.read, 'HEAD:file')
+    gen.close()
+
+    # concurrent queries from multiple threads are served one by one
+    results = []
+
+    def query():
+        for i in range(20):
+            results.append(
+                ([r and r[2] for r in reader.stream(objs[:3])],
+                 gr.get_hexsha()))
+
+    threads = [threading.Thread(target=query) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    eq_(results,
+        [([b'content1', b'content2', None], hexsha)] * 80)
+
+    # new commits are seen by the running processes
+    with open(opj(path, 'file'), 'w') as f:
+        f.write('changed')
+    gr.add('file')
+    gr.commit("changed")
+    eq_(reader.read('HEAD:file')[2], b'changed')
+    eq_(gr.get_file_content('file'), ['changed'])
+    eq_(gr.get_hexsha('HEAD^'), hexsha)
+    reader.close()
+    eq_(sorted(gr.get_files('HEAD')), ['d/f', 'file'])
+
+
 @with_tree(tree={
     'd1': {'f1': 'content1',
            'f2': 'content2'},
@@ -12,9 +12,13 @@ import logging
 from datalad.support.json_py import load
 from datalad.support.json_py import loads
 from datalad.support.json_py import JSONDecodeError
+from datalad.support.json_py import IndexedXZStream
+from datalad.support.json_py import dump2indexedxzstream
+from datalad.support.json_py import dump2xzstream
 
 from datalad.tests.utils import with_tempfile
 from datalad.tests.utils import eq_
+from datalad.tests.utils import ok_
 from datalad.tests.utils import assert_raises
 from datalad.tests.utils import assert_in
 from datalad.tests.utils import swallow_logs
@@ -34,4 +38,33 @@ def test_loads():
     with assert_raises(JSONDecodeError),\
             swallow_logs(new_level=logging.WARNING) as cml:
         loads('{"a": 2}x')
-    assert_in('Failed to load content from', cml.out)
\ No newline at end of file
+    assert_in('Failed to load content from', cml.out)
+
+
+@with_tempfile
+def test_indexedxzstream(fname):
+    recs = [{'path': 'f%03i' % i, 'n': i, 'u': u'ä' * (i % 3)}
+            for i in range(200)]
+    # small blocks to have many of them
+    dump2indexedxzstream(recs, fname, blocksize=100)
+    stream = IndexedXZStream(fname)
+    ok_(len(stream._blocks) > 10)
+    eq_(list(stream), recs)
+    eq_(stream.get('f000'), recs[0])
+    eq_(stream.get('f123'), recs[123])
+    eq_(stream.get('f199'), recs[199])
+    eq_(stream.get('f1'), None)
+    eq_(stream.get('a', 'default'), 'default')
+    eq_(stream.get('z'), None)
+    eq_(list(stream.iter_prefix('f12')), recs[120:130])
+    eq_(list(stream.iter_prefix('f')), recs)
+    eq_(list(stream.iter_prefix('g')), [])
+    # records must be sorted
+    assert_raises(ValueError, dump2indexedxzstream, recs[::-1], fname)
+    # empty
+    dump2indexedxzstream([], fname)
+    eq_(list(IndexedXZStream(fname)), [])
+    eq_(IndexedXZStream(fname).get('f000'), None)
+    # not an indexed stream
+    dump2xzstream(recs, fname)
+    assert_raises(ValueError, IndexedXZStream, fname)
@@ -0,0 +1,76 @@
+# emacs: -*- mode: python; py-indent-offset: 4; tab-width: 4; indent-tabs-mode: nil -*-
+# ex: set sts=4 ts=4 sw=4 noet:
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+#
+#   See COPYING file distributed along with the datalad package for the
+#   copyright and license terms.
+#
+# ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
+"""Tests for helpers to run things in parallel"""
+
+import threading
+import time
+
+from ..parallel import get_jobs
+from ..parallel import process_tree
+
+from datalad.tests.utils import assert_raises
+from datalad.tests.utils import eq_
+from datalad.tests.utils import ok_
+
+
+# a tree of names: children of 'a' are 'a0', 'a1', ...
+def _children(item):
+    return [item + str(i) for i in range(2)] if len(item) < 3 else []
+
+
+def test_get_jobs():
+    eq_(get_jobs(None), None)
+    eq_(get_jobs('auto'), None)
+    eq_(get_jobs(1), None)
+    eq_(get_jobs(4), 4)
+
+
+def test_process_tree_sequential():
+    def worker(item):
+        return [item], _children(item)
+    # depth-first, in the order given
+    eq_(list(process_tree(['a', 'b'], worker)),
+        ['a', 'a0', 'a00', 'a01', 'a1', 'a10', 'a11',
+         'b', 'b0', 'b00', 'b01', 'b1', 'b10', 'b11'])
+
+
+def test_process_tree_parallel():
+    processed = []
+    running = []
+    maxrunning = [0]
+    lock = threading.Lock()
+
+    def worker(item):
+        with lock:
+            # parent must be done by now
+            if len(item) > 1:
+                ok_(item[:-1] in processed)
+            running.append(item)
+            maxrunning[0] = max(maxrunning[0], len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(item)
+            processed.append(item)
+        return [item], _children(item)
+
+    res = list(process_tree(['a', 'b'], worker, jobs=3))
+    eq_(sorted(res),
+        sorted(list(process_tree(['a', 'b'], lambda i: ([i], _children(i))))))
+    eq_(maxrunning[0], 3)
+
+    # failures are re-raised, after the running ones are done
+    def failing(item):
+        if item == 'a0':
+            raise ValueError(item)
+        return worker(item)
+
+    del running[:]
+    with assert_raises(ValueError):
+        list(process_tree(['a', 'b'], failing, jobs=2))
+    eq_(running, [])
@@ -8,15 +8,24 @@
 # ## ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ### ##
 
 import os
+import sys
+import tarfile
+import zipfile
 from os.path import join as opj, exists
 
 from mock import patch
 from .utils import assert_true, assert_false, eq_, \
     with_tree, with_tempfile, swallow_outputs, on_windows
 from .utils import assert_equal
+from .utils import SkipTest
 
 from ..support.archives import decompress_file, compress_files, unixify_path
 from ..support.archives import ExtractedArchive, ArchivesCache
+from ..support.archives import extract_archive_member
+from ..support.archives import index_archive
+from ..support.archives import _decompress_tar_parallel
+from ..cmd import link_file_load
+from ..utils import rmtree
 
 from .utils import get_most_obscure_supported_name, assert_raises
 from .utils import assert_in
@@ -130,6 +139,146 @@ def test_ExtractedArchive(path):
     if not os.environ.get('DATALAD_TESTS_TEMP_KEEP'):
         assert_false(exists(earchive.path))
 
+
+@with_tree(**tree_simplearchive)
+def test_extract_archive_member(path):
+    archive = opj(path, fn_archive_obscure_ext)
+    fpath = opj(fn_archive_obscure, '3.txt')
+    dst = opj(path, 'extracted')
+
+    assert_true(extract_archive_member(archive, fpath, dst))
+    with open(dst) as f:
+        eq_(f.read(), '3 load')
+    # the same with a denormalized name
+    os.unlink(dst)
+    assert_true(extract_archive_member(archive, './' + fpath, dst))
+    # no such member, or a directory
+    assert_false(extract_archive_member(archive, 'bogus', opj(path, 'bogus')))
+    assert_false(extract_archive_member(
+        archive, fn_archive_obscure, opj(path, 'bogus')))
+    assert_false(exists(opj(path, 'bogus')))
+    # not a supported archive
+    assert_false(extract_archive_member(dst, fpath, opj(path, 'bogus')))
+
+    # the archive does not get extracted to provide a single file
+    earchive = ExtractedArchive(archive)
+    earchive.extract_file(opj(fn_archive_obscure, fn_in_archive_obscure), dst)
+    with open(dst) as f:
+        eq_(f.read(), '2 load')
+    assert_false(exists(earchive.path))
+    # but unknown ones are sought in the extracted archive
+    assert_raises(AssertionError, earchive.extract_file, 'bogus', dst)
+    assert_true(earchive.is_extracted)
+    earchive.clean()
+
+
+@with_tree(tree={'1.txt': 'first', '2.txt': 'second'})
+def test_extract_archive_member_duplicate(path):
+    # appending to a tar could add the same member again, extraction
+    # leaves the last one behind
+    archive = opj(path, 'archive.tar')
+    with tarfile.open(archive, 'w') as tf:
+        tf.add(opj(path, '1.txt'), arcname='f.txt')
+        tf.add(opj(path, '2.txt'), arcname='./f.txt')
+    dst = opj(path, 'extracted')
+    assert_true(extract_archive_member(archive, 'f.txt', dst))
+    with open(dst) as f:
+        eq_(f.read(), 'second')
+
+
+@with_tree(tree={'sub': {'1.txt': '1 load', '2.txt': '2 load'}})
+def test_archive_index(path):
+    members = ['sub/1.txt', 'sub/2.txt']
+    archives = []
+    # build the archives directly, patool's creators do not all honor
+    # the working directory, so the member names would vary
+    for ext, mode in (('.tar', 'w'), ('.tar.gz', 'w:gz')):
+        archive = opj(path, 'archive' + ext)
+        with tarfile.open(archive, mode) as tf:
+            for m in members:
+                tf.add(opj(path, m), arcname=m)
+        archives.append(archive)
+    archive = opj(path, 'archive.zip')
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for m in members:
+            zf.write(opj(path, m), arcname=m)
+    archives.append(archive)
+    for archive in archives:
+        index = index_archive(archive)
+        eq_(index['format'], 'zip' if archive.endswith('.zip') else 'tar')
+        eq_(sorted(index['members']), ['sub/1.txt', 'sub/2.txt'])
+        eq_(index['members']['sub/2.txt']['size'], len('2 load'))
+        eq_(index['members']['sub/2.txt']['seekable'], archive.endswith('.tar'))
+    eq_(index_archive(opj(path, 'sub', '1.txt'))['format'], None)
+
+    earchive = ExtractedArchive(archives[0], path=opj(path, 'extracted'),
+                                persistent=True)
+    eq_(earchive.has_member('sub/1.txt'), None)
+    eq_(earchive.get_index(build=False), None)
+    eq_(earchive.get_member_info('sub/1.txt')['size'], len('1 load'))
+    assert_true(exists(earchive.index_path))
+    # the stored index is used by another instance
+    earchive = ExtractedArchive(archives[0], path=opj(path, 'extracted'),
+                                persistent=True)
+    assert_true(earchive.has_member('./sub/1.txt'))
+    assert_false(earchive.has_member('sub/3.txt'))
+    # and the content comes straight from its offset
+    dst = opj(path, 'extracted.txt')
+    earchive.extract_file('sub/2.txt', dst)
+    with open(dst) as f:
+        eq_(f.read(), '2 load')
+    assert_false(earchive.is_extracted)
+    # the index could outlive the extracted content
+    earchive.assure_extracted()
+    earchive.clean(force=True, keep_index=True)
+    assert_false(exists(earchive.path))
+    assert_true(exists(earchive.index_path))
+    earchive.clean(force=True)
+    assert_false(exists(earchive.index_path))
+
+
+@with_tree(tree={'f.txt': 'load'})
+def test_decompress_tar_parallel_chatty(path):
+    if on_windows:
+        raise SkipTest("No parallel decompression on Windows")
+    archive = opj(path, 'archive.tar.gz')
+    with tarfile.open(archive, 'w:gz') as tf:
+        tf.add(opj(path, 'f.txt'), arcname='f.txt')
+    # a decompressor writing more to stderr than a pipe could buffer
+    decompressor = [
+        sys.executable, '-c',
+        'import sys, zlib; sys.stderr.write("x" * 1000000); '
+        'sys.stderr.flush(); '
+        'stdin = getattr(sys.stdin, "buffer", sys.stdin); '
+        'stdout = getattr(sys.stdout, "buffer", sys.stdout); '
+        'stdout.write(zlib.decompress(stdin.read(), 16 + zlib.MAX_WBITS))']
+    outdir = opj(path, 'extracted')
+    os.makedirs(outdir)
+    with patch('datalad.support.archives._get_parallel_decompressor',
+               return_value=decompressor):
+        assert_true(_decompress_tar_parallel(archive, outdir))
+    with open(opj(outdir, 'f.txt')) as f:
+        eq_(f.read(), 'load')
+
+
+@with_tree(**tree_simplearchive)
+def test_ExtractedArchive_extract_atomically(path):
+    archive = opj(path, fn_archive_obscure_ext)
+    earchive = ExtractedArchive(archive, opj(path, 'extracted'))
+    with patch('datalad.support.archives.decompress_file',
+               side_effect=RuntimeError("interrupted")):
+        assert_raises(RuntimeError, earchive.assure_extracted)
+    assert_false(exists(earchive.path))
+    assert_false(exists(earchive.tmp_path))
+    assert_false(earchive.is_extracted)
+    earchive.assure_extracted()
+    assert_true(earchive.is_extracted)
+    assert_false(exists(earchive.tmp_path))
+    with open(earchive.get_extracted_file(opj(fn_archive_obscure, '3.txt'))) as f:
+        eq_(f.read(), '3 load')
+    earchive.clean()
+
+
 #@with_tree(**tree_simplearchive)
 #@with_tree(**tree_simplearchive)
 def test_ArchivesCache():
@@ -157,6 +306,70 @@ def test_ArchivesCache():
     assert_false(exists(cache_path))
 
 
+@with_tempfile(mkdir=True)
+def test_ArchivesCache_evict(path):
+    cache = ArchivesCache(path, persistent=True, size_limit=25)
+    earchives = [cache[opj(path, 'a%d.tar' % i)] for i in range(3)]
+    for i, earchive in enumerate(earchives):
+        os.makedirs(earchive.path)
+        with open(opj(earchive.path, 'f'), 'w') as f:
+            f.write('0123456789')
+        with open(earchive.stamp_path, 'w') as f:
+            f.write(earchive._archive)
+        # used in order of creation
+        os.utime(earchive.stamp_path, (100 + i, os.stat(earchive.path).st_mtime))
+        assert_true(earchive.is_extracted)
+    earchives[2].touch()
+    eq_(cache.evict(), [earchives[0].path])
+    assert_false(earchives[0].is_extracted)
+    assert_false(exists(earchives[0].path))
+    assert_true(earchives[1].is_extracted)
+    assert_true(earchives[2].is_extracted)
+    eq_(cache.evict(), [])
+    # the limit is applied whenever a persistent cache is cleaned or opened
+    cache.size_limit = 15
+    cache.clean()
+    assert_false(earchives[1].is_extracted)
+    assert_true(earchives[2].is_extracted)
+    ArchivesCache(path, persistent=True, size_limit=5)
+    assert_false(earchives[2].is_extracted)
+    eq_(os.listdir(cache.path), [])
+    # indexes count as well, and go along with their archive
+    for earchive in earchives[:2]:
+        with open(earchive.index_path, 'w') as f:
+            f.write('0123456789')
+    eq_(sorted(cache.evict(15)), [earchives[0].path])
+    assert_false(exists(earchives[0].index_path))
+    assert_true(exists(earchives[1].index_path))
+    eq_(cache.evict(15), [])
+
+
+@with_tree(**tree_simplearchive)
+def test_ExtractedArchive_extract_file_evicted(path):
+    archive = opj(path, fn_archive_obscure_ext)
+    earchive = ExtractedArchive(archive, opj(path, 'extracted'))
+    earchive.assure_extracted()
+    dst = opj(path, 'dst')
+    calls = []
+
+    def evicted_first(src, dst):
+        calls.append(src)
+        if len(calls) == 1:
+            # another process evicted the archive after it was touched
+            os.unlink(earchive.stamp_path)
+            rmtree(earchive.path)
+        return link_file_load(src, dst)
+
+    with patch('datalad.support.archives.link_file_load',
+               side_effect=evicted_first):
+        earchive.extract_file(opj(fn_archive_obscure, '3.txt'), dst)
+    eq_(len(calls), 2)
+    assert_true(earchive.is_extracted)
+    with open(dst) as f:
+        eq_(f.read(), '3 load')
+    earchive.clean()
+
+
 def _test_get_leading_directory(ea, return_value, target_value, kwargs={}):
     with patch.object(ExtractedArchive, 'get_extracted_files', return_value=return_value):
         assert_equal(ea.get_leading_directory(**kwargs), target_value)
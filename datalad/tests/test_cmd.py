@@ -15,12 +15,14 @@ from os.path import dirname, join as opj
 import sys
 import logging
 import shlex
+import tempfile
 
 from .utils import ok_, eq_, assert_is, assert_equal, assert_false, \
     assert_true, assert_greater, assert_raises, assert_in, SkipTest
 
 from ..cmd import Runner, link_file_load
 from ..cmd import GitRunner
+from ..cmd import AsyncRunner
 from ..support.exceptions import CommandError
 from ..support.protocol import DryRunProtocol
 from .utils import with_tempfile, assert_cwd_unchanged, \
@@ -323,3 +325,50 @@ s
     #  probably #2185
     eq_(runner._process_remaining_output(None, out_bytes, *args), target)
     eq_(runner._process_remaining_output(None, out, *args), target)
+
+
+def test_async_runner():
+    if sys.version_info < (3, 4):
+        raise SkipTest("asyncio is not available")
+    runner = AsyncRunner()
+    cmds = [[sys.executable, '-c',
+             'import sys, time; time.sleep(%s); print(%d); '
+             'sys.stderr.write("err%d\\n")' % (0.1 * (3 - i), i, i)]
+            for i in range(3)]
+    # all started at once, outputs in the order of the commands
+    eq_(runner.run_many(cmds),
+        [('%d\n' % i, 'err%d\n' % i) for i in range(3)])
+    eq_(runner.run_many(cmds, jobs=1), runner.run_many(cmds, jobs=2))
+    eq_(runner.run_many([]), [])
+    # every command could run in a directory of its own
+    tmpdir = tempfile.gettempdir()
+    eq_(runner.run_many(
+        [[sys.executable, '-c', 'import os; print(os.getcwd())']] * 2,
+        cwds=[os.curdir, tmpdir])[1][0].rstrip(),
+        os.path.realpath(tmpdir))
+
+    # callables get every line as it comes
+    lines = []
+    runner.run_many(
+        ['echo 1; echo 2', 'echo 3'],
+        log_stdout=lambda l: lines.append(l.rstrip()))
+    eq_(sorted(lines), ['1', '2', '3'])
+
+    failing = [sys.executable, '-c', 'import sys; sys.exit(3)']
+    with assert_raises(CommandError) as cme:
+        runner.run_many(cmds[:1] + [failing], expect_fail=True)
+    eq_(cme.exception.code, 3)
+    res = runner.run_many([failing] + cmds[:1], return_exceptions=True)
+    assert_true(isinstance(res[0], CommandError))
+    eq_(res[1], ('0\n', 'err0\n'))
+    # failure to start is reported as well
+    res = runner.run_many([['/nonexistent/command']], return_exceptions=True)
+    assert_true(isinstance(res[0], OSError))
+
+
+def test_async_runner_dry():
+    dry = DryRunProtocol()
+    runner = AsyncRunner(protocol=dry)
+    eq_(runner.run_many(['echo 1', ['echo', '2']]), [("DRY", "DRY")] * 2)
+    eq_(dry[0]['command'], ['echo', '1'])
+    eq_(dry[1]['command'], ['echo', '2'])
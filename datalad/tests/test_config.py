@@ -12,6 +12,7 @@
 
 import os
 from os.path import exists
+from time import time
 from os.path import join as opj
 
 from mock import patch
@@ -24,6 +25,7 @@ from datalad.tests.utils import with_tempfile
 from datalad.utils import swallow_logs
 
 from datalad.distribution.dataset import Dataset
+from datalad.support.gitrepo import GitRepo
 from datalad.api import create
 from datalad.config import ConfigManager
 from datalad.cmd import CommandError
@@ -317,3 +319,145 @@ def test_from_env():
     os.environ['DATALAD_CRAZY_OVERRIDE'] = 'fromenv'
     cfg.reload()
     assert_equal(cfg['datalad.crazy.override'], 'fromenv')
+
+
+@with_tree(tree=_dataset_config_template)
+@with_tempfile(mkdir=True)
+def test_persistent_cache(path, cachedir):
+    ds = Dataset(opj(path, 'ds'))
+    ds_cfgfile = opj(ds.path, '.datalad', 'config')
+    # configuration files modified within the last seconds are not to be
+    # trusted to be unmodified by their mtime
+    past = os.stat(ds_cfgfile).st_mtime - 10
+    os.utime(ds_cfgfile, (past, past))
+
+    with patch.dict('os.environ', {'DATALAD_LOCATIONS_CACHE': cachedir}):
+        cfg = ConfigManager(ds, dataset_only=True)
+        assert_equal(cfg.get('something.user'), ('name=Jane Doe', 'email=jd@example.com'))
+        assert_equal(len(os.listdir(opj(cachedir, 'config'))), 1)
+        with patch.object(ConfigManager, '_run') as run:
+            cfg_cached = ConfigManager(ds, dataset_only=True)
+            cfg_cached.reload(force=True)
+            assert_false(run.called)
+        assert_equal(cfg_cached._store, cfg._store)
+        assert_equal(cfg_cached._cfgfiles, cfg._cfgfiles)
+
+        # modification is detected
+        with open(ds_cfgfile, 'a') as f:
+            f.write('[something "more"]\n\tkey = value\n')
+        os.utime(ds_cfgfile, (past + 1, past + 1))
+        cfg = ConfigManager(ds, dataset_only=True)
+        assert_equal(cfg.get('something.more.key'), 'value')
+
+        # so is appearance of a configuration file
+        cfg = ConfigManager(ds)
+        assert_not_in('something.local.key', cfg)
+        GitRepo(ds.path, create=True)
+        with open(opj(ds.path, '.git', 'config'), 'a') as f:
+            f.write('[something "local"]\n\tkey = value\n')
+        cfg = ConfigManager(ds)
+        assert_equal(cfg.get('something.local.key'), 'value')
+
+    # and cache can be disabled
+    with patch.dict('os.environ', {'DATALAD_LOCATIONS_CACHE': cachedir,
+                                   'DATALAD_CONFIG_CACHE': '0'}), \
+            patch.object(ConfigManager, '_save_cache') as save:
+        ConfigManager(ds, dataset_only=True)
+        assert_false(save.called)
+
+
+def _backdate(fnames, age=10):
+    past = time() - age
+    for fname in fnames:
+        if exists(fname):
+            os.utime(fname, (past, past))
+
+
+@with_tree(tree={'other.cfg': '[foo]\n\tbar = onother\n'})
+@with_tempfile(mkdir=True)
+def test_persistent_cache_onbranch(path, cachedir):
+    ds = Dataset(opj(path, 'ds'))
+    repo = GitRepo(ds.path, create=True)
+    repo.commit("initial", options=['--allow-empty'])
+    branch = repo.get_active_branch()
+    repo.checkout('other', options=['-b'])
+    repo.checkout(branch)
+    with open(opj(ds.path, '.git', 'config'), 'a') as f:
+        f.write('[includeIf "onbranch:other"]\n\tpath = ../../other.cfg\n'
+                '[include]\n\tpath = ../../later.cfg\n')
+    with patch.dict('os.environ', {'DATALAD_LOCATIONS_CACHE': cachedir}):
+        cfg = ConfigManager(ds)
+        _backdate(cfg._cfgfiles.union(cfg._get_cfgfile_candidates()))
+        ConfigManager(ds)
+        assert_equal(len(os.listdir(opj(cachedir, 'config'))), 1)
+        with patch.object(ConfigManager, '_read_python') as read:
+            assert_equal(ConfigManager(ds).get('foo.bar'), None)
+            assert_false(read.called)
+
+        # switching to the branch changes the configuration
+        repo.checkout('other')
+        _backdate([opj(ds.path, '.git', 'HEAD')], age=5)
+        assert_equal(ConfigManager(ds).get('foo.bar'), 'onother')
+        # so does the appearance of an included file
+        with open(opj(path, 'later.cfg'), 'w') as f:
+            f.write('[foo]\n\tlater = yes\n')
+        _backdate([opj(path, 'later.cfg')], age=5)
+        assert_equal(ConfigManager(ds).get('foo.later'), 'yes')
+
+
+_git_config_content = """\
+[Sec "Sub Sec"]
+	Key = "quoted # not comment" ; comment
+	key = second  value\\twith\\ttabs
+[sec.Old]
+	flag
+	cont = one \\
+two
+[include]
+	path = ../../inc.cfg
+[includeIf "gitdir:**/ds/"]
+	path = ../../cond.cfg
+[includeIf "gitdir:/nomatch/"]
+	path = ../../nomatch.cfg
+"""
+
+
+@with_tree(tree={
+    'inc.cfg': '[inc]\n\tv = 1\n',
+    'cond.cfg': '[cond]\n\tv = 2\n',
+    'nomatch.cfg': '[nomatch]\n\tv = 3\n',
+})
+def test_python_reader(path):
+    ds = Dataset(opj(path, 'ds'))
+    GitRepo(ds.path, create=True)
+    with open(opj(ds.path, '.git', 'config'), 'a') as f:
+        f.write(_git_config_content)
+    with patch.dict('os.environ', {'DATALAD_CONFIG_CACHE': '0'}):
+        with patch.object(ConfigManager, '_run') as run:
+            cfg = ConfigManager(ds)
+            assert_false(run.called)
+        with patch.dict('os.environ', {'DATALAD_CONFIG_READER': 'git'}):
+            gitcfg = ConfigManager(ds)
+    # same as what git reports (besides the settings from the environment)
+    assert_equal(
+        {k: v for k, v in cfg.items() if not k.startswith('datalad.config.')},
+        {k: v for k, v in gitcfg.items() if not k.startswith('datalad.config.')})
+    assert_equal(cfg._cfgfiles, gitcfg._cfgfiles)
+
+    assert_equal(cfg['sec.Sub Sec.key'],
+                 ('quoted # not comment', 'second  value\twith\ttabs'))
+    assert_equal(cfg['sec.old.cont'], 'one two')
+    assert_in('sec.old.flag', cfg)
+    assert_equal(cfg['inc.v'], '1')
+    assert_equal(cfg['cond.v'], '2')
+    assert_not_in('nomatch.v', cfg)
+    assert_in(opj(path, 'cond.cfg'), cfg._cfgfiles)
+
+    # git is asked whenever we cannot do the same
+    with open(opj(ds.path, '.git', 'config'), 'a') as f:
+        f.write('[includeIf "hasconfig:remote.*.url:/some/**"]\n'
+                '\tpath = ../../nomatch.cfg\n')
+    with patch.dict('os.environ', {'DATALAD_CONFIG_CACHE': '0'}), \
+            patch.object(ConfigManager, '_read_git') as read_git:
+        ConfigManager(ds)
+        assert_true(read_git.called)
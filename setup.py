@@ -103,6 +103,7 @@ requires = {
         'exifread',  # EXIF metadata
         'python-xmp-toolkit',  # XMP metadata, also requires 'exempi' to be available locally
         'Pillow',  # generic image metadata
+        'numpy',  # columnar export of metadata
     ]
 }
 